@@ -37,6 +37,17 @@ class ScrapeInstagram extends Command
         // Add more target accounts here
     ];
 
+    /**
+     * Seconds the Python scraper may run per target
+     */
+    protected int $timeoutPerTarget = 600;
+
+    /**
+     * Seconds between SIGTERM and SIGKILL when the scraper times out, so it
+     * can flush its buffer, save checkpoints and write the summary
+     */
+    protected int $stopGracePeriod = 30;
+
     /**
      * Execute the console command.
      */
@@ -62,36 +73,59 @@ public function handle(): int
         $successCount = 0;
         $failCount = 0;
 
-        foreach ($targets as $targetUsername) {
-            $this->info("📸 Scraping @{$targetUsername}...");
-            
+        if (!$useApify) {
+            // One Python process for all targets: one login, one shared rate budget
+            $this->info('📸 Scraping ' . implode(', ', array_map(fn ($t) => "@{$t}", $targets)) . '...');
+
             try {
-                if ($useApify) {
-                    $apifyToken = $this->option('apify-token') ?: env('APIFY_API_TOKEN');
-                    $result = $this->scrapeWithApify($targetUsername, $maxPosts, $apifyToken);
-                } else {
-                    $pythonPath = $this->option('python');
-                    $result = $this->runPythonScraper($targetUsername, $maxPosts, $pythonPath);
-                }
-                
+                $results = $this->runPythonScraper($targets, (int) $maxPosts, $this->option('python'));
+            } catch (\Exception $e) {
+                $this->error("   ❌ Error: {$e->getMessage()}");
+                Log::error('[ScrapeInstagram] Scraping failed', [
+                    'targets' => $targets,
+                    'error' => $e->getMessage(),
+                ]);
+                $results = array_fill_keys($targets, ['success' => false, 'message' => $e->getMessage()]);
+            }
+
+            foreach ($results as $targetUsername => $result) {
                 if ($result['success']) {
-                    $this->info("   ✅ Success: {$result['message']}");
+                    $this->info("   ✅ @{$targetUsername}: {$result['message']}");
                     $successCount++;
                 } else {
-                    $this->error("   ❌ Failed: {$result['message']}");
+                    $this->error("   ❌ @{$targetUsername}: {$result['message']}");
                     $failCount++;
                 }
+            }
+
+            $this->newLine();
+        } else {
+            foreach ($targets as $targetUsername) {
+                $this->info("📸 Scraping @{$targetUsername}...");
+            
+                try {
+                    $apifyToken = $this->option('apify-token') ?: env('APIFY_API_TOKEN');
+                    $result = $this->scrapeWithApify($targetUsername, $maxPosts, $apifyToken);
                 
-                $this->newLine();
+                    if ($result['success']) {
+                        $this->info("   ✅ Success: {$result['message']}");
+                        $successCount++;
+                    } else {
+                        $this->error("   ❌ Failed: {$result['message']}");
+                        $failCount++;
+                    }
                 
-            } catch (\Exception $e) {
-                $this->error("   ❌ Error: {$e->getMessage()}");
-                Log::error('[ScrapeInstagram] Scraping failed', [
-                    'target' => $targetUsername,
-                    'error' => $e->getMessage(),
-                ]);
-                $failCount++;
-                $this->newLine();
+                    $this->newLine();
+                
+                } catch (\Exception $e) {
+                    $this->error("   ❌ Error: {$e->getMessage()}");
+                    Log::error('[ScrapeInstagram] Scraping failed', [
+                        'target' => $targetUsername,
+                        'error' => $e->getMessage(),
+                    ]);
+                    $failCount++;
+                    $this->newLine();
+                }
             }
         }
 
@@ -126,9 +160,21 @@ protected function checkBotAccountConfigured(): bool
     }
 
     /**
-     * Run Python scraper script
+     * Run Python scraper script for all targets in one process
+     *
+     * The scraper runs with --ndjson: stdout carries one JSON event per line
+     * (post, target, summary) which is streamed as progress, its human-readable
+     * log goes to stderr.
+     *
+     * The timeout is enforced here rather than by Symfony's Process (whose
+     * timeout sends SIGKILL right after SIGTERM): once the deadline passes the
+     * scraper gets SIGTERM and $stopGracePeriod seconds to finish, and the
+     * output written meanwhile is still read. The results received until then
+     * are used: the summary if it was written, otherwise the per-target events.
+     *
+     * @return array<string, array{success: bool, message: string}> Result per target
      */
-    protected function runPythonScraper(string $target, int $maxPosts, string $pythonPath): array
+    protected function runPythonScraper(array $targets, int $maxPosts, string $pythonPath): array
     {
         $scraperDir = base_path('instagram-scraper');
         $scraperScript = $scraperDir . '/scraper.py';
@@ -139,43 +185,144 @@ protected function runPythonScraper(string $target, int $maxPosts, string $pytho
         }
 
         // Build command
-        $command = [
-            $pythonPath,
-            $scraperScript,
-            '--target', $target,
-            '--max-posts', (string) $maxPosts,
-        ];
+        $command = array_merge(
+            [$pythonPath, $scraperScript, '--targets'],
+            $targets,
+            ['--max-posts', (string) $maxPosts, '--ndjson']
+        );
+
+        // No built-in timeout, the deadline below stops the scraper gracefully
+        $timeout = $this->timeoutPerTarget * count($targets);
+        $deadline = microtime(true) + $timeout;
+        $process = $this->makeScraperProcess($command, $scraperDir);
+        $process->setTimeout(null);
+        $process->start();
+
+        // Stream events line by line as they are flushed
+        $summary = null;
+        $targetEvents = [];
+        $pending = '';
+
+        $consume = function (string $data) use (&$summary, &$targetEvents, &$pending) {
+            $pending .= $data;
+
+            while (($newline = strpos($pending, "\n")) !== false) {
+                $line = substr($pending, 0, $newline);
+                $pending = substr($pending, $newline + 1);
+
+                $event = json_decode($line, true);
+                if (!is_array($event) || !isset($event['event'])) {
+                    continue;
+                }
+
+                if ($event['event'] === 'summary') {
+                    $summary = $event;
+                } else {
+                    if ($event['event'] === 'target') {
+                        $targetEvents[$event['target']] = $event;
+                    }
+                    $this->showScraperEvent($event);
+                }
+            }
+        };
+
+        $timedOut = false;
+
+        // Non-blocking, so the deadline is also checked while the scraper is silent
+        foreach ($process->getIterator(Process::ITER_NON_BLOCKING) as $type => $data) {
+            if ($type === Process::OUT) {
+                $consume($data);
+            }
 
-        // Create process
-        $process = new Process($command, $scraperDir, null, null, 600); // 10 min timeout
+            if (microtime(true) >= $deadline) {
+                $timedOut = true;
+                // SIGTERM, SIGKILL only if the scraper has not exited after the grace period
+                $process->stop($this->stopGracePeriod);
+                // Events written while shutting down (checkpoints, summary)
+                $consume($process->getIncrementalOutput());
+                break;
+            }
 
-        // Run process
-        $process->run();
+            if ($data === '') {
+                usleep(100000);
+            }
+        }
+
+        if ($timedOut) {
+            $this->warn("   ⏱️  Scraper timed out after {$timeout}s, using the results received so far");
+            Log::warning('[ScrapeInstagram] Scraper timed out', [
+                'targets' => $targets,
+                'timeout' => $timeout,
+                'reported_targets' => array_keys($targetEvents),
+            ]);
+        }
 
         // Check if successful
-        if (!$process->isSuccessful()) {
-            $error = $process->getErrorOutput() ?: $process->getOutput();
+        if (!$timedOut && !$process->isSuccessful()) {
             throw new ProcessFailedException($process);
         }
 
-        $output = $process->getOutput();
+        if ($summary !== null && ($summary['ok'] || $timedOut)) {
+            $reported = $summary['targets'];
+        } elseif ($timedOut) {
+            $reported = array_values($targetEvents);
+        } elseif ($summary === null) {
+            throw new \Exception('Scraper finished without a result summary');
+        } else {
+            throw new \Exception('Scraper failed: ' . ($summary['error'] ?? 'unknown error'));
+        }
 
-        // Parse output to extract statistics
-        // Look for patterns like "Successfully scraped: X"
-        if (preg_match('/Successfully scraped:\s*(\d+)/', $output, $matches)) {
-            $scrapedCount = (int) $matches[1];
-            return [
-                'success' => true,
-                'message' => "Scraped {$scrapedCount} new posts",
-                'output' => $output,
+        $results = [];
+        foreach ($reported as $target) {
+            $results[$target['target']] = [
+                'success' => !in_array($target['status'], ['not found', 'failed', 'connection error'], true),
+                'message' => "Scraped {$target['scraped']} new posts "
+                    . "({$target['skipped']} skipped, {$target['errors']} errors, {$target['status']})",
             ];
         }
 
-        return [
-            'success' => true,
-            'message' => 'Scraping completed',
-            'output' => $output,
-        ];
+        foreach ($targets as $target) {
+            $results[$target] ??= ['success' => false, 'message' => 'Timed out before the scraper reported this target'];
+        }
+
+        return $results;
+    }
+
+    /**
+     * Create the (not yet started) scraper process
+     */
+    protected function makeScraperProcess(array $command, string $cwd): Process
+    {
+        return new Process($command, $cwd);
+    }
+
+    /**
+     * Print a progress line for a scraper NDJSON event
+     */
+    protected function showScraperEvent(array $event): void
+    {
+        $target = $event['target'] ?? '';
+
+        switch ($event['event']) {
+            case 'post':
+                if ($event['status'] === 'scraped') {
+                    $this->line("   📥 @{$target} {$event['shortcode']}: {$event['images']} image(s)");
+                } elseif ($event['status'] === 'skipped') {
+                    $this->line("   ⏭️  @{$target} {$event['shortcode']}: already scraped", null, 'v');
+                } else {
+                    $this->warn("   ⚠️  @{$target} {$event['shortcode']}: {$event['error']}");
+                }
+                break;
+
+            case 'error':
+                $this->warn("   ⚠️  @{$target}: {$event['error']}");
+                break;
+
+            case 'target':
+                $this->line("   🎯 @{$target} done ({$event['status']}): {$event['scraped']} new, "
+                    . "{$event['skipped']} skipped, {$event['errors']} errors");
+                break;
+        }
     }
 
     /**
@@ -0,0 +1,33 @@
+<?php
+
+use Illuminate\Database\Migrations\Migration;
+use Illuminate\Database\Schema\Blueprint;
+use Illuminate\Support\Facades\Schema;
+
+return new class extends Migration
+{
+    /**
+     * Run the migrations.
+     */
+    public function up(): void
+    {
+        // WebP/AVIF derivatives written by the Python scraper (one entry per image_paths entry)
+        if (!Schema::hasColumn('sc_raw_news_feeds', 'image_variants')) {
+            Schema::table('sc_raw_news_feeds', function (Blueprint $table) {
+                $table->json('image_variants')->nullable()->after('image_paths');
+            });
+        }
+    }
+
+    /**
+     * Reverse the migrations.
+     */
+    public function down(): void
+    {
+        if (Schema::hasColumn('sc_raw_news_feeds', 'image_variants')) {
+            Schema::table('sc_raw_news_feeds', function (Blueprint $table) {
+                $table->dropColumn('image_variants');
+            });
+        }
+    }
+};
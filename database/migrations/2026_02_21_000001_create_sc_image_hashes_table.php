@@ -0,0 +1,38 @@
+<?php
+
+use Illuminate\Database\Migrations\Migration;
+use Illuminate\Database\Schema\Blueprint;
+use Illuminate\Support\Facades\Schema;
+
+return new class extends Migration
+{
+    /**
+     * Run the migrations.
+     */
+    public function up(): void
+    {
+        // Perceptual hashes written by the Python scraper (image_dedup.py), which
+        // also creates the table itself if it runs before this migration
+        if (!Schema::hasTable('sc_image_hashes')) {
+            Schema::create('sc_image_hashes', function (Blueprint $table) {
+                $table->id();
+                $table->string('image_hash', 32); // 128-bit dHash as hex
+                $table->string('path', 500); // Relative to instagram-scraper/downloads/
+                $table->string('post_shortcode', 50);
+                $table->string('source_username', 100);
+                $table->timestamp('created_at')->useCurrent();
+
+                $table->index('image_hash');
+                $table->index('post_shortcode');
+            });
+        }
+    }
+
+    /**
+     * Reverse the migrations.
+     */
+    public function down(): void
+    {
+        Schema::dropIfExists('sc_image_hashes');
+    }
+};
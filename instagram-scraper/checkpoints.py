@@ -0,0 +1,83 @@
+"""
+Resumable Scrape Checkpoints
+SMAN 1 Baleendah - News Feed Automation
+
+Stores where the post iterator of a target profile stopped, so the next run
+continues there instead of walking the feed from the top again:
+- Instaloader's frozen NodeIterator state (current page and cursor)
+- Progress across runs (position in the feed, posts scraped so far)
+
+One checkpoint-{target}.json per target, next to the session file.
+Checkpoints older than Instaloader's shelf life are discarded, since the
+image URLs in the stored page have expired by then.
+"""
+
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+
+from instaloader import FrozenNodeIterator
+from instaloader.exceptions import InvalidArgumentException
+
+
+class CheckpointStore:
+    """Per-target resume points of profile.get_posts() iterators"""
+
+    def __init__(self, directory='.'):
+        self.directory = Path(directory)
+
+    def path(self, target_username):
+        return self.directory / f"checkpoint-{target_username}.json"
+
+    def restore(self, target_username, iterator):
+        """
+        Thaw `iterator` from the stored checkpoint (must not be iterated yet)
+
+        Returns:
+            dict: Stored progress, or None if there is no usable checkpoint
+        """
+        path = self.path(target_username)
+        if not path.exists():
+            return None
+
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                checkpoint = json.load(f)
+
+            if checkpoint.get('magic') != iterator.magic:
+                raise InvalidArgumentException("belongs to a different query or bot account")
+
+            frozen = FrozenNodeIterator(**checkpoint['iterator'])
+            if frozen.best_before and datetime.fromtimestamp(frozen.best_before) < datetime.now():
+                raise InvalidArgumentException("\"best before\" date exceeded")
+
+            iterator.thaw(frozen)
+
+        except (OSError, ValueError, KeyError, TypeError, InvalidArgumentException) as e:
+            print(f"⚠️  Not resuming @{target_username} from {path}: {e}")
+            return None
+
+        return checkpoint.get('progress', {})
+
+    def save(self, target_username, iterator, progress):
+        """Write the iterator state and progress atomically"""
+        path = self.path(target_username)
+        checkpoint = {
+            'target': target_username,
+            'magic': iterator.magic,
+            'saved_at': datetime.utcnow().isoformat(timespec='seconds'),
+            'progress': progress,
+            'iterator': iterator.freeze()._asdict(),
+        }
+
+        tmp_path = path.with_name(path.name + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(checkpoint, f)
+        os.replace(tmp_path, path)
+
+    def clear(self, target_username):
+        """Remove the checkpoint once the feed has been walked to the end"""
+        path = self.path(target_username)
+        if path.exists():
+            path.unlink()
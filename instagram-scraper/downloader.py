@@ -0,0 +1,159 @@
+"""
+Concurrent Media Downloader
+SMAN 1 Baleendah - News Feed Automation
+
+Decouples image downloads from post iteration:
+- The scraper (producer) walks profile.get_posts() and submits each post's
+  image URLs here
+- A bounded thread pool downloads them, carousel images in parallel
+- Every download first takes a token from the shared RateScheduler, so the
+  anti-ban pacing holds across all threads
+- Optionally each image is checked against the perceptual-hash index:
+  near-duplicates of an already stored image are not written again, the
+  post links to the existing file instead
+- Optionally each image is handed to the ImagePostProcessor pool for
+  WebP/AVIF derivatives before the post counts as done
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from image_dedup import dhash_bytes
+
+
+class PostDownload:
+    """Pending downloads of one post (one future per image)"""
+
+    def __init__(self, shortcode, futures):
+        self.shortcode = shortcode
+        self.futures = futures
+        self.submitted_at = time.monotonic()
+        self.finished_at = self.submitted_at if not futures else None
+        self._remaining = len(futures)
+        self._lock = threading.Lock()
+
+        for future in futures:
+            future.add_done_callback(self._on_done)
+
+    def _on_done(self, future):
+        with self._lock:
+            self._remaining -= 1
+            if self._remaining == 0:
+                self.finished_at = time.monotonic()
+
+    def seconds(self):
+        """Seconds from submission until the last image finished (None while running)"""
+        if self.finished_at is None:
+            return None
+        return self.finished_at - self.submitted_at
+
+    def done(self):
+        return all(future.done() for future in self.futures)
+
+    def result(self):
+        """
+        Wait for all images of the post
+
+        Returns:
+            tuple: (list of downloaded Paths, list of exceptions)
+        """
+        paths = []
+        errors = []
+
+        for future in self.futures:
+            try:
+                path, _, _ = future.result()
+                paths.append(path)
+            except Exception as e:
+                errors.append(e)
+
+        return paths, errors
+
+    def variants(self):
+        """Derivative info per downloaded image (None entries without post-processing)"""
+        return [future.result()[1] for future in self.futures if not future.exception()]
+
+    def duplicates(self):
+        """Per downloaded image: True if linked to an existing near-duplicate instead of written"""
+        return [future.result()[2] for future in self.futures if not future.exception()]
+
+
+class MediaDownloader:
+    """Download post images on a bounded thread pool behind a shared RateScheduler"""
+
+    def __init__(self, loader, scheduler, max_workers=4, postprocessor=None, hash_index=None):
+        self.L = loader
+        self.scheduler = scheduler
+        self.postprocessor = postprocessor
+        self.hash_index = hash_index
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='media')
+
+    @staticmethod
+    def collect_media_urls(post):
+        """Image URLs of a post (all carousel images for sidecars, videos skipped)"""
+        if post.typename == 'GraphSidecar':
+            return [node.display_url for node in post.get_sidecar_nodes() if not node.is_video]
+        if post.is_video:
+            return []
+        return [post.url]
+
+    def submit_post(self, post, target_dir):
+        """Queue all images of a post, files are named {shortcode}_{n}.{ext}"""
+        urls = self.collect_media_urls(post)
+        mtime = post.date_local
+
+        futures = [
+            self.executor.submit(self._download, url, target_dir, f"{post.shortcode}_{n}", post.shortcode, mtime)
+            for n, url in enumerate(urls, 1)
+        ]
+        return PostDownload(post.shortcode, futures)
+
+    def _download(self, url, target_dir, name, shortcode, mtime):
+        """
+        Download one image (runs on a worker thread)
+
+        Returns:
+            tuple: (Path, derivative info, True if linked to an existing near-duplicate)
+        """
+        self.scheduler.acquire()
+
+        resp = self.L.context.get_raw(url)
+
+        # Extension from Content-Type, as Instaloader.download_pic does
+        extension = '.jpg'
+        content_type = resp.headers.get('Content-Type')
+        if content_type:
+            extension = '.' + content_type.split(';')[0].split('/')[-1].lower().replace('jpeg', 'jpg')
+
+        path = target_dir / f"{name}{extension}"
+        download_dir = target_dir.parent
+        duplicate = False
+
+        if self.hash_index is None:
+            self.L.context.write_raw(resp, str(path))
+        else:
+            data = resp.raw.read()
+            image_hash = dhash_bytes(data)
+            existing = self.hash_index.find(image_hash)
+
+            if existing and (download_dir / existing).exists():
+                path = download_dir / existing
+                duplicate = True
+            else:
+                self.L.context.write_raw(data, str(path))
+                self.hash_index.add(image_hash, path.relative_to(download_dir).as_posix(),
+                                    shortcode, target_dir.name)
+
+        if not duplicate:
+            os.utime(path, (time.time(), mtime.timestamp()))
+
+        variants = self.postprocessor.process(path) if self.postprocessor else None
+        return path, variants, duplicate
+
+    def shutdown(self, wait=True):
+        """Stop the worker threads (waits for queued downloads by default)"""
+        self.executor.shutdown(wait=wait)
+        if self.postprocessor:
+            self.postprocessor.shutdown(wait=wait)
@@ -0,0 +1,60 @@
+"""
+Machine-Readable Scraper Output
+SMAN 1 Baleendah - News Feed Automation
+
+Structured results for callers such as Laravel's ScrapeInstagram command:
+- ndjson: one JSON object per line (post, target and summary events),
+  flushed immediately so progress can be streamed
+- json: a single summary document at the end of the run
+
+Every object has an "event" key. The human-readable log goes to stderr
+in these modes, so stdout only carries JSON.
+"""
+
+import json
+import time
+from datetime import datetime, timezone
+
+OUTPUT_MODES = ('ndjson', 'json')
+
+
+class EventStream:
+    """Writes scraper events to a stream (no-op when mode is None)"""
+
+    def __init__(self, stream=None, mode=None):
+        """
+        Args:
+            stream: Writable text stream (normally the real stdout)
+            mode (str): 'ndjson', 'json' or None (disabled)
+        """
+        if mode not in (None,) + OUTPUT_MODES:
+            raise ValueError(f"Unknown output mode: {mode}")
+
+        self.stream = stream
+        self.mode = mode
+        self.started_at = time.monotonic()
+
+    @property
+    def enabled(self):
+        return self.mode is not None
+
+    def emit(self, event, **fields):
+        """Write one event line (ndjson mode only)"""
+        if self.mode != 'ndjson':
+            return
+        self._write({'event': event, **fields})
+
+    def summary(self, **fields):
+        """Write the final summary (both modes)"""
+        if not self.enabled:
+            return
+        self._write({
+            'event': 'summary',
+            'finished_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'seconds': round(time.monotonic() - self.started_at, 2),
+            **fields,
+        })
+
+    def _write(self, obj):
+        self.stream.write(json.dumps(obj, ensure_ascii=False, default=str) + '\n')
+        self.stream.flush()
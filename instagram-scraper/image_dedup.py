@@ -0,0 +1,180 @@
+"""
+Perceptual Image Deduplication
+SMAN 1 Baleendah - News Feed Automation
+
+Detects reposts and cross-posted images before they are written to disk:
+- 128-bit dHash (64 row + 64 column gradient bits), robust to re-encoding,
+  resizing and small crops
+- BK-tree over Hamming distance, so a lookup only visits the part of the
+  index within `max_distance` instead of every stored hash
+- Hashes persisted in sc_image_hashes, so duplicates are found across runs,
+  posts and accounts
+
+Low-detail images (near-flat backgrounds, plain text slides) produce
+near-zero hashes that would collide with each other, so they are never
+deduplicated.
+"""
+
+import threading
+from io import BytesIO
+
+from PIL import Image
+
+from models import ImageHash
+
+HASH_SIZE = 8
+MIN_DETAIL_BITS = 8
+
+
+def dhash(image, hash_size=HASH_SIZE):
+    """
+    Difference hash of an image (2 * hash_size^2 bits)
+
+    Row bits compare horizontal neighbours, column bits vertical ones, on
+    a grayscale thumbnail.
+    """
+    image = image.convert('L')
+    row_image = image.resize((hash_size + 1, hash_size), Image.Resampling.LANCZOS)
+    col_image = image.resize((hash_size, hash_size + 1), Image.Resampling.LANCZOS)
+    rows = row_image.load()
+    cols = col_image.load()
+
+    value = 0
+    for y in range(hash_size):
+        for x in range(hash_size):
+            value = (value << 1) | (rows[x, y] > rows[x + 1, y])
+    for y in range(hash_size):
+        for x in range(hash_size):
+            value = (value << 1) | (cols[x, y] > cols[x, y + 1])
+    return value
+
+
+def dhash_bytes(data):
+    """dHash of encoded image data, None if it cannot be decoded"""
+    try:
+        with Image.open(BytesIO(data)) as image:
+            image.draft('L', (64, 64))  # JPEG: decode at reduced size
+            return dhash(image)
+    except Exception:
+        return None
+
+
+def hamming(a, b):
+    return bin(a ^ b).count('1')
+
+
+class BKTree:
+    """Burkhard-Keller tree over Hamming distance"""
+
+    def __init__(self):
+        self.root = None  # [hash, item, {distance: child}]
+        self.size = 0
+
+    def add(self, value, item):
+        self.size += 1
+        if self.root is None:
+            self.root = [value, item, {}]
+            return
+
+        node = self.root
+        while True:
+            distance = hamming(value, node[0])
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = [value, item, {}]
+                return
+            node = child
+
+    def find(self, value, max_distance):
+        """All (distance, hash, item) within max_distance, closest first"""
+        if self.root is None:
+            return []
+
+        matches = []
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            distance = hamming(value, node[0])
+            if distance <= max_distance:
+                matches.append((distance, node[0], node[1]))
+
+            # Triangle inequality: only children in [d - max, d + max] can match
+            for child_distance, child in node[2].items():
+                if distance - max_distance <= child_distance <= distance + max_distance:
+                    stack.append(child)
+
+        return sorted(matches, key=lambda match: match[0])
+
+    def __len__(self):
+        return self.size
+
+
+class ImageHashIndex:
+    """Thread-safe near-duplicate lookup shared by the download threads"""
+
+    def __init__(self, max_distance=6):
+        """
+        Args:
+            max_distance (int): Max differing bits (of 128) to count as duplicate
+        """
+        self.max_distance = max_distance
+        self.tree = BKTree()
+        self.new_entries = []
+        self._lock = threading.Lock()
+
+    def load(self, session):
+        """Build the tree from all stored hashes (creates the table if missing)"""
+        ImageHash.__table__.create(bind=session.get_bind(), checkfirst=True)
+
+        rows = session.query(ImageHash.image_hash, ImageHash.path).all()
+        with self._lock:
+            for image_hash, path in rows:
+                self.tree.add(int(image_hash, 16), path)
+        return len(rows)
+
+    def find(self, image_hash):
+        """
+        Stored image path (relative to downloads/) of the closest near-duplicate
+
+        Returns:
+            str: Path, or None if the image is new or too low-detail to compare
+        """
+        if image_hash is None or bin(image_hash).count('1') < MIN_DETAIL_BITS:
+            return None
+
+        with self._lock:
+            matches = self.tree.find(image_hash, self.max_distance)
+        return matches[0][2] if matches else None
+
+    def add(self, image_hash, path, post_shortcode, source_username):
+        """Register a newly written image (persisted on the next flush)"""
+        if image_hash is None or bin(image_hash).count('1') < MIN_DETAIL_BITS:
+            return
+
+        with self._lock:
+            self.tree.add(image_hash, path)
+            self.new_entries.append({
+                'image_hash': f"{image_hash:032x}",
+                'path': path,
+                'post_shortcode': post_shortcode,
+                'source_username': source_username,
+            })
+
+    def flush(self, session):
+        """Bulk insert hashes added since the last flush (main thread only)"""
+        with self._lock:
+            entries, self.new_entries = self.new_entries, []
+        if not entries:
+            return 0
+
+        try:
+            session.bulk_insert_mappings(ImageHash, entries)
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            print(f"      ⚠️  Failed to store {len(entries)} image hashes: {e}")
+            return 0
+        return len(entries)
+
+    def __len__(self):
+        return len(self.tree)
@@ -0,0 +1,237 @@
+"""
+Image Post-Processing
+SMAN 1 Baleendah - News Feed Automation
+
+Builds web-optimized derivatives of downloaded images:
+- WebP and AVIF at several widths (never upscaled)
+- EXIF orientation applied, all metadata (EXIF, ICC, XMP) stripped
+- Encoding runs on a process pool, one worker per core
+- Up-to-date derivatives are reused (images linked by several posts)
+
+Derivatives are written to downloads/<target>/variants/ and described in
+RawNewsFeed.image_variants (one entry per image_paths entry):
+
+    {"path": "sman1baleendah/ABC_1.jpg", "width": 1080, "height": 1350,
+     "variants": [{"path": "sman1baleendah/variants/ABC_1_640.webp",
+                   "format": "webp", "width": 640, "height": 800, "bytes": 41230}, ...]}
+
+Usage (backfill rows stored before derivatives existed):
+    python image_variants.py [--limit 100] [--workers 4]
+"""
+
+import argparse
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from PIL import Image, ImageOps, features
+
+DEFAULT_WIDTHS = (320, 640, 1080)
+DEFAULT_FORMATS = ('webp', 'avif')
+
+# Encoder settings per format (Pillow save kwargs)
+FORMAT_OPTIONS = {
+    'webp': {'format': 'WEBP', 'quality': 80, 'method': 4},
+    'avif': {'format': 'AVIF', 'quality': 60, 'speed': 6},
+}
+
+ORIENTATION_TAG = 0x0112
+
+# Fix Unicode encoding for Windows console
+if sys.platform == 'win32':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+
+def supported_formats(formats):
+    """Formats this Pillow build can encode (AVIF needs Pillow >= 11.3 with libavif)"""
+    available = []
+    for fmt in formats:
+        if fmt not in FORMAT_OPTIONS:
+            raise ValueError(f"Unknown derivative format: {fmt}")
+        if features.check(fmt):
+            available.append(fmt)
+        else:
+            print(f"⚠️  Pillow cannot encode {fmt.upper()}, skipping {fmt} derivatives")
+    return tuple(available)
+
+
+def build_variants(source_path, download_dir, widths=DEFAULT_WIDTHS, formats=('webp',)):
+    """
+    Encode all derivatives of one image (runs in a worker process)
+
+    Args:
+        source_path (str): Downloaded image
+        download_dir (str): Root that stored paths are relative to
+        widths (tuple): Target widths, larger than the source are skipped
+        formats (tuple): Output formats (keys of FORMAT_OPTIONS)
+
+    Returns:
+        dict: Source dimensions and the list of derivatives
+    """
+    source = Path(source_path)
+    root = Path(download_dir)
+    output_dir = source.parent / 'variants'
+    output_dir.mkdir(exist_ok=True)
+
+    with Image.open(source) as img:
+        # Orientations 5-8 are rotated by 90 degrees
+        width, height = img.size
+        if img.getexif().get(ORIENTATION_TAG) in (5, 6, 7, 8):
+            width, height = height, width
+
+        # Source width stands in when it is smaller than every target width
+        targets = sorted({w for w in widths if w < width} | ({width} if width <= max(widths) else set()))
+        planned = [
+            (output_dir / f"{source.stem}_{w}.{fmt}", fmt, w, max(1, round(height * w / width)))
+            for w in targets for fmt in formats
+        ]
+
+        # Up to date already (e.g. an image linked by several posts)
+        source_mtime = source.stat().st_mtime
+        if not all(path.exists() and path.stat().st_mtime >= source_mtime for path, _, _, _ in planned):
+            _encode(img, planned)
+
+    variants = [
+        {
+            'path': path.relative_to(root).as_posix(),
+            'format': fmt,
+            'width': target_width,
+            'height': target_height,
+            'bytes': path.stat().st_size,
+        }
+        for path, fmt, target_width, target_height in planned
+    ]
+
+    return {
+        'path': source.relative_to(root).as_posix(),
+        'width': width,
+        'height': height,
+        'variants': variants,
+    }
+
+
+def _encode(img, planned):
+    """Write the planned (path, format, width, height) derivatives of an open image"""
+    img = ImageOps.exif_transpose(img)
+    if img.mode not in ('RGB', 'RGBA'):
+        img = img.convert('RGBA' if 'transparency' in img.info else 'RGB')
+
+    # Copy pixels only, so no metadata can reach the encoder
+    pixels = Image.new(img.mode, img.size)
+    pixels.paste(img)
+
+    resized = {}
+    for path, fmt, target_width, target_height in planned:
+        if target_width not in resized:
+            resized[target_width] = pixels if target_width == pixels.width else pixels.resize(
+                (target_width, target_height), Image.Resampling.LANCZOS
+            )
+        resized[target_width].save(path, **FORMAT_OPTIONS[fmt])
+
+
+class ImagePostProcessor:
+    """Process pool producing derivatives, shared by all download threads"""
+
+    def __init__(self, download_dir, widths=DEFAULT_WIDTHS, formats=DEFAULT_FORMATS, max_workers=None):
+        self.download_dir = Path(download_dir)
+        self.widths = tuple(widths)
+        self.formats = supported_formats(formats)
+        self.executor = ProcessPoolExecutor(max_workers=max_workers or os.cpu_count())
+
+    def submit(self, source_path):
+        """Queue one image, returns a Future of its build_variants() result"""
+        return self.executor.submit(
+            build_variants, str(source_path), str(self.download_dir), self.widths, self.formats
+        )
+
+    def process(self, source_path):
+        """
+        Build derivatives and wait for them (called from download threads)
+
+        Returns:
+            dict: build_variants() result, None if the image could not be processed
+        """
+        try:
+            return self.submit(source_path).result()
+        except Exception as e:
+            print(f"      ⚠️  Derivatives failed for {Path(source_path).name}: {e}")
+            return None
+
+    def shutdown(self, wait=True):
+        self.executor.shutdown(wait=wait)
+
+
+def backfill(limit=None, widths=DEFAULT_WIDTHS, formats=DEFAULT_FORMATS, max_workers=None):
+    """Create derivatives for stored posts whose image_variants is still empty"""
+    from models import RawNewsFeed, session_scope
+
+    download_dir = Path("./downloads")
+    processor = ImagePostProcessor(download_dir, widths, formats, max_workers)
+    updated = 0
+
+    try:
+        with session_scope() as session:
+            query = session.query(RawNewsFeed).filter(
+                RawNewsFeed.image_variants.is_(None)
+            ).order_by(RawNewsFeed.id)
+            if limit:
+                query = query.limit(limit)
+
+            for feed in query:
+                paths = [download_dir / path for path in (feed.image_paths or [])]
+                if not any(path.exists() for path in paths):
+                    continue
+
+                # Keep entries aligned with image_paths (None for missing/broken files)
+                futures = [processor.submit(path) if path.exists() else None for path in paths]
+                variants = []
+                for future in futures:
+                    try:
+                        variants.append(future.result() if future else None)
+                    except Exception as e:
+                        print(f"   ⚠️  {feed.post_shortcode}: {e}")
+                        variants.append(None)
+
+                feed.image_variants = variants
+                updated += 1
+                print(f"   ✓ {feed.post_shortcode}: {sum(len(v['variants']) for v in variants if v)} derivatives")
+
+                if updated % 20 == 0:
+                    session.commit()
+    finally:
+        processor.shutdown()
+
+    print(f"\n✅ Derivatives created for {updated} posts")
+    return updated
+
+
+def parse_widths(value):
+    return tuple(sorted({int(width) for width in value.split(',') if width.strip()}))
+
+
+def parse_formats(value):
+    return tuple(fmt.strip().lower() for fmt in value.split(',') if fmt.strip())
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Create WebP/AVIF derivatives for stored posts')
+    parser.add_argument('--limit', type=int, default=None, help='Maximum posts to process')
+    parser.add_argument('--workers', type=int, default=None, help='Encoder processes (default: CPU count)')
+    parser.add_argument('--widths', type=str, default=','.join(map(str, DEFAULT_WIDTHS)),
+                        help='Comma separated widths (default: 320,640,1080)')
+    parser.add_argument('--formats', type=str, default=','.join(DEFAULT_FORMATS),
+                        help='Comma separated formats (default: webp,avif)')
+    args = parser.parse_args()
+
+    backfill(
+        limit=args.limit,
+        widths=parse_widths(args.widths),
+        formats=parse_formats(args.formats),
+        max_workers=args.workers,
+    )
+
+
+
+if __name__ == "__main__":
+    main()
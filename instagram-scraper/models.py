@@ -7,15 +7,22 @@ Note: Bot accounts no longer needed - using Apify API instead
 """
 
 from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime, JSON, create_engine
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from contextlib import contextmanager
 from datetime import datetime
+import logging
 import os
+import threading
+import time
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 Base = declarative_base()
 
 
@@ -56,6 +63,8 @@ class RawNewsFeed(Base):
                     comment='Post caption/description text')
     image_paths = Column(JSON, nullable=True,
                         comment='Array of local file paths to downloaded images')
+    image_variants = Column(JSON, nullable=True,
+                           comment='Per image: dimensions and WebP/AVIF derivative paths by width')
     likes_count = Column(Integer, nullable=True,
                         comment='Number of likes at scraping time')
     comments_count = Column(Integer, nullable=True,
@@ -76,6 +85,107 @@ class RawNewsFeed(Base):
         return f"<RawNewsFeed(shortcode='{self.post_shortcode}', source='{self.source_username}', status='{status}')>"
 
 
+class ImageHash(Base):
+    """
+    Perceptual hashes of downloaded images, for near-duplicate detection
+    across posts and accounts.
+    Table: sc_image_hashes
+    """
+    __tablename__ = 'sc_image_hashes'
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    image_hash = Column(String(32), nullable=False, index=True,
+                        comment='128-bit dHash (row + column gradients) as hex')
+    path = Column(String(500), nullable=False,
+                  comment='Image file path relative to downloads/')
+    post_shortcode = Column(String(50), nullable=False, index=True,
+                            comment='Post the image was first downloaded for')
+    source_username = Column(String(100), nullable=False,
+                             comment='Instagram username of that post')
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f"<ImageHash(hash='{self.image_hash}', path='{self.path}')>"
+
+
+class RawNewsFeedBuffer:
+    """
+    Write-behind buffer for RawNewsFeed rows
+    
+    Rows are collected in memory and written with a single
+    INSERT ... ON CONFLICT (post_shortcode) DO NOTHING per batch, flushed
+    every `batch_size` rows or `flush_interval` seconds. The age is checked
+    on add() and maybe_flush(), which producers call on every iteration so
+    rows are not held back while no new rows arrive.
+    Callers must call flush() on exit (including KeyboardInterrupt) so
+    buffered rows are not lost. Rows of a failed flush stay buffered and are
+    written by the next flush, so the buffer is empty only once every row
+    added so far has been stored.
+    """
+    
+    def __init__(self, session, batch_size=20, flush_interval=30.0):
+        self.session = session
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.rows = []
+        self.oldest_at = None
+        
+        # Totals across all flushes
+        self.inserted = 0
+        self.conflicts = 0
+        # Rows of the last failed flush, still buffered for the next one
+        self.failed = 0
+    
+    def add(self, **values):
+        """Queue one row, flushing if the batch is full or old enough"""
+        if not self.rows:
+            self.oldest_at = time.monotonic()
+        self.rows.append(values)
+        
+        if len(self.rows) >= self.batch_size:
+            self.flush()
+        else:
+            self.maybe_flush()
+    
+    def maybe_flush(self):
+        """Flush if the oldest buffered row has waited `flush_interval` seconds, returns number inserted"""
+        if self.rows and time.monotonic() - self.oldest_at >= self.flush_interval:
+            return self.flush()
+        return 0
+    
+    def flush(self):
+        """Write buffered rows in one statement, returns number inserted (rows are kept on failure)"""
+        if not self.rows:
+            return 0
+        
+        rows = self.rows
+        statement = pg_insert(RawNewsFeed.__table__).values(rows).on_conflict_do_nothing(
+            index_elements=['post_shortcode']
+        )
+        
+        try:
+            result = self.session.execute(statement)
+            self.session.commit()
+        except Exception as e:
+            self.session.rollback()
+            self.failed = len(rows)
+            # Retried by the next flush; restart the age so maybe_flush() does not retry on every post
+            self.oldest_at = time.monotonic()
+            logger.error("Failed to write %d buffered posts, kept for the next flush: %s", len(rows), e)
+            return 0
+        
+        self.rows = []
+        self.failed = 0
+        inserted = result.rowcount
+        self.inserted += inserted
+        self.conflicts += len(rows) - inserted
+        print(f"      💾 Flushed {len(rows)} posts to database ({inserted} new)")
+        return inserted
+    
+    def __len__(self):
+        return len(self.rows)
+
+
 # Database connection helper
 def get_database_url():
     """Get PostgreSQL connection URL from environment variables"""
@@ -89,23 +199,98 @@ def get_database_url():
 
 
 def create_db_engine():
-    """Create SQLAlchemy engine"""
+    """
+    Create a new SQLAlchemy engine with its own connection pool
+    
+    Pool settings come from the environment:
+    - DB_POOL_SIZE (default 5), DB_MAX_OVERFLOW (default 5)
+    - DB_POOL_RECYCLE seconds (default 1800), DB_POOL_PRE_PING (default true)
+    - DB_STATEMENT_TIMEOUT_MS (default 0 = no timeout)
+    
+    Prefer get_engine(), which reuses one engine per process.
+    """
     database_url = get_database_url()
-    engine = create_engine(database_url, echo=False)
+    
+    connect_args = {}
+    statement_timeout = int(os.getenv('DB_STATEMENT_TIMEOUT_MS', '0'))
+    if statement_timeout > 0:
+        connect_args['options'] = f"-c statement_timeout={statement_timeout}"
+    
+    engine = create_engine(
+        database_url,
+        echo=False,
+        pool_size=int(os.getenv('DB_POOL_SIZE', '5')),
+        max_overflow=int(os.getenv('DB_MAX_OVERFLOW', '5')),
+        pool_recycle=int(os.getenv('DB_POOL_RECYCLE', '1800')),
+        pool_pre_ping=os.getenv('DB_POOL_PRE_PING', 'true').lower() in ('1', 'true', 'yes'),
+        connect_args=connect_args,
+    )
     return engine
 
 
+_engine = None
+_session_factory = None
+_engine_lock = threading.Lock()
+
+
+def _ensure_engine():
+    """Create the engine on first use, returns (engine, session factory); caller holds _engine_lock"""
+    global _engine, _session_factory
+    
+    if _engine is None:
+        _engine = create_db_engine()
+        _session_factory = sessionmaker(bind=_engine)
+    
+    return _engine, _session_factory
+
+
+def get_engine():
+    """Get the process-wide engine, created lazily on first use"""
+    with _engine_lock:
+        return _ensure_engine()[0]
+
+
+def dispose_engine():
+    """Close all pooled connections (e.g. at shutdown or after fork)"""
+    global _engine, _session_factory
+    
+    with _engine_lock:
+        if _engine is not None:
+            _engine.dispose()
+        _engine = None
+        _session_factory = None
+
+
 def get_session():
-    """Get a new database session"""
-    engine = create_db_engine()
-    Session = sessionmaker(bind=engine)
-    return Session()
+    """Get a new database session bound to the shared engine"""
+    # Engine and factory are read together, a concurrent dispose_engine() cannot clear one in between
+    with _engine_lock:
+        session_factory = _ensure_engine()[1]
+    return session_factory()
+
+
+@contextmanager
+def session_scope():
+    """
+    Provide a transactional session: commit on success, rollback on error,
+    always close (returning the connection to the pool)
+    """
+    session = get_session()
+    try:
+        yield session
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
 
 
 if __name__ == "__main__":
     # Test connection
     try:
-        engine = create_db_engine()
+        with get_engine().connect():
+            pass
         print(f"✅ Database connection successful!")
         print(f"   URL: {get_database_url().replace(os.getenv('DB_PASSWORD', ''), '***')}")
     except Exception as e:
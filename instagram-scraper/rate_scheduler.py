@@ -0,0 +1,242 @@
+"""
+Rate Scheduler
+SMAN 1 Baleendah - News Feed Automation
+
+Paces every request the scraper makes to Instagram:
+- Token bucket: sustained `rate` requests per minute with bursts up to `burst`
+- Jitter on every wait so requests are not perfectly periodic
+- Exponential backoff (capped) after 429 / connection errors
+- Per-account state (tokens, backoff, daily count) persisted in
+  ratelimit-{username}.json next to the session file, so a restart does
+  not hand out a fresh burst
+"""
+
+import json
+import os
+import random
+import threading
+import time
+from datetime import datetime
+
+import instaloader
+
+
+class RateBudgetExhausted(Exception):
+    """Daily request budget of the bot account is used up"""
+
+
+class RateScheduler:
+    """Thread-safe token bucket shared by the post iterator and the media downloader"""
+
+    def __init__(self, state_file=None, rate=12.0, burst=10, jitter=0.5,
+                 backoff_base=30.0, backoff_cap=900.0, backoff_reset=600.0, daily_limit=None,
+                 clock=time.time, sleep=time.sleep):
+        """
+        Args:
+            state_file (str): JSON file holding the persisted budget (None: in-memory only)
+            rate (float): Sustained requests per minute
+            burst (int): Bucket capacity (requests allowed back-to-back)
+            jitter (float): Extra random wait, as a fraction of one request interval
+            backoff_base (float): First backoff in seconds, doubled per consecutive error
+            backoff_cap (float): Maximum backoff in seconds
+            backoff_reset (float): Seconds without errors after which backoff starts over
+            daily_limit (int): Maximum requests per UTC day (None: unlimited)
+            clock (callable): Wall-clock time in seconds since the epoch
+            sleep (callable): Waits the given number of seconds
+        """
+        self.state_file = state_file
+        self.rate = rate / 60.0
+        self.burst = float(burst)
+        self.jitter = jitter
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.backoff_reset = backoff_reset
+        self.daily_limit = daily_limit
+        self.clock = clock
+        self.sleep = sleep
+
+        # Bucket state, wall clock so it can be persisted.
+        # `updated_at` in the future means the bucket is paused (backoff).
+        self.tokens = self.burst
+        self.updated_at = self.clock()
+        self.strikes = 0
+        self.last_error_at = 0.0
+        self.day = self._today()
+        self.requests_today = 0
+
+        self.total_requests = 0
+        self.total_wait = 0.0
+        self.total_backoffs = 0
+
+        self._lock = threading.Lock()
+        self._last_save = 0.0
+        self.load()
+
+    def _today(self):
+        return datetime.utcfromtimestamp(self.clock()).date().isoformat()
+
+    def load(self, state_file=None):
+        """
+        Restore the persisted budget, tokens refill for the time spent offline
+
+        Args:
+            state_file (str): Switch to this file (e.g. once the bot account is known)
+        """
+        if state_file:
+            self.state_file = state_file
+        if not self.state_file or not os.path.exists(self.state_file):
+            return
+
+        try:
+            with open(self.state_file, 'r') as f:
+                state = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"⚠️  Ignoring unreadable rate state {self.state_file}: {e}")
+            return
+
+        with self._lock:
+            self._restore(state)
+
+    def _restore(self, state):
+        self.tokens = min(self.burst, float(state.get('tokens', self.burst)))
+        self.updated_at = float(state.get('updated_at', self.updated_at))
+        self.strikes = int(state.get('strikes', 0))
+        self.last_error_at = float(state.get('last_error_at', 0.0))
+        if state.get('day') == self.day:
+            self.requests_today = int(state.get('requests_today', 0))
+
+        self._refill(self.clock())
+
+    def save(self):
+        """Write the budget atomically"""
+        if not self.state_file:
+            return
+
+        with self._lock:
+            state = {
+                'tokens': round(self.tokens, 3),
+                'updated_at': self.updated_at,
+                'strikes': self.strikes,
+                'last_error_at': self.last_error_at,
+                'day': self.day,
+                'requests_today': self.requests_today,
+            }
+            self._last_save = self.clock()
+
+        tmp_file = f"{self.state_file}.tmp"
+        with open(tmp_file, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp_file, self.state_file)
+
+    def _refill(self, now):
+        """Add tokens for the time elapsed since the last update (not while paused)"""
+        if now > self.updated_at:
+            self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+
+    def acquire(self, cost=1.0):
+        """
+        Reserve `cost` tokens and sleep until the request may be sent
+
+        Reservations are taken under the lock and may drive the bucket
+        negative, so concurrent callers queue up in order without holding
+        the lock while sleeping.
+
+        Returns:
+            float: Seconds waited
+
+        Raises:
+            RateBudgetExhausted: When the daily limit is reached
+        """
+        with self._lock:
+            now = self.clock()
+
+            today = self._today()
+            if today != self.day:
+                self.day = today
+                self.requests_today = 0
+
+            if self.daily_limit is not None and self.requests_today >= self.daily_limit:
+                raise RateBudgetExhausted(
+                    f"Daily budget of {self.daily_limit} requests used up, resets at 00:00 UTC"
+                )
+
+            self._refill(now)
+            self.tokens -= cost
+            self.requests_today += 1
+            self.total_requests += 1
+
+            wait = max(self.updated_at - now, 0.0) + max(-self.tokens, 0.0) / self.rate
+            wait += random.uniform(0, self.jitter / self.rate)
+            self.total_wait += wait
+
+            save_due = now - self._last_save > 5.0
+
+        if save_due:
+            self.save()
+
+        if wait > 0:
+            self.sleep(wait)
+        return wait
+
+    def penalize(self, reason=''):
+        """
+        Back off after a 429 or connection error
+
+        Empties the bucket and pauses it for base * 2^strikes seconds
+        (capped, with jitter). Strikes reset after `backoff_reset` seconds
+        without errors.
+
+        Returns:
+            float: Backoff in seconds
+        """
+        with self._lock:
+            now = self.clock()
+
+            if now - self.last_error_at > self.backoff_reset:
+                self.strikes = 0
+
+            backoff = min(self.backoff_cap, self.backoff_base * (2 ** self.strikes))
+            backoff = random.uniform(backoff / 2, backoff)
+
+            self.tokens = 0.0
+            self.updated_at = max(self.updated_at, now) + backoff
+            self.strikes += 1
+            self.last_error_at = now
+            self.total_backoffs += 1
+
+        print(f"      ⏸️  Backing off {backoff:.0f}s{f' ({reason})' if reason else ''}...")
+        self.save()
+        return backoff
+
+    def stats(self):
+        """Counters for the run summary"""
+        return {
+            'requests': self.total_requests,
+            'wait_seconds': round(self.total_wait, 1),
+            'backoffs': self.total_backoffs,
+            'requests_today': self.requests_today,
+        }
+
+
+class SchedulerRateController(instaloader.RateController):
+    """
+    Instaloader rate controller that draws from a RateScheduler
+
+    Instaloader's own per-query-type limits still apply, every GraphQL/API
+    call additionally takes a token, and 429 responses trigger the
+    scheduler's backoff before Instaloader retries.
+    """
+
+    def __init__(self, context, scheduler):
+        super().__init__(context)
+        self.scheduler = scheduler
+
+    def wait_before_query(self, query_type):
+        super().wait_before_query(query_type)
+        self.scheduler.acquire()
+
+    def handle_429(self, query_type):
+        self._context.error("Instagram responded with HTTP error \"429 - Too Many Requests\".",
+                            repeat_at_end=False)
+        self.scheduler.penalize(reason='429 Too Many Requests')
@@ -4,33 +4,151 @@ SMAN 1 Baleendah - News Feed Automation
 
 Features:
 - Session-based authentication (persistent login)
+- Several target profiles per run, sharing session and rate budget
+- Optional JSON / NDJSON results on stdout for programmatic callers
+- Resumable checkpoints for deep backfills (--resume)
 - Duplicate detection (via post_shortcode)
-- Random delays for human-like behavior
+- Token-bucket rate scheduling with jitter and backoff (persisted per account)
+- Concurrent image downloads sharing the same rate budget
+- WebP/AVIF derivatives at several widths, encoded on a process pool
+- Perceptual-hash dedup of images across posts and accounts
 - Error handling with account deactivation
 - Graceful rate limit handling
 """
 
 import instaloader
 import time
-import random
 import argparse
 import os
+import signal
 import sys
+from collections import deque
+from itertools import chain
 from datetime import datetime
 from pathlib import Path
-from models import BotAccount, RawNewsFeed, get_session
-from sqlalchemy.exc import IntegrityError
+from checkpoints import CheckpointStore
+from downloader import MediaDownloader
+from events import EventStream
+from image_dedup import ImageHashIndex
+from image_variants import DEFAULT_FORMATS, DEFAULT_WIDTHS, ImagePostProcessor, parse_formats, parse_widths
+from rate_scheduler import RateBudgetExhausted, RateScheduler, SchedulerRateController
+from models import BotAccount, RawNewsFeed, RawNewsFeedBuffer, get_session
+from sqlalchemy import func
 
 # Fix Unicode encoding for Windows console
 if sys.platform == 'win32':
     sys.stdout.reconfigure(encoding='utf-8')
+    sys.stderr.reconfigure(encoding='utf-8')
+
+
+class TargetRun:
+    """State of one target profile while targets are scraped interleaved"""
+    
+    def __init__(self, username, buffer, label='', resume=False):
+        self.username = username
+        self.buffer = buffer
+        self.label = label
+        self.resume = resume
+        self.profile = None
+        self.iterator = None
+        self.posts = None
+        self.seen = 0
+        self.progress = {}
+        self.target_dir = None
+        self.watermark = None
+        self.consecutive_known = 0
+        self.pending = deque()
+        # Posts whose images failed ({'shortcode', 'index'}), and those from
+        # the checkpoint still to be retried; both are stored with the checkpoint
+        self.failed = []
+        self.retry = deque()
+        self.stats = {'scraped': 0, 'skipped': 0, 'errors': 0}
+        self.bytes = 0
+        self.linked_images = 0
+        self.status = 'pending'
+        self.done = False
+        self.reported = False
+        self.started_at = time.monotonic()
+        self.finished_at = None
+    
+    def finish(self, status):
+        self.status = status
+        self.done = True
+        self.finished_at = time.monotonic()
+    
+    def elapsed(self):
+        return (self.finished_at or time.monotonic()) - self.started_at
+    
+    def counts(self):
+        """Final counts, rows that hit ON CONFLICT were stored under another source_username"""
+        return {
+            'scraped': self.stats['scraped'] - self.buffer.conflicts - self.buffer.failed,
+            'skipped': self.stats['skipped'] + self.buffer.conflicts,
+            'errors': self.stats['errors'] + self.buffer.failed,
+        }
+    
+    def position(self):
+        """Posts of the feed walked so far, including earlier resumed runs"""
+        return self.iterator.total_index if self.iterator is not None else 0
+    
+    def checkpoint_progress(self):
+        """Progress stored with the checkpoint, accumulated over resumed runs"""
+        counts = self.counts()
+        return {
+            'position': self.position(),
+            'runs': self.progress.get('runs', 0) + 1,
+            'scraped': self.progress.get('scraped', 0) + counts['scraped'],
+            'skipped': self.progress.get('skipped', 0) + counts['skipped'],
+            'errors': self.progress.get('errors', 0) + counts['errors'],
+            'failed': list({entry['shortcode']: entry for entry in chain(self.failed, self.retry)}.values()),
+        }
+    
+    def to_dict(self):
+        """Per-target result for JSON output"""
+        return {
+            'target': self.username,
+            'status': self.status,
+            **self.counts(),
+            'bytes': self.bytes,
+            'linked_images': self.linked_images,
+            'seconds': round(self.elapsed(), 2),
+            'position': self.position(),
+            'resumed_from': self.progress.get('position'),
+        }
 
 
 class InstagramScraper:
-    def __init__(self):
+    def __init__(self, download_workers=4, rate=12.0, burst=10, daily_limit=None, events=None,
+                 variant_widths=DEFAULT_WIDTHS, variant_formats=DEFAULT_FORMATS, variant_workers=None,
+                 dedup='link', dedup_distance=6):
+        """
+        Args:
+            download_workers (int): Threads downloading images concurrently
+            rate (float): Sustained requests per minute (API calls and images)
+            burst (int): Requests allowed back-to-back when the budget is full
+            daily_limit (int): Maximum requests per day for the bot account
+            events (EventStream): Machine-readable result output (disabled if None)
+            variant_widths (tuple): Widths of WebP/AVIF derivatives (empty: no derivatives)
+            variant_formats (tuple): Derivative formats
+            variant_workers (int): Encoder processes (default: CPU count)
+            dedup (str): Near-duplicate images: 'link' to the stored file, 'skip' posts
+                         whose images are all duplicates, or 'off'
+            dedup_distance (int): Max differing hash bits (of 128) for a near-duplicate
+        """
+        self.events = events or EventStream()
+        self.checkpoints = CheckpointStore()
         self.L = None
+        self.downloader = None
+        self.download_workers = download_workers
+        self.variant_widths = tuple(variant_widths)
+        self.variant_formats = tuple(variant_formats)
+        self.variant_workers = variant_workers
+        self.dedup = dedup
+        self.hash_index = ImageHashIndex(max_distance=dedup_distance) if dedup != 'off' else None
+        self.scheduler = RateScheduler(rate=rate, burst=burst, daily_limit=daily_limit)
         self.bot_account = None
         self.session = get_session()
+        self.known_shortcodes = set()
         self.download_dir = Path("./downloads")
         self.download_dir.mkdir(exist_ok=True)
         
@@ -59,6 +177,7 @@ class InstagramScraper:
             post_metadata_txt_pattern='',    # No metadata txt
             max_connection_attempts=3,
             request_timeout=30,
+            rate_controller=lambda context: SchedulerRateController(context, self.scheduler),
         )
         
         # Set custom User-Agent to avoid detection
@@ -67,6 +186,20 @@ class InstagramScraper:
             'AppleWebKit/537.36 (KHTML, like Gecko) '
             'Chrome/120.0.0.0 Safari/537.36'
         )
+        
+        postprocessor = None
+        if self.variant_widths and self.variant_formats:
+            postprocessor = ImagePostProcessor(
+                self.download_dir, self.variant_widths, self.variant_formats, self.variant_workers
+            )
+        
+        if self.hash_index is not None:
+            print(f"🧬 Image hashes loaded for dedup: {self.hash_index.load(self.session)}")
+        
+        self.downloader = MediaDownloader(
+            self.L, self.scheduler, max_workers=self.download_workers,
+            postprocessor=postprocessor, hash_index=self.hash_index,
+        )
     
     def login_with_session(self):
         """
@@ -88,6 +221,9 @@ class InstagramScraper:
         password = self.bot_account.password
         session_file = f"session-{username}"
         
+        # Rate budget of this account survives restarts
+        self.scheduler.load(f"ratelimit-{username}.json")
+        
         print(f"🔐 Authenticating as: {username}")
         
         try:
@@ -139,142 +275,491 @@ class InstagramScraper:
             self.session.commit()
             print(f"   ⚠️  Bot account deactivated in database")
     
+    def load_known_shortcodes(self, source_username):
+        """
+        Preload shortcodes already stored for a profile (single query)
+        
+        Duplicate checks during scraping then become in-memory set lookups
+        instead of one SELECT per post. Shortcodes are unique across
+        Instagram, so the sets of several targets share one lookup set.
+        """
+        rows = self.session.query(RawNewsFeed.post_shortcode).filter_by(
+            source_username=source_username
+        ).all()
+        
+        known = {row[0] for row in rows}
+        self.known_shortcodes |= known
+        return known
+    
+    def get_watermark(self, source_username):
+        """Newest stored post_date for a profile (None if nothing stored yet)"""
+        return self.session.query(func.max(RawNewsFeed.post_date)).filter_by(
+            source_username=source_username
+        ).scalar()
+    
     def is_already_scraped(self, shortcode):
-        """Check if post already exists in database"""
-        exists = self.session.query(RawNewsFeed).filter_by(post_shortcode=shortcode).first()
-        return exists is not None
+        """Check if post already exists in database (uses preloaded shortcodes)"""
+        return shortcode in self.known_shortcodes
+    
+    def scrape_profile(self, target_username, **kwargs):
+        """Scrape a single target profile (see scrape_profiles for arguments)"""
+        return self.scrape_profiles([target_username], **kwargs)
     
-    def scrape_profile(self, target_username, max_posts=50):
+    def scrape_profiles(self, target_usernames, max_posts=50, incremental=False, stop_after=5,
+                        batch_size=20, flush_interval=30.0, resume=False, checkpoint_every=12):
         """
-        Scrape posts from a target Instagram profile
+        Scrape posts from one or more target Instagram profiles
         
         Args:
-            target_username (str): Instagram username to scrape
-            max_posts (int): Maximum number of posts to scrape
+            target_usernames (list): Instagram usernames to scrape
+            max_posts (int): Maximum number of posts to scrape per target
+            incremental (bool): Stop early once the already-ingested part of the feed is reached
+            stop_after (int): Incremental mode: stop after this many consecutive known posts
+            batch_size (int): Rows per bulk insert
+            flush_interval (float): Max seconds a row waits in the write buffer
+            resume (bool): Continue each target's feed from its last checkpoint
+            checkpoint_every (int): Resume mode: save a checkpoint every N posts
+        
+        Returns:
+            list: TargetRun per target (stats and final status)
+        
+        Targets share the login session, database session, download pool
+        and rate budget. They are interleaved round-robin, one post per
+        target per turn, so a large profile does not starve the others.
+        
+        Incremental mode treats a post as known if its shortcode is stored or it
+        is not newer than the newest stored post_date (the watermark). Pinned
+        posts are skipped without counting, since they sit at the head of the
+        feed regardless of age.
+        
+        Resume mode walks the feed in successive runs (deep backfills):
+        the iterator position is checkpointed every `checkpoint_every`
+        posts and on exit, and kept after `max_posts` is reached. Once the
+        end of the feed is reached the checkpoint is removed. Checkpoints
+        are only written after all earlier posts are stored, so posts that
+        were still downloading are never skipped on resume. Posts whose
+        images failed are listed in the checkpoint and retried first.
         """
-        print(f"\n📸 Scraping Instagram profile: @{target_username}")
-        print(f"   Max posts: {max_posts}")
+        multiple = len(target_usernames) > 1
+        
+        print(f"\n📸 Scraping Instagram profile{'s' if multiple else ''}: "
+              f"{', '.join('@' + username for username in target_usernames)}")
+        print(f"   Max posts: {max_posts}{' per target' if multiple else ''}")
+        if incremental:
+            print(f"   Incremental: stop after {stop_after} consecutive known posts")
+        if resume:
+            print(f"   Resume: continue from checkpoints, save every {checkpoint_every} posts")
         print(f"   Download directory: {self.download_dir.absolute()}\n")
         
+        runs = [
+            TargetRun(
+                username,
+                RawNewsFeedBuffer(self.session, batch_size=batch_size, flush_interval=flush_interval),
+                label=f"@{username} " if multiple else '',
+                resume=resume,
+            )
+            for username in target_usernames
+        ]
+        
+        # Posts whose images are still downloading, per target (FIFO)
+        max_pending = self.download_workers * 2
+        fatal = None
+        
+        self.events.emit('start', targets=list(target_usernames), max_posts=max_posts, incremental=incremental)
+        
         try:
-            # Load profile
-            profile = instaloader.Profile.from_username(self.L.context, target_username)
+            for run in runs:
+                self._start_target(run, incremental)
+                if run.done:
+                    self._finish_target(run)
             
-            print(f"✓ Profile loaded:")
-            print(f"  - Full Name: {profile.full_name}")
-            print(f"  - Posts: {profile.mediacount}")
-            print(f"  - Followers: {profile.followers}")
-            print(f"  - Following: {profile.followees}\n")
+            active = [run for run in runs if not run.done]
+            while active:
+                for run in active:
+                    self._scrape_next_post(run, max_posts, incremental, stop_after, max_pending)
+                    if run.done:
+                        self._finish_target(run)
+                    elif run.resume and run.seen % checkpoint_every == 0:
+                        self._save_checkpoint(run)
+                active = [run for run in active if not run.done]
             
-            # Create target-specific download directory
-            target_dir = self.download_dir / target_username
-            target_dir.mkdir(exist_ok=True)
+        except RateBudgetExhausted as e:
+            print(f"\n⏹️  {e}")
+            for run in runs:
+                if not run.done:
+                    run.finish('budget exhausted')
             
-            scraped_count = 0
-            skipped_count = 0
-            error_count = 0
+        except instaloader.exceptions.LoginRequiredException:
+            print(f"❌ Login required (session expired?)")
+            print(f"   Delete session file and try again")
+            fatal = 'login required'
             
-            # Iterate through posts
-            for i, post in enumerate(profile.get_posts(), 1):
-                if i > max_posts:
-                    print(f"\n⏸️  Reached max posts limit ({max_posts})")
-                    break
-                
-                shortcode = post.shortcode
-                
-                # Check for duplicates
-                if self.is_already_scraped(shortcode):
-                    print(f"[{i:3d}] ⏭️  Skipped (duplicate): {shortcode}")
-                    skipped_count += 1
-                    continue
-                
-                try:
-                    print(f"[{i:3d}] 📥 Downloading: {shortcode}...")
-                    
-                    # Download post
-                    self.L.download_post(post, target=str(target_dir))
-                    
-                    # Find downloaded image paths
-                    image_files = list(target_dir.glob(f"*{shortcode}*.jpg")) + \
-                                 list(target_dir.glob(f"*{shortcode}*.png"))
-                    
-                    image_paths = [str(f.relative_to(self.download_dir)) for f in image_files]
-                    
-                    # Save to database
-                    feed = RawNewsFeed(
-                        post_shortcode=shortcode,
-                        source_username=target_username,
-                        caption=post.caption if post.caption else '',
-                        image_paths=image_paths,
-                        likes_count=post.likes,
-                        comments_count=post.comments,
-                        post_date=post.date_utc,
-                        scraped_at=datetime.utcnow(),
-                        is_processed=False  # Ready for AI processing
-                    )
-                    
-                    self.session.add(feed)
-                    self.session.commit()
-                    
-                    print(f"      ✅ Saved to database")
-                    print(f"      📷 Images: {len(image_paths)}")
-                    print(f"      ❤️  Likes: {post.likes}")
-                    scraped_count += 1
-                    
-                    # Human-like delay (10-20 seconds)
-                    delay = random.randint(10, 20)
-                    print(f"      😴 Sleeping {delay}s...\n")
-                    time.sleep(delay)
-                    
-                except IntegrityError:
-                    self.session.rollback()
-                    print(f"      ⚠️  Database constraint error (duplicate?)")
-                    skipped_count += 1
-                    
-                except instaloader.exceptions.QueryReturnedNotFoundException:
-                    print(f"      ❌ Post not found or deleted")
-                    error_count += 1
-                    
-                except instaloader.exceptions.ConnectionException as e:
-                    print(f"      ❌ Connection error: {e}")
-                    print(f"      ⏸️  Pausing for 60 seconds...")
-                    time.sleep(60)
-                    error_count += 1
-                    
-                except Exception as e:
-                    print(f"      ❌ Error: {e}")
-                    error_count += 1
+        except KeyboardInterrupt:
+            # Ctrl+C or SIGTERM: still write everything and report, then stop the caller too
+            fatal = 'interrupted'
+            raise
             
-            # Summary
-            print("\n╔══════════════════════════════════════════════════════════════════════════════╗")
-            print("║                           SCRAPING COMPLETED                                 ║")
-            print("╚══════════════════════════════════════════════════════════════════════════════╝\n")
-            print(f"📊 Summary:")
-            print(f"   ✅ Successfully scraped: {scraped_count}")
-            print(f"   ⏭️  Skipped (duplicates): {skipped_count}")
-            print(f"   ❌ Errors: {error_count}")
-            print(f"   📁 Download directory: {target_dir.absolute()}")
-            print()
-            print(f"Next Steps:")
-            print(f"   1️⃣  Check scraped data: SELECT * FROM sc_raw_news_feeds WHERE is_processed=false;")
-            print(f"   2️⃣  Run AI News Generator to process feeds")
-            print()
+        except Exception as e:
+            print(f"❌ Fatal error: {e}")
+            fatal = str(e)
+        
+        finally:
+            # Wait for downloads and flush on every exit (also fatal error or KeyboardInterrupt)
+            for run in runs:
+                self._finish_target(run)
             
+            if fatal is None:
+                self._print_summary(runs)
+            self._emit_summary(runs, error=fatal)
+        
+        return runs
+    
+    def _start_target(self, run, incremental):
+        """Load the profile and duplicate-detection state of a target"""
+        try:
+            run.profile = instaloader.Profile.from_username(self.L.context, run.username)
         except instaloader.exceptions.ProfileNotExistsException:
-            print(f"❌ Profile @{target_username} does not exist")
+            print(f"❌ Profile @{run.username} does not exist")
+            run.finish('not found')
+            return
+        except (RateBudgetExhausted, instaloader.exceptions.LoginRequiredException):
+            raise
+        except Exception as e:
+            print(f"❌ Failed to load profile @{run.username}: {e}")
+            run.stats['errors'] += 1
+            self.events.emit('error', target=run.username, error=str(e))
+            run.finish('failed')
+            return
+        
+        print(f"✓ Profile loaded: @{run.username}")
+        print(f"  - Full Name: {run.profile.full_name}")
+        print(f"  - Posts: {run.profile.mediacount}")
+        print(f"  - Followers: {run.profile.followers}")
+        print(f"  - Following: {run.profile.followees}")
+        
+        # Create target-specific download directory
+        run.target_dir = self.download_dir / run.username
+        run.target_dir.mkdir(exist_ok=True)
+        
+        # Preload known posts for duplicate detection
+        known = self.load_known_shortcodes(run.username)
+        run.watermark = self.get_watermark(run.username) if incremental else None
+        print(f"✓ Known posts in database: {len(known)}")
+        if run.watermark:
+            print(f"✓ Watermark (newest stored post): {run.watermark}")
+        print()
+        
+        run.iterator = run.profile.get_posts()
+        if run.resume:
+            run.progress = self.checkpoints.restore(run.username, run.iterator) or {}
+            run.retry = deque(run.progress.get('failed', []))
+            if run.progress:
+                print(f"↪️  Resuming @{run.username} at post {run.iterator.total_index + 1} "
+                      f"({run.progress.get('scraped', 0)} scraped in {run.progress.get('runs', 0)} earlier run(s))")
+                if run.retry:
+                    print(f"↪️  Retrying {len(run.retry)} post(s) whose images failed last time")
+                print()
+        
+        run.posts = chain(self._retry_posts(run), enumerate(run.iterator, run.iterator.total_index + 1))
+        run.status = 'running'
+    
+    def _retry_posts(self, run):
+        """Yield (index, post) for the checkpoint's failed posts, fetched by shortcode"""
+        while run.retry:
+            entry = run.retry[0]
+            try:
+                post = instaloader.Post.from_shortcode(self.L.context, entry['shortcode'])
+            except instaloader.exceptions.QueryReturnedNotFoundException:
+                print(f"      ⏭️  {entry['shortcode']}: post no longer exists, not retried")
+                run.retry.popleft()
+                continue
+            except instaloader.exceptions.ConnectionException as e:
+                print(f"      ❌ {entry['shortcode']}: cannot fetch post for retry: {e}")
+                self.scheduler.penalize(reason='connection error')
+                run.failed.append(run.retry.popleft())
+                continue
             
-        except instaloader.exceptions.LoginRequiredException:
-            print(f"❌ Login required (session expired?)")
-            print(f"   Delete session file and try again")
+            yield entry['index'], post
+            # Only dropped once handled, a run stopped by max_posts keeps it
+            run.retry.popleft()
+    
+    def _scrape_next_post(self, run, max_posts, incremental, stop_after, max_pending):
+        """
+        Process the next post of a target (producer: metadata only, downloads run on the pool)
+        
+        Marks the run done when its feed, post limit or known part of the
+        feed is reached.
+        """
+        # Rows queued earlier must not wait for the next add() (skips, slow pages)
+        run.buffer.maybe_flush()
+        
+        fetch_started = time.monotonic()
+        try:
+            i, post = next(run.posts)
+            run.seen += 1
+        except StopIteration:
+            run.finish('completed')
+            return
+        except (RateBudgetExhausted, instaloader.exceptions.LoginRequiredException):
+            raise
+        except instaloader.exceptions.ConnectionException as e:
+            # The post iterator cannot continue after a failed page request
+            print(f"❌ [{run.label.strip() or run.username}] Connection error: {e}")
+            self.scheduler.penalize(reason='connection error')
+            run.stats['errors'] += 1
+            self.events.emit('error', target=run.username, error=str(e))
+            run.finish('connection error')
+            return
+        
+        if run.seen > max_posts:
+            print(f"\n⏸️  {run.label}Reached max posts limit ({max_posts})")
+            run.finish('max posts')
+            return
+        
+        shortcode = post.shortcode
+        
+        # Check for duplicates
+        is_known = self.is_already_scraped(shortcode) or (
+            run.watermark is not None and post.date_utc <= run.watermark
+        )
+        
+        if is_known:
+            print(f"[{run.label}{i:3d}] ⏭️  Skipped (duplicate): {shortcode}")
+            run.stats['skipped'] += 1
+            self.events.emit('post', status='skipped', target=run.username, shortcode=shortcode, index=i)
+            
+            if incremental and not getattr(post, 'is_pinned', False):
+                run.consecutive_known += 1
+                if run.consecutive_known >= stop_after:
+                    print(f"\n⏹️  {run.label}Reached {stop_after} consecutive known posts, feed is up to date")
+                    run.finish('up to date')
+            return
+        
+        run.consecutive_known = 0
+        
+        try:
+            print(f"[{run.label}{i:3d}] 📥 Downloading: {shortcode}...")
+            
+            # Snapshot metadata now, images download in the background
+            row = dict(
+                post_shortcode=shortcode,
+                source_username=run.username,
+                caption=post.caption if post.caption else '',
+                likes_count=post.likes,
+                comments_count=post.comments,
+                post_date=post.date_utc,
+                is_processed=False  # Ready for AI processing
+            )
+            timing = {'index': i, 'fetch_seconds': round(time.monotonic() - fetch_started, 3)}
+            run.pending.append((self.downloader.submit_post(post, run.target_dir), row, timing))
+            self.known_shortcodes.add(shortcode)
+            
+            print(f"      ❤️  Likes: {post.likes}")
+            
+            # Write out posts whose downloads finished (wait if too many are in flight)
+            self._drain_downloads(run)
+            while len(run.pending) > max_pending:
+                self._drain_downloads(run, wait=True, limit=1)
+            
+        except RateBudgetExhausted:
+            raise
+            
+        except instaloader.exceptions.QueryReturnedNotFoundException:
+            print(f"      ❌ Post not found or deleted")
+            run.stats['errors'] += 1
+            self._emit_post_error(run, shortcode, i, 'post not found or deleted')
+            
+        except instaloader.exceptions.ConnectionException as e:
+            print(f"      ❌ Connection error: {e}")
+            self.scheduler.penalize(reason='connection error')
+            run.stats['errors'] += 1
+            self._emit_post_error(run, shortcode, i, str(e))
             
         except Exception as e:
-            print(f"❌ Fatal error: {e}")
+            print(f"      ❌ Error: {e}")
+            run.stats['errors'] += 1
+            self._emit_post_error(run, shortcode, i, str(e))
+    
+    def _emit_post_error(self, run, shortcode, index, error):
+        self.events.emit('post', status='error', target=run.username, shortcode=shortcode,
+                         index=index, error=error)
+    
+    def _finish_target(self, run):
+        """Wait for a target's remaining downloads, then write its buffered rows"""
+        if run.pending:
+            self._drain_downloads(run, wait=True)
+        if len(run.buffer):
+            run.buffer.flush()
+        if self.hash_index is not None:
+            self.hash_index.flush(self.session)
+        if not run.done:
+            run.finish('interrupted')
+        
+        if run.resume and run.iterator is not None and not run.reported:
+            if len(run.buffer):
+                # Rows not stored: keep the previous checkpoint so --resume walks these posts again
+                print(f"⚠️  @{run.username}: database write failed, checkpoint not advanced")
+            elif run.status == 'completed' and not run.failed:
+                self.checkpoints.clear(run.username)
+                print(f"✓ @{run.username}: end of feed reached, checkpoint removed")
+            else:
+                self.checkpoints.save(run.username, run.iterator, run.checkpoint_progress())
+                print(f"💾 @{run.username}: checkpoint saved ({run.status}, {run.position()} posts walked)")
+        
+        if not run.reported:
+            run.reported = True
+            self.events.emit('target', **run.to_dict())
+    
+    def _save_checkpoint(self, run):
+        """Store all pending posts, then checkpoint the iterator position (only once they are stored)"""
+        self._drain_downloads(run, wait=True)
+        if len(run.buffer):
+            run.buffer.flush()
+        if self.hash_index is not None:
+            self.hash_index.flush(self.session)
+        if len(run.buffer):
+            # The failed rows stay buffered; the checkpoint must not move past them
+            print(f"⚠️  @{run.username}: database write failed, checkpoint not advanced")
+            return
+        self.checkpoints.save(run.username, run.iterator, run.checkpoint_progress())
+    
+    def _drain_downloads(self, run, wait=False, limit=None):
+        """
+        Queue database rows for posts whose image downloads have finished
+        
+        Posts are handled in the order they were scraped. Without `wait`,
+        stops at the first post that is still downloading. A post with a
+        failed image is not stored but recorded in `run.failed`, so the next
+        run retries it (resume mode keeps it in the checkpoint).
+        """
+        drained = 0
+        
+        while run.pending and (wait or run.pending[0][0].done()):
+            if limit is not None and drained >= limit:
+                break
+            
+            download, row, timing = run.pending.popleft()
+            paths, errors = download.result()
+            drained += 1
+            
+            if errors:
+                print(f"      ❌ {download.shortcode}: {len(errors)} image(s) failed: {errors[0]}")
+                self.known_shortcodes.discard(download.shortcode)
+                run.failed.append({'shortcode': download.shortcode, 'index': timing['index']})
+                run.stats['errors'] += 1
+                self._emit_post_error(run, download.shortcode, timing['index'], str(errors[0]))
+                
+                if any(isinstance(e, instaloader.exceptions.ConnectionException) for e in errors):
+                    self.scheduler.penalize(reason='connection error')
+                continue
+            
+            duplicates = download.duplicates()
+            if self.dedup == 'skip' and paths and all(duplicates):
+                print(f"      ⏭️  {download.shortcode}: all images are near-duplicates of stored posts, skipped")
+                run.stats['skipped'] += 1
+                self.events.emit('post', status='skipped', target=run.username, shortcode=download.shortcode,
+                                 index=timing['index'], reason='duplicate images')
+                continue
+            
+            image_paths = [str(path.relative_to(self.download_dir)) for path in paths]
+            
+            # Queue for database (bulk insert, duplicates ignored)
+            image_variants = download.variants()
+            if not any(image_variants):
+                image_variants = None  # Left for `python image_variants.py` to backfill
+            run.buffer.add(image_paths=image_paths, image_variants=image_variants,
+                           scraped_at=datetime.utcnow(), **row)
+            size = sum(path.stat().st_size for path, linked in zip(paths, duplicates) if not linked)
+            run.stats['scraped'] += 1
+            run.bytes += size
+            run.linked_images += sum(duplicates)
+            linked_note = f", {sum(duplicates)} linked to existing duplicates" if any(duplicates) else ''
+            print(f"      ✅ {download.shortcode}: {len(image_paths)} image(s){linked_note}, queued for database")
+            
+            self.events.emit('post', status='scraped', target=run.username, shortcode=download.shortcode,
+                             images=len(image_paths), linked_images=sum(duplicates), bytes=size,
+                             download_seconds=round(download.seconds(), 3), **timing)
+    
+    def _emit_summary(self, runs, error=None):
+        """Final machine-readable result (JSON / NDJSON modes)"""
+        targets = [run.to_dict() for run in runs]
+        self.events.summary(
+            ok=error is None,
+            error=error,
+            scraped=sum(target['scraped'] for target in targets),
+            skipped=sum(target['skipped'] for target in targets),
+            errors=sum(target['errors'] for target in targets),
+            bytes=sum(target['bytes'] for target in targets),
+            requests=self.scheduler.stats(),
+            targets=targets,
+        )
+    
+    def _print_summary(self, runs):
+        """Totals over all targets, plus a line per target when there are several"""
+        totals = {'scraped': 0, 'skipped': 0, 'errors': 0}
+        for run in runs:
+            for key, value in run.counts().items():
+                totals[key] += value
+        
+        print("\n╔══════════════════════════════════════════════════════════════════════════════╗")
+        print("║                           SCRAPING COMPLETED                                 ║")
+        print("╚══════════════════════════════════════════════════════════════════════════════╝\n")
+        
+        if len(runs) > 1:
+            print(f"🎯 Targets:")
+            for run in runs:
+                counts = run.counts()
+                print(f"   @{run.username:<30} ✅ {counts['scraped']:3d}  ⏭️  {counts['skipped']:3d}  "
+                      f"❌ {counts['errors']:3d}  ({run.status}, {run.elapsed():.0f}s)")
+            print()
+        
+        print(f"📊 Summary:")
+        print(f"   ✅ Successfully scraped: {totals['scraped']}")
+        print(f"   ⏭️  Skipped (duplicates): {totals['skipped']}")
+        print(f"   ❌ Errors: {totals['errors']}")
+        rate = self.scheduler.stats()
+        print(f"   ⏱️  Requests: {rate['requests']} (waited {rate['wait_seconds']}s, "
+              f"{rate['backoffs']} backoffs, {rate['requests_today']} today)")
+        if len(runs) == 1 and runs[0].target_dir:
+            print(f"   📁 Download directory: {runs[0].target_dir.absolute()}")
+        else:
+            print(f"   📁 Download directory: {self.download_dir.absolute()}")
+        print()
+        print(f"Next Steps:")
+        print(f"   1️⃣  Check scraped data: SELECT * FROM sc_raw_news_feeds WHERE is_processed=false;")
+        print(f"   2️⃣  Run AI News Generator to process feeds")
+        print()
     
     def cleanup(self):
-        """Close database session"""
+        """Stop download workers, persist the rate budget and close database session"""
+        if self.downloader:
+            self.downloader.shutdown()
+        self.scheduler.save()
         self.session.close()
 
 
+def load_targets(args):
+    """Target usernames from --target/--targets/--targets-file, deduplicated in order"""
+    if args.targets_file:
+        with open(args.targets_file, 'r', encoding='utf-8') as f:
+            values = [line.split('#', 1)[0] for line in f]
+    elif args.targets:
+        values = [value for arg in args.targets for value in arg.split(',')]
+    else:
+        values = [args.target]
+    
+    usernames = []
+    for value in values:
+        username = value.strip().lstrip('@')
+        if username and username not in usernames:
+            usernames.append(username)
+    return usernames
+
+
+def _raise_keyboard_interrupt(signum, frame):
+    raise KeyboardInterrupt
+
+
 def main():
     parser = argparse.ArgumentParser(
         description='Instagram Scraper for SMAN 1 Baleendah News Feed',
@@ -283,21 +768,39 @@ def main():
 Examples:
   python scraper.py --target jokowi
   python scraper.py --target sman1baleendah --max-posts 100
+  python scraper.py --target sman1baleendah --incremental
+  python scraper.py --targets sman1baleendah osis_sman1baleendah --incremental
+  python scraper.py --targets-file targets.txt --max-posts 20
+  python scraper.py --targets sman1baleendah osis_sman1baleendah --ndjson
+  python scraper.py --target sman1baleendah --resume --max-posts 200
   
 Setup:
   1. Configure bot account: python setup_db.py
   2. Update credentials in database (sc_bot_accounts table)
-  3. Run scraper with target username
+  3. Run scraper with target username(s)
         """
     )
     
-    parser.add_argument(
+    targets = parser.add_mutually_exclusive_group(required=True)
+    
+    targets.add_argument(
         '--target',
         type=str,
-        required=True,
         help='Target Instagram username to scrape'
     )
     
+    targets.add_argument(
+        '--targets',
+        nargs='+',
+        help='Several target usernames (space or comma separated), scraped interleaved'
+    )
+    
+    targets.add_argument(
+        '--targets-file',
+        type=str,
+        help='File with one target username per line (# starts a comment)'
+    )
+    
     parser.add_argument(
         '--max-posts',
         type=int,
@@ -305,21 +808,188 @@ Setup:
         help='Maximum number of posts to scrape (default: 50)'
     )
     
+    parser.add_argument(
+        '--batch-size',
+        type=int,
+        default=20,
+        help='Posts per bulk database insert (default: 20)'
+    )
+    
+    parser.add_argument(
+        '--flush-interval',
+        type=float,
+        default=30.0,
+        help='Max seconds a scraped post waits before being written (default: 30)'
+    )
+    
+    parser.add_argument(
+        '--download-workers',
+        type=int,
+        default=4,
+        help='Threads downloading images in parallel (default: 4)'
+    )
+    
+    parser.add_argument(
+        '--variant-widths',
+        type=str,
+        default=','.join(map(str, DEFAULT_WIDTHS)),
+        help='Widths of WebP/AVIF derivatives, comma separated (default: 320,640,1080)'
+    )
+    
+    parser.add_argument(
+        '--variant-formats',
+        type=str,
+        default=','.join(DEFAULT_FORMATS),
+        help='Derivative formats, comma separated (default: webp,avif)'
+    )
+    
+    parser.add_argument(
+        '--variant-workers',
+        type=int,
+        default=None,
+        help='Processes encoding derivatives (default: CPU count)'
+    )
+    
+    parser.add_argument(
+        '--no-variants',
+        action='store_true',
+        help='Skip creating image derivatives'
+    )
+    
+    parser.add_argument(
+        '--dedup',
+        choices=['link', 'skip', 'off'],
+        default='link',
+        help='Near-duplicate images (reposts): link to the stored file, skip posts made only of '
+             'duplicates, or off (default: link)'
+    )
+    
+    parser.add_argument(
+        '--dedup-distance',
+        type=int,
+        default=6,
+        help='Max differing perceptual-hash bits (of 128) for a near-duplicate (default: 6)'
+    )
+    
+    parser.add_argument(
+        '--rate',
+        type=float,
+        default=12.0,
+        help='Sustained requests per minute, API calls and images (default: 12)'
+    )
+    
+    parser.add_argument(
+        '--burst',
+        type=int,
+        default=10,
+        help='Requests allowed back-to-back when the budget is full (default: 10)'
+    )
+    
+    parser.add_argument(
+        '--daily-limit',
+        type=int,
+        default=1500,
+        help='Maximum requests per day for the bot account, persisted across runs (default: 1500)'
+    )
+    
+    mode = parser.add_mutually_exclusive_group()
+    
+    mode.add_argument(
+        '--incremental',
+        action='store_true',
+        help='Only fetch new posts: stop once consecutive already-stored posts are reached'
+    )
+    
+    mode.add_argument(
+        '--resume',
+        action='store_true',
+        help='Continue each target from its last checkpoint (deep backfills over several runs)'
+    )
+    
+    parser.add_argument(
+        '--stop-after',
+        type=int,
+        default=5,
+        help='Incremental mode: consecutive known posts before stopping (default: 5)'
+    )
+    
+    parser.add_argument(
+        '--checkpoint-every',
+        type=int,
+        default=12,
+        help='Resume mode: save a checkpoint every N posts (default: 12)'
+    )
+    
+    output = parser.add_mutually_exclusive_group()
+    
+    output.add_argument(
+        '--ndjson',
+        dest='output_mode',
+        action='store_const',
+        const='ndjson',
+        help='Stream one JSON object per line on stdout (post/target events, final summary)'
+    )
+    
+    output.add_argument(
+        '--json',
+        dest='output_mode',
+        action='store_const',
+        const='json',
+        help='Print only a final JSON summary on stdout'
+    )
+    
     args = parser.parse_args()
     
+    try:
+        target_usernames = load_targets(args)
+    except OSError as e:
+        parser.error(f"cannot read targets file: {e}")
+    if not target_usernames:
+        parser.error("no target usernames given")
+    
+    # In JSON modes stdout carries only JSON, the human-readable log goes to stderr
+    events = EventStream(sys.stdout, args.output_mode)
+    if events.enabled:
+        sys.stdout = sys.stderr
+    
+    # Treat SIGTERM (e.g. a Process timeout) like Ctrl+C so buffers and checkpoints are written
+    signal.signal(signal.SIGTERM, _raise_keyboard_interrupt)
+    
     # Initialize scraper
-    scraper = InstagramScraper()
+    scraper = InstagramScraper(
+        download_workers=args.download_workers,
+        rate=args.rate,
+        burst=args.burst,
+        daily_limit=args.daily_limit,
+        events=events,
+        variant_widths=() if args.no_variants else parse_widths(args.variant_widths),
+        variant_formats=parse_formats(args.variant_formats),
+        variant_workers=args.variant_workers,
+        dedup=args.dedup,
+        dedup_distance=args.dedup_distance,
+    )
     scraper.initialize_loader()
     
     # Login
     if not scraper.login_with_session():
         print("\n❌ Login failed. Cannot proceed with scraping.")
+        events.summary(ok=False, error='login failed', scraped=0, skipped=0, errors=0, bytes=0,
+                       targets=[])
         scraper.cleanup()
         return
     
     # Start scraping
     try:
-        scraper.scrape_profile(args.target, args.max_posts)
+        scraper.scrape_profiles(
+            target_usernames,
+            max_posts=args.max_posts,
+            incremental=args.incremental,
+            stop_after=args.stop_after,
+            batch_size=args.batch_size,
+            flush_interval=args.flush_interval,
+            resume=args.resume,
+            checkpoint_every=args.checkpoint_every,
+        )
     except KeyboardInterrupt:
         print("\n\n⚠️  Scraping interrupted by user")
     finally:
@@ -8,7 +8,7 @@ This script:
 3. Logs stored in sc_scraper_logs table
 """
 
-from models import Base, RawNewsFeed, create_db_engine, get_session
+from models import Base, RawNewsFeed, get_engine, session_scope
 from sqlalchemy import inspect
 
 
@@ -24,7 +24,7 @@ def setup_database():
     try:
         # Step 1: Create engine and connect
         print("📡 Connecting to PostgreSQL database...")
-        engine = create_db_engine()
+        engine = get_engine()
         
         # Test connection
         with engine.connect() as conn:
@@ -39,21 +39,21 @@ def setup_database():
         
         if 'sc_raw_news_feeds' in existing_tables:
             print("   ✓ Table 'sc_raw_news_feeds' created/verified")
+        if 'sc_image_hashes' in existing_tables:
+            print("   ✓ Table 'sc_image_hashes' created/verified")
         
         print()
         
         # Step 3: Check raw news feeds
-        session = get_session()
-        feed_count = session.query(RawNewsFeed).count()
-        pending_count = session.query(RawNewsFeed).filter_by(is_processed=False).count()
+        with session_scope() as session:
+            feed_count = session.query(RawNewsFeed).count()
+            pending_count = session.query(RawNewsFeed).filter_by(is_processed=False).count()
         
         print("📰 News feeds status:")
         print(f"   Total scraped: {feed_count}")
         print(f"   Pending AI processing: {pending_count}")
         print()
         
-        session.close()
-        
         # Summary
         print("╔══════════════════════════════════════════════════════════════════════════════╗")
         print("║                         SETUP COMPLETED SUCCESSFULLY                         ║")
@@ -92,8 +92,7 @@ def reset_database(confirm=False):
             return
     
     print("🗑️  Dropping scraper tables...")
-    engine = create_db_engine()
-    Base.metadata.drop_all(engine)
+    Base.metadata.drop_all(get_engine())
     print("✅ Tables dropped successfully.")
     print("   Run setup again to recreate: python setup_db.py")
 
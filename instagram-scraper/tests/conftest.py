@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# The scraper modules are run from instagram-scraper/, not installed
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
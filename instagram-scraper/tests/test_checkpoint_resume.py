@@ -0,0 +1,178 @@
+import io
+from datetime import datetime
+from types import SimpleNamespace
+
+import instaloader
+
+from events import EventStream
+from rate_scheduler import RateScheduler
+from scraper import InstagramScraper
+
+
+class FakePost:
+    def __init__(self, shortcode):
+        self.shortcode = shortcode
+        self.caption = ''
+        self.likes = 0
+        self.comments = 0
+        self.date_utc = datetime(2025, 1, 1)
+
+
+class FakeIterator:
+    """Stands in for NodeIterator, the position is all a checkpoint needs"""
+    
+    def __init__(self, posts):
+        self.posts = posts
+        self.total_index = 0
+    
+    def __iter__(self):
+        return self
+    
+    def __next__(self):
+        if self.total_index >= len(self.posts):
+            raise StopIteration
+        self.total_index += 1
+        return self.posts[self.total_index - 1]
+
+
+class MemoryCheckpoints:
+    def __init__(self):
+        self.saved = {}
+    
+    def restore(self, target, iterator):
+        if target not in self.saved:
+            return None
+        iterator.total_index, progress = self.saved[target]
+        return progress
+    
+    def save(self, target, iterator, progress):
+        # NodeIterator.freeze() backs up one item, the last post is yielded again
+        self.saved[target] = (max(iterator.total_index - 1, 0), progress)
+    
+    def clear(self, target):
+        self.saved.pop(target, None)
+
+
+class FakeDownload:
+    def __init__(self, shortcode, failed):
+        self.shortcode = shortcode
+        self.failed = failed
+    
+    def done(self):
+        return True
+    
+    def result(self):
+        if self.failed:
+            return [], [OSError("image request failed")]
+        return [], []
+    
+    def duplicates(self):
+        return []
+    
+    def variants(self):
+        return []
+    
+    def seconds(self):
+        return 0.0
+
+
+class FakeDownloader:
+    def __init__(self, failing):
+        self.failing = set(failing)
+    
+    def submit_post(self, post, target_dir):
+        return FakeDownload(post.shortcode, post.shortcode in self.failing)
+
+
+class FakeBuffer:
+    stored = []
+    
+    def __init__(self, session, **kwargs):
+        self.rows = []
+        self.conflicts = 0
+        self.failed = 0
+    
+    def add(self, **values):
+        self.rows.append(values)
+    
+    def maybe_flush(self):
+        return 0
+    
+    def flush(self):
+        FakeBuffer.stored.extend(row['post_shortcode'] for row in self.rows)
+        self.rows = []
+    
+    def __len__(self):
+        return len(self.rows)
+
+
+class FailingBuffer(FakeBuffer):
+    """Database is down: every flush fails and the rows stay buffered"""
+    
+    def flush(self):
+        return 0
+
+
+def _scraper(monkeypatch, tmp_path, posts):
+    profile = SimpleNamespace(full_name='SMAN 1 Baleendah', mediacount=len(posts), followers=0, followees=0,
+                              get_posts=lambda: FakeIterator(list(posts.values())))
+    monkeypatch.setattr(instaloader.Profile, 'from_username', lambda context, username: profile)
+    monkeypatch.setattr(instaloader.Post, 'from_shortcode', lambda context, shortcode: posts[shortcode])
+    monkeypatch.setattr('scraper.RawNewsFeedBuffer', FakeBuffer)
+    FakeBuffer.stored = []
+    
+    scraper = InstagramScraper.__new__(InstagramScraper)
+    scraper.events = EventStream(io.StringIO(), 'ndjson')
+    scraper.checkpoints = MemoryCheckpoints()
+    scraper.scheduler = RateScheduler()
+    scraper.L = SimpleNamespace(context=None)
+    scraper.session = None
+    scraper.hash_index = None
+    scraper.dedup = 'off'
+    scraper.download_workers = 1
+    scraper.download_dir = tmp_path
+    scraper.known_shortcodes = set()
+    monkeypatch.setattr(scraper, 'load_known_shortcodes', lambda username: set())
+    return scraper
+
+
+def test_failed_download_is_retried_after_resume(monkeypatch, tmp_path):
+    posts = {shortcode: FakePost(shortcode) for shortcode in ('p1', 'p2', 'p3', 'p4')}
+    scraper = _scraper(monkeypatch, tmp_path, posts)
+    
+    # First run: p2's images fail, the run stops after two posts
+    scraper.downloader = FakeDownloader(failing={'p2'})
+    scraper.scrape_profiles(['smansa'], max_posts=2, resume=True)
+    assert FakeBuffer.stored == ['p1']
+    position, progress = scraper.checkpoints.saved['smansa']
+    assert progress['failed'] == [{'shortcode': 'p2', 'index': 2}]
+    
+    # Resumed run: p2 is retried before the feed continues at p3
+    scraper.downloader = FakeDownloader(failing=())
+    scraper.scrape_profiles(['smansa'], max_posts=10, resume=True)
+    assert FakeBuffer.stored == ['p1', 'p2', 'p3', 'p4']
+    assert 'smansa' not in scraper.checkpoints.saved
+
+
+def test_checkpoint_does_not_advance_past_unstored_posts(monkeypatch, tmp_path):
+    posts = {shortcode: FakePost(shortcode) for shortcode in ('p1', 'p2', 'p3', 'p4', 'p5')}
+    scraper = _scraper(monkeypatch, tmp_path, posts)
+    scraper.downloader = FakeDownloader(failing=())
+    
+    # First run stores p1-p2 and checkpoints after them
+    scraper.scrape_profiles(['smansa'], max_posts=2, resume=True)
+    assert FakeBuffer.stored == ['p1', 'p2']
+    checkpoint = scraper.checkpoints.saved['smansa']
+    
+    # Second run cannot write p3-p4, neither the periodic nor the final checkpoint moves
+    monkeypatch.setattr('scraper.RawNewsFeedBuffer', FailingBuffer)
+    scraper.scrape_profiles(['smansa'], max_posts=2, resume=True, checkpoint_every=1)
+    assert FakeBuffer.stored == ['p1', 'p2']
+    assert scraper.checkpoints.saved['smansa'] == checkpoint
+    
+    # Once the database is back, --resume walks p3-p4 again (a new process, p3-p4 are not known)
+    monkeypatch.setattr('scraper.RawNewsFeedBuffer', FakeBuffer)
+    scraper.known_shortcodes = {'p1', 'p2'}
+    scraper.scrape_profiles(['smansa'], max_posts=10, resume=True)
+    assert FakeBuffer.stored == ['p1', 'p2', 'p3', 'p4', 'p5']
+    assert 'smansa' not in scraper.checkpoints.saved
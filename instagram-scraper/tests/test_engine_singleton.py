@@ -0,0 +1,43 @@
+import threading
+
+import models
+
+
+class FakeEngine:
+    def __init__(self):
+        self.disposed = False
+    
+    def dispose(self):
+        self.disposed = True
+
+
+def test_engine_is_created_once_and_recreated_after_dispose(monkeypatch):
+    created = []
+    
+    def create():
+        created.append(FakeEngine())
+        return created[-1]
+    
+    monkeypatch.setattr(models, 'create_db_engine', create)
+    monkeypatch.setattr(models, 'sessionmaker', lambda bind: lambda: bind)
+    models.dispose_engine()
+    
+    barrier = threading.Barrier(8)
+    sessions = []
+    
+    def worker():
+        barrier.wait()
+        sessions.append(models.get_session())
+    
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert len(created) == 1 and all(session is created[0] for session in sessions)
+    
+    models.dispose_engine()
+    assert created[0].disposed
+    assert models.get_session() is created[1]
+    models.dispose_engine()
@@ -0,0 +1,77 @@
+import random
+from io import BytesIO
+
+from PIL import Image, ImageDraw, ImageFilter
+
+from image_dedup import BKTree, ImageHashIndex, dhash, dhash_bytes, hamming
+
+
+def _photo(seed, size=(640, 480)):
+    """Synthetic photo: random shapes on a gradient, softened like a real picture"""
+    rng = random.Random(seed)
+    image = Image.linear_gradient('L').resize(size).convert('RGB')
+    draw = ImageDraw.Draw(image)
+    for _ in range(25):
+        x, y = rng.randrange(size[0]), rng.randrange(size[1])
+        w, h = rng.randrange(40, 200), rng.randrange(40, 200)
+        color = tuple(rng.randrange(256) for _ in range(3))
+        draw.ellipse((x, y, x + w, y + h), fill=color)
+    return image.filter(ImageFilter.GaussianBlur(2))
+
+
+def _encode(image, format='JPEG', **options):
+    buffer = BytesIO()
+    image.save(buffer, format=format, **options)
+    return buffer.getvalue()
+
+
+def test_radius_query_returns_exactly_the_hashes_within_distance():
+    rng = random.Random(7)
+    base = rng.getrandbits(128)
+    # Hashes at every distance from a few bits up to unrelated
+    values = {base ^ sum(1 << bit for bit in rng.sample(range(128), rng.randrange(0, 40))) for _ in range(300)}
+    values |= {rng.getrandbits(128) for _ in range(300)}
+    tree = BKTree()
+    for value in values:
+        tree.add(value, f"{value:032x}")
+    assert len(tree) == len(values)
+    
+    for query in (base, rng.getrandbits(128)):
+        for max_distance in (0, 3, 6, 12, 20):
+            expected = {value for value in values if hamming(query, value) <= max_distance}
+            matches = tree.find(query, max_distance)
+            assert {value for _, value, _ in matches} == expected
+            assert [distance for distance, _, _ in matches] == sorted(hamming(query, v) for v in expected)
+            assert all(item == f"{value:032x}" for _, value, item in matches)
+
+
+def test_resized_and_reencoded_copies_match():
+    original = _photo(1)
+    reference = dhash_bytes(_encode(original, 'PNG'))
+    
+    copies = [
+        _encode(original, quality=60),
+        _encode(original.resize((320, 240)), quality=85),
+        _encode(original.resize((1080, 810)), 'WEBP', quality=70),
+    ]
+    for data in copies:
+        assert hamming(reference, dhash_bytes(data)) <= 6
+    
+    other = dhash_bytes(_encode(_photo(2), quality=90))
+    assert hamming(reference, other) > 20
+
+
+def test_index_finds_near_duplicates_but_ignores_low_detail_images():
+    index = ImageHashIndex(max_distance=6)
+    original = dhash(_photo(3))
+    index.add(original, "smansa/a.jpg", "A1", "smansa")
+    
+    assert index.find(dhash_bytes(_encode(_photo(3).resize((400, 300)), quality=70))) == "smansa/a.jpg"
+    assert index.find(dhash(_photo(4))) is None
+    
+    # A flat image has an (almost) all-zero hash and is never matched or stored
+    flat = dhash(Image.new('RGB', (300, 300), 'white'))
+    index.add(flat, "smansa/flat.jpg", "A2", "smansa")
+    assert index.find(flat) is None
+    assert len(index) == 1
+    assert dhash_bytes(b"not an image") is None
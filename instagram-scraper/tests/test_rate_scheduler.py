@@ -0,0 +1,101 @@
+import json
+
+import pytest
+
+from rate_scheduler import RateBudgetExhausted, RateScheduler
+
+
+class FakeClock:
+    """Wall clock that only moves when the scheduler sleeps or the test advances it"""
+    
+    def __init__(self, now=1_750_000_000.0):
+        self.now = now
+        self.slept = []
+    
+    def __call__(self):
+        return self.now
+    
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+def _scheduler(clock, **kwargs):
+    return RateScheduler(clock=clock, sleep=clock.sleep, jitter=0.0, **kwargs)
+
+
+@pytest.fixture(autouse=True)
+def no_random_backoff(monkeypatch):
+    # Backoffs are drawn from [backoff / 2, backoff], take the upper bound
+    monkeypatch.setattr('rate_scheduler.random.uniform', lambda low, high: high)
+
+
+def test_burst_then_sustained_rate():
+    clock = FakeClock()
+    scheduler = _scheduler(clock, rate=12.0, burst=2)
+    
+    assert scheduler.acquire() == 0.0
+    assert scheduler.acquire() == 0.0
+    # The bucket is empty, 12 requests per minute is one every 5 seconds
+    assert scheduler.acquire() == pytest.approx(5.0)
+    assert scheduler.acquire() == pytest.approx(5.0)
+    
+    # Idle time refills the bucket, at most up to the burst size
+    clock.now += 60
+    assert scheduler.acquire() == 0.0
+    assert scheduler.acquire() == 0.0
+    assert scheduler.acquire() == pytest.approx(5.0)
+
+
+def test_backoff_pauses_the_bucket_and_doubles_until_reset():
+    clock = FakeClock()
+    scheduler = _scheduler(clock, rate=12.0, burst=10, backoff_base=30.0, backoff_reset=600.0)
+    
+    assert scheduler.penalize() == 30.0
+    # Waiting out part of the pause does not refill tokens or end the backoff
+    clock.now += 10
+    assert scheduler.acquire() == pytest.approx(20.0 + 5.0)
+    
+    # A second error within backoff_reset keeps the strikes, the backoff doubles
+    assert scheduler.penalize() == 60.0
+    assert scheduler.strikes == 2
+    
+    # Only after backoff_reset seconds without errors does it start over
+    clock.now += 601 + 60
+    assert scheduler.penalize() == 30.0
+
+
+def test_daily_limit():
+    clock = FakeClock()
+    scheduler = _scheduler(clock, daily_limit=2)
+    scheduler.acquire()
+    scheduler.acquire()
+    
+    with pytest.raises(RateBudgetExhausted):
+        scheduler.acquire()
+    
+    clock.now += 24 * 3600
+    scheduler.acquire()
+    assert scheduler.requests_today == 1
+
+
+def test_state_round_trip_keeps_budget_and_backoff(tmp_path):
+    state_file = str(tmp_path / "ratelimit-bot.json")
+    clock = FakeClock()
+    scheduler = _scheduler(clock, state_file=state_file, rate=12.0, burst=10)
+    for _ in range(10):
+        scheduler.acquire()
+    scheduler.penalize()
+    paused_until = scheduler.updated_at
+    
+    with open(state_file) as f:
+        state = json.load(f)
+    assert state['tokens'] == 0.0 and state['strikes'] == 1 and state['requests_today'] == 10
+    
+    # A restart during the backoff gets neither a fresh burst nor a reset backoff
+    clock.now += 5
+    restarted = _scheduler(clock, state_file=state_file, rate=12.0, burst=10)
+    assert restarted.tokens == 0.0
+    assert restarted.updated_at == paused_until
+    assert restarted.strikes == 1 and restarted.requests_today == 10
+    assert restarted.penalize() == 60.0
@@ -0,0 +1,66 @@
+from types import SimpleNamespace
+
+from models import RawNewsFeedBuffer
+
+
+class FakeSession:
+    def __init__(self):
+        self.statements = []
+    
+    def execute(self, statement):
+        self.statements.append(statement)
+        return SimpleNamespace(rowcount=1)
+    
+    def commit(self):
+        pass
+    
+    def rollback(self):
+        pass
+
+
+def test_maybe_flush_writes_rows_older_than_the_interval(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr('models.time.monotonic', lambda: now[0])
+    session = FakeSession()
+    buffer = RawNewsFeedBuffer(session, batch_size=20, flush_interval=30.0)
+    
+    buffer.add(post_shortcode='abc', source_username='smansa')
+    now[0] += 10
+    assert buffer.maybe_flush() == 0
+    assert len(buffer) == 1
+    
+    # No further add(), the age alone triggers the flush
+    now[0] += 25
+    assert buffer.maybe_flush() == 1
+    assert len(buffer) == 0 and len(session.statements) == 1
+    assert buffer.maybe_flush() == 0
+
+
+class FailingSession(FakeSession):
+    def __init__(self, failures):
+        super().__init__()
+        self.failures = failures
+    
+    def execute(self, statement):
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("connection lost")
+        return super().execute(statement)
+
+
+def test_rows_of_a_failed_flush_are_written_by_the_next_one(caplog):
+    session = FailingSession(failures=1)
+    buffer = RawNewsFeedBuffer(session, batch_size=20, flush_interval=30.0)
+    buffer.add(post_shortcode='abc', source_username='smansa')
+    buffer.add(post_shortcode='def', source_username='smansa')
+    
+    with caplog.at_level('ERROR', logger='models'):
+        assert buffer.flush() == 0
+    assert "Failed to write 2 buffered posts" in caplog.text
+    assert len(buffer) == 2 and buffer.failed == 2
+    
+    buffer.add(post_shortcode='ghi', source_username='smansa')
+    buffer.flush()
+    assert len(buffer) == 0 and buffer.failed == 0
+    rows = session.statements[0].compile().params
+    assert {rows[f'post_shortcode_m{i}'] for i in range(3)} == {'abc', 'def', 'ghi'}
@@ -0,0 +1,39 @@
+import io
+import json
+
+import pytest
+
+from events import EventStream
+from rate_scheduler import RateScheduler
+from scraper import InstagramScraper
+
+
+def _scraper(stream, download_dir):
+    """Scraper without login, database or download pool"""
+    scraper = InstagramScraper.__new__(InstagramScraper)
+    scraper.events = EventStream(stream, 'ndjson')
+    scraper.scheduler = RateScheduler()
+    scraper.session = None
+    scraper.hash_index = None
+    scraper.download_workers = 1
+    scraper.download_dir = download_dir
+    scraper.known_shortcodes = set()
+    return scraper
+
+
+def test_interrupt_still_emits_summary(monkeypatch, tmp_path):
+    stream = io.StringIO()
+    scraper = _scraper(stream, tmp_path)
+    
+    def interrupted(run, incremental):
+        raise KeyboardInterrupt
+    
+    monkeypatch.setattr(scraper, '_start_target', interrupted)
+    
+    with pytest.raises(KeyboardInterrupt):
+        scraper.scrape_profiles(['smansa'])
+    
+    events = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert [event['event'] for event in events] == ['start', 'target', 'summary']
+    assert events[-1]['ok'] is False and events[-1]['error'] == 'interrupted'
+    assert events[-1]['targets'][0]['status'] == 'interrupted'
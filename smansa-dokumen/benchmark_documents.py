@@ -0,0 +1,395 @@
+"""
+SMAN 1 Baleendah Document Processor Benchmark
+Measure process_documents.py throughput on synthetic corpora
+
+Generates a deterministic synthetic corpus (PDF, DOCX, XLSX, PNG) in a
+scratch directory, runs DocumentProcessor and MarkdownGenerator over it and
+reports:
+- per-format files/sec and MB/sec for extraction
+- per-stage wall time (scan, extract, clean, render, write)
+- optional end-to-end streaming pipeline time with --workers
+- peak RSS
+
+Results are saved as JSON in output/benchmarks/ so runs can be compared
+between commits with --compare.
+
+Usage:
+- python benchmark_documents.py
+- python benchmark_documents.py --files-per-format 50 --pdf-pages 40 --xlsx-rows 20000
+- python benchmark_documents.py --workers 4 --compare output/benchmarks/<previous>.json
+"""
+
+import os
+import sys
+import argparse
+import io
+import json
+import platform
+import random
+import shutil
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+from datetime import datetime
+from typing import Dict, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from process_documents import (
+    DOC_ROOT,
+    OUTPUT_DIR,
+    DocumentProcessor,
+    MarkdownGenerator,
+    TextNormalizer,
+    DocxDocument,
+    Image,
+    openpyxl,
+)
+
+BENCHMARK_DIR = OUTPUT_DIR / "benchmarks"
+
+# Vocabulary for synthetic text (school-report flavoured Indonesian)
+WORDS = (
+    "siswa sekolah kelas nilai rapor kurikulum seleksi universitas jalur prestasi "
+    "peserta didik mata pelajaran matematika bahasa indonesia inggris fisika kimia "
+    "biologi sejarah ekonomi geografi sosiologi guru kepala tahun ajaran semester "
+    "pembelajaran kegiatan ekstrakurikuler prestasi akademik lulusan diterima negeri"
+).split()
+
+
+# =============================================================================
+# Synthetic corpus generation
+# =============================================================================
+
+def _sentence(rng: random.Random) -> str:
+    """Random sentence of 8-20 words"""
+    words = [rng.choice(WORDS) for _ in range(rng.randint(8, 20))]
+    return " ".join(words).capitalize() + "."
+
+
+def _paragraph(rng: random.Random, sentences: int = 5) -> str:
+    return " ".join(_sentence(rng) for _ in range(sentences))
+
+
+def write_pdf(path: Path, pages: List[List[str]]):
+    """
+    Write a minimal text PDF (Helvetica, one text object per page)
+
+    Hand-built so the benchmark needs no PDF authoring library; pypdf
+    extracts the text like any other simple PDF.
+    """
+    def escape(text: str) -> str:
+        return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+    objects: Dict[int, bytes] = {
+        1: b"<< /Type /Catalog /Pages 2 0 R >>",
+        3: b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    }
+    kids = []
+    next_id = 4
+
+    for lines in pages:
+        stream = "BT /F1 10 Tf 12 TL 40 800 Td\n"
+        stream += "".join(f"({escape(line)}) Tj T*\n" for line in lines)
+        stream += "ET"
+        data = stream.encode('latin-1', errors='replace')
+
+        page_id, content_id = next_id, next_id + 1
+        objects[page_id] = (
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {content_id} 0 R >>"
+        ).encode('ascii')
+        objects[content_id] = b"<< /Length %d >>\nstream\n" % len(data) + data + b"\nendstream"
+        kids.append(page_id)
+        next_id += 2
+
+    objects[2] = f"<< /Type /Pages /Kids [{' '.join(f'{k} 0 R' for k in kids)}] /Count {len(kids)} >>".encode('ascii')
+
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = {}
+    for obj_id in sorted(objects):
+        offsets[obj_id] = out.tell()
+        out.write(b"%d 0 obj\n" % obj_id + objects[obj_id] + b"\nendobj\n")
+
+    xref = out.tell()
+    out.write(b"xref\n0 %d\n" % (len(objects) + 1))
+    out.write(b"0000000000 65535 f \n")
+    for obj_id in sorted(objects):
+        out.write(b"%010d 00000 n \n" % offsets[obj_id])
+    out.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref))
+
+    path.write_bytes(out.getvalue())
+
+
+def generate_corpus(directory: Path, files_per_format: int = 10, pdf_pages: int = 10,
+                    xlsx_rows: int = 1000, image_size: int = 1024, seed: int = 42) -> Dict[str, int]:
+    """Generate a deterministic synthetic corpus, returns file count per format"""
+    rng = random.Random(seed)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    for i in range(files_per_format):
+        # PDF: pages of ~50 short lines
+        pages = [[_sentence(rng)[:90] for _ in range(50)] for _ in range(pdf_pages)]
+        write_pdf(directory / f"laporan_{i:04d}.pdf", pages)
+
+        # DOCX: paragraphs plus one table
+        doc = DocxDocument()
+        for _ in range(40):
+            doc.add_paragraph(_paragraph(rng))
+        table = doc.add_table(rows=20, cols=4)
+        for row in table.rows:
+            for cell in row.cells:
+                cell.text = rng.choice(WORDS)
+        doc.save(str(directory / f"profil_{i:04d}.docx"))
+
+        # XLSX: one data sheet
+        workbook = openpyxl.Workbook(write_only=True)
+        sheet = workbook.create_sheet("Rekap")
+        sheet.append(["No", "Nama", "Mata Pelajaran", "Nilai", "Keterangan"])
+        for row in range(xlsx_rows):
+            sheet.append([row + 1, f"Siswa {row}", rng.choice(WORDS), round(rng.uniform(40, 100), 2), rng.choice(WORDS)])
+        workbook.save(str(directory / f"rekapitulasi_{i:04d}.xlsx"))
+
+        # PNG: noisy image so the file size is realistic
+        image = Image.effect_noise((image_size, image_size), 64).convert('RGB')
+        image.save(str(directory / f"kegiatan_{i:04d}.png"))
+
+    return {'.pdf': files_per_format, '.docx': files_per_format,
+            '.xlsx': files_per_format, '.png': files_per_format}
+
+
+# =============================================================================
+# Measurement
+# =============================================================================
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process in MB (None where unsupported)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS reports bytes
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def git_revision() -> Optional[str]:
+    """Short git commit of the working tree, if available"""
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=DOC_ROOT, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return None
+
+
+def run_benchmark(corpus_dir: Path, workers: int = 1) -> Dict:
+    """Run each pipeline stage over corpus_dir and return the measurements"""
+    processor = DocumentProcessor()
+    stages = {}
+
+    # Stage: scan
+    start = time.perf_counter()
+    files = processor.scan_directory(corpus_dir)
+    stages['scan'] = time.perf_counter() - start
+
+    # Stage: extract (serial, timed per file so formats can be compared)
+    formats: Dict[str, Dict] = {}
+    documents = []
+    start = time.perf_counter()
+    for file_path in files:
+        suffix = file_path.suffix.lower()
+        stats = formats.setdefault(suffix, {'files': 0, 'bytes': 0, 'seconds': 0.0, 'chars': 0, 'errors': 0})
+
+        file_start = time.perf_counter()
+        try:
+            doc = processor._process_file(file_path)
+        except Exception:
+            doc = None
+            stats['errors'] += 1
+        stats['seconds'] += time.perf_counter() - file_start
+        stats['files'] += 1
+        stats['bytes'] += file_path.stat().st_size
+
+        if doc:
+            stats['chars'] += len(doc.content)
+            documents.append(doc)
+    stages['extract'] = time.perf_counter() - start
+
+    for stats in formats.values():
+        seconds = stats['seconds'] or 1e-9
+        stats['files_per_sec'] = stats['files'] / seconds
+        stats['mb_per_sec'] = stats['bytes'] / (1024 * 1024) / seconds
+
+    # Stage: clean
+    start = time.perf_counter()
+    normalizer = TextNormalizer()
+    for doc in documents:
+        normalizer.clean(doc)
+    stages['clean'] = time.perf_counter() - start
+
+    # Stage: render (sections reuse the cleaned content, so cleaning is not counted twice)
+    buffer = io.StringIO()
+    start = time.perf_counter()
+    MarkdownGenerator(documents, normalizer=normalizer).write(buffer)
+    stages['render'] = time.perf_counter() - start
+
+    # Stage: write
+    markdown = buffer.getvalue()
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        with open(Path(tmp) / "out.md", 'w', encoding='utf-8') as f:
+            f.write(markdown)
+        stages['write'] = time.perf_counter() - start
+
+    result = {
+        'files': len(files),
+        'corpus_mb': sum(f.stat().st_size for f in files) / (1024 * 1024),
+        'output_chars': len(markdown),
+        'stages': stages,
+        'formats': formats,
+    }
+    del documents, buffer, markdown
+
+    # Optional: full streaming pipeline on the worker pool
+    if workers > 1:
+        with tempfile.TemporaryDirectory() as tmp, open(os.devnull, 'w') as devnull:
+            start = time.perf_counter()
+            stdout, sys.stdout = sys.stdout, devnull
+            try:
+                pipeline_docs = DocumentProcessor().process_directory(corpus_dir, workers=workers)
+                MarkdownGenerator(pipeline_docs).generate_to_file(Path(tmp) / "out.md")
+            finally:
+                sys.stdout = stdout
+            result['pipeline'] = {'workers': workers, 'seconds': time.perf_counter() - start}
+
+    result['peak_rss_mb'] = peak_rss_mb()
+    return result
+
+
+# =============================================================================
+# Reporting
+# =============================================================================
+
+def print_report(result: Dict, baseline: Optional[Dict] = None):
+    """Print a human-readable summary (with deltas against baseline, if given)"""
+    def delta(current: float, previous: Optional[float]) -> str:
+        if not previous:
+            return ""
+        change = (current - previous) / previous * 100
+        return f"  ({change:+.1f}%)"
+
+    base = baseline['result'] if baseline else {}
+
+    print(f"\n📊 Corpus: {result['files']} files, {result['corpus_mb']:.1f} MB\n")
+    print(f"{'Format':<8}{'Files':>7}{'Files/s':>10}{'MB/s':>9}{'Errors':>8}")
+    print("-" * 42)
+    for suffix, stats in sorted(result['formats'].items()):
+        previous = base.get('formats', {}).get(suffix, {})
+        print(f"{suffix:<8}{stats['files']:>7}{stats['files_per_sec']:>10.1f}{stats['mb_per_sec']:>9.2f}"
+              f"{stats['errors']:>8}{delta(stats['files_per_sec'], previous.get('files_per_sec'))}")
+
+    print(f"\n{'Stage':<10}{'Seconds':>10}")
+    print("-" * 20)
+    for stage, seconds in result['stages'].items():
+        previous = base.get('stages', {}).get(stage)
+        print(f"{stage:<10}{seconds:>10.3f}{delta(seconds, previous)}")
+
+    if 'pipeline' in result:
+        pipeline = result['pipeline']
+        previous = base.get('pipeline', {}).get('seconds')
+        print(f"\n⚙️  Pipeline ({pipeline['workers']} workers): {pipeline['seconds']:.3f}s{delta(pipeline['seconds'], previous)}")
+
+    if result['peak_rss_mb'] is not None:
+        print(f"🧠 Peak RSS: {result['peak_rss_mb']:.1f} MB{delta(result['peak_rss_mb'], base.get('peak_rss_mb'))}")
+
+
+def main():
+    """Main execution function"""
+    parser = argparse.ArgumentParser(
+        description='Benchmark the document processing pipeline on a synthetic corpus'
+    )
+
+    parser.add_argument('--files-per-format', type=int, default=10,
+                        help='Number of files generated per format (default: 10)')
+    parser.add_argument('--pdf-pages', type=int, default=10,
+                        help='Pages per synthetic PDF (default: 10)')
+    parser.add_argument('--xlsx-rows', type=int, default=1000,
+                        help='Rows per synthetic XLSX sheet (default: 1000)')
+    parser.add_argument('--image-size', type=int, default=1024,
+                        help='Width/height of synthetic PNGs in pixels (default: 1024)')
+    parser.add_argument('--seed', type=int, default=42,
+                        help='Random seed for corpus generation (default: 42)')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Also time the full streaming pipeline with N workers')
+    parser.add_argument('--corpus-dir', type=Path, default=None,
+                        help='Keep the generated corpus here instead of a temp directory')
+    parser.add_argument('--output', type=Path, default=None,
+                        help='Result JSON path (default: output/benchmarks/bench-<time>-<commit>.json)')
+    parser.add_argument('--compare', type=Path, default=None,
+                        help='Previous result JSON to compare against')
+
+    args = parser.parse_args()
+
+    config = {
+        'files_per_format': args.files_per_format,
+        'pdf_pages': args.pdf_pages,
+        'xlsx_rows': args.xlsx_rows,
+        'image_size': args.image_size,
+        'seed': args.seed,
+        'workers': args.workers,
+    }
+
+    print("=" * 60)
+    print("  ⏱️  SMAN 1 BALEENDAH - Document Processor Benchmark")
+    print("=" * 60)
+
+    corpus_dir = args.corpus_dir or Path(tempfile.mkdtemp(prefix='smansa-bench-'))
+    try:
+        print(f"\n🏗️  Generating corpus in {corpus_dir} ...")
+        start = time.perf_counter()
+        generate_corpus(corpus_dir, args.files_per_format, args.pdf_pages,
+                        args.xlsx_rows, args.image_size, args.seed)
+        print(f"   ✅ Done in {time.perf_counter() - start:.1f}s")
+
+        print("🚀 Running pipeline stages...")
+        result = run_benchmark(corpus_dir, workers=args.workers)
+    finally:
+        if args.corpus_dir is None:
+            shutil.rmtree(corpus_dir, ignore_errors=True)
+
+    revision = git_revision()
+    report = {
+        'timestamp': datetime.now().isoformat(),
+        'git_revision': revision,
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+        },
+        'config': config,
+        'result': result,
+    }
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline.get('config') != config:
+            print("⚠️  Baseline was run with a different corpus config; deltas are not comparable")
+
+    print_report(result, baseline)
+
+    output = args.output or BENCHMARK_DIR / f"bench-{datetime.now():%Y%m%d-%H%M%S}-{revision or 'nogit'}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+
+    print(f"\n📍 Results saved: {output}")
+
+
+if __name__ == "__main__":
+    main()
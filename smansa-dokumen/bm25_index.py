@@ -0,0 +1,414 @@
+"""
+SMAN 1 Baleendah BM25 Chunk Index
+Lexical retrieval over exported chunks with an on-disk inverted index
+
+Reads the JSONL produced by `process_documents.py --export-chunks` (which
+also rebuilds this index) and stores a BM25 inverted index that can be
+queried without loading the chunk table:
+- Indonesian-aware tokenizer: Unicode words, Indonesian + English
+  stopwords, particles (-lah, -kah, -tah, -pun) and possessives (-ku, -mu,
+  -nya) stripped, so "sekolahnya" and "sekolah" match
+- Postings per term are sorted chunk numbers (uint32) with term
+  frequencies (uint16), memory-mapped on load
+- Queries score only the postings of the query terms (vectorised with
+  NumPy) and return the top-k chunks, typically in a few milliseconds
+
+Files (in output/bm25_index/), per build generation N:
+- postings.N.npy     chunk numbers of all terms, concatenated (sorted per term)
+- frequencies.N.npy  term frequency per posting
+- offsets.N.npy      (terms + 1,) start of each term's postings
+- lengths.N.npy      tokens per chunk
+- meta.json          generation, terms (sorted), chunks (document_id,
+                     chunk_index, ...), BM25 settings
+
+A build writes a new generation and replaces meta.json last, so a reader
+never combines arrays and terms from different builds. The previous
+generation is kept for readers still using it, older ones are deleted.
+
+Chunk ids are "<document_id>:<chunk_index>", as in the chunk export.
+
+Requirements:
+- pip install numpy
+
+Usage:
+- python bm25_index.py build
+- python bm25_index.py query "jadwal penerimaan siswa baru" --top-k 5
+- python bm25_index.py query "kepala sekolah" --json   (for callers such as Laravel)
+"""
+
+import os
+import sys
+import argparse
+import json
+import math
+import re
+import time
+import unicodedata
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional
+
+try:
+    import numpy as np
+except ImportError:
+    print("Installing numpy...")
+    os.system("pip install numpy")
+    import numpy as np
+
+# Initialize paths
+DOC_ROOT = Path(__file__).parent
+OUTPUT_DIR = DOC_ROOT / "output"
+CHUNKS_FILE = OUTPUT_DIR / "smansa_dokumen_chunks.jsonl"
+INDEX_DIR = OUTPUT_DIR / "bm25_index"
+
+# Bump when tokenization or the file layout changes, older indexes are rejected
+INDEX_VERSION = "1.1"
+
+ARRAYS = ('postings', 'frequencies', 'offsets', 'lengths')
+
+STOPWORDS = frozenset("""
+    ada adalah agar akan aku anda antara apa apabila atau bagaimana bagi bahwa
+    banyak baru begitu belum berapa beberapa bila bisa boleh bukan dalam dan
+    dapat dari daripada demikian dengan di dia dimana hal hanya harus hingga ia
+    ialah ini itu jadi jika juga kalau kami kamu kapan karena ke kecuali kenapa
+    kepada ketika kita lagi lain lalu maka mana masih mau melalui mengapa
+    menjadi mereka misalnya mungkin namun oleh pada para pernah pula saat saja
+    sama sambil sampai sangat saya secara sedang sehingga sejak sekitar selama
+    seluruh semua sementara seorang seperti serta sesuatu setelah setiap
+    siapa suatu sudah supaya tanpa tapi telah tentang tersebut tetapi tidak
+    untuk walaupun yaitu yakni yang
+    a an and are as at be by for from in is it of on or that the this to was
+    with
+""".split())
+
+# Inflectional suffixes only (particle, then possessive), like Tala's light
+# stemmer; derivational affixes are left alone to avoid over-stemming
+PARTICLES = ('lah', 'kah', 'tah', 'pun')
+POSSESSIVES = ('nya', 'ku', 'mu')
+MIN_STEM_LENGTH = 4
+
+# Words ending like a suffix that belongs to the base word (also with a
+# prefix: bersekolah, pemerintah, bertemu)
+BASE_ENDINGS = (
+    'sekolah', 'masalah', 'jumlah', 'salah', 'olah', 'kalah', 'lelah', 'istilah', 'allah',
+    'nikah', 'langkah', 'berkah', 'sedekah', 'rintah', 'rumpun', 'himpun', 'ampun',
+    'tanya', 'punya', 'laku', 'buku', 'suku', 'temu', 'tamu', 'jamu', 'ilmu', 'ramu',
+)
+
+WORD = re.compile(r'\w+')
+
+
+def _strip_suffix(token: str, suffixes: tuple) -> str:
+    if token.endswith(BASE_ENDINGS):
+        return token
+    for suffix in suffixes:
+        if token.endswith(suffix) and len(token) - len(suffix) >= MIN_STEM_LENGTH:
+            return token[:-len(suffix)]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased, stemmed index terms of text (stopwords and 1-letter words dropped)"""
+    text = unicodedata.normalize('NFKC', text).lower()
+    terms = []
+
+    for token in WORD.findall(text):
+        if len(token) < 2 or token in STOPWORDS or '_' in token:
+            continue
+        if not token.isdigit():
+            token = _strip_suffix(_strip_suffix(token, PARTICLES), POSSESSIVES)
+            if token in STOPWORDS:  # siapakah, bukannya
+                continue
+        terms.append(token)
+
+    return terms
+
+
+def iter_chunks(chunks_file: Path) -> Iterator[Dict]:
+    """Read chunk records from the JSONL export one at a time"""
+    with open(chunks_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+class BM25Index:
+    """
+    BM25 inverted index over chunk records
+
+    Postings of term t are postings[offsets[t]:offsets[t + 1]], sorted
+    chunk numbers, so terms can also be intersected cheaply (match_all).
+    The filename is indexed with every chunk of its document, so queries
+    naming a document ("rekapitulasi TKA 2025") find its chunks.
+    """
+
+    def __init__(self, terms: List[str], chunks: List[Dict], postings: np.ndarray,
+                 frequencies: np.ndarray, offsets: np.ndarray, lengths: np.ndarray,
+                 k1: float = 1.2, b: float = 0.75):
+        self.terms = terms
+        self.term_ids = {term: term_id for term_id, term in enumerate(terms)}
+        self.chunks = chunks
+        self.postings = postings
+        self.frequencies = frequencies
+        self.offsets = offsets
+        self.lengths = lengths
+        self.k1 = k1
+        self.b = b
+        self.average_length = float(lengths.mean()) if len(lengths) else 0.0
+
+    def __len__(self):
+        return len(self.chunks)
+
+    @classmethod
+    def build(cls, records: Iterable[Dict], k1: float = 1.2, b: float = 0.75) -> 'BM25Index':
+        """Index chunk records (dicts with document_id, chunk_index, filename and text)"""
+        term_postings: Dict[str, List[int]] = {}
+        term_frequencies: Dict[str, List[int]] = {}
+        chunks = []
+        lengths = []
+        filename_terms: Dict[str, List[str]] = {}
+
+        for number, record in enumerate(records):
+            filename = record['filename']
+            if filename not in filename_terms:
+                filename_terms[filename] = tokenize(Path(filename).stem)
+
+            counts = Counter(tokenize(record['text']))
+            counts.update(filename_terms[filename])
+
+            # Chunk numbers only grow, so every posting list stays sorted
+            for term, count in counts.items():
+                term_postings.setdefault(term, []).append(number)
+                term_frequencies.setdefault(term, []).append(count)
+
+            lengths.append(sum(counts.values()))
+            chunks.append({
+                'id': f"{record['document_id']}:{record['chunk_index']}",
+                'document_id': record['document_id'],
+                'chunk_index': record['chunk_index'],
+                'filename': filename,
+                'category': record.get('category'),
+                'content_hash': record.get('content_hash'),
+            })
+
+        terms = sorted(term_postings)
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(term_postings[term]) for term in terms])
+
+        postings = np.fromiter(
+            (number for term in terms for number in term_postings[term]),
+            dtype=np.uint32, count=int(offsets[-1])
+        )
+        frequencies = np.fromiter(
+            (min(count, 65535) for term in terms for count in term_frequencies[term]),
+            dtype=np.uint16, count=int(offsets[-1])
+        )
+
+        return cls(terms, chunks, postings, frequencies, offsets,
+                   np.array(lengths, dtype=np.uint32), k1=k1, b=b)
+
+    def save(self, directory: Path = INDEX_DIR):
+        """Write the index as a new generation and publish it by replacing meta.json"""
+        directory.mkdir(parents=True, exist_ok=True)
+        previous = _read_generation(directory)
+        generation = (previous or 0) + 1
+
+        arrays = {
+            'postings': self.postings,
+            'frequencies': self.frequencies,
+            'offsets': self.offsets,
+            'lengths': self.lengths,
+        }
+        for name, array in arrays.items():
+            np.save(directory / f"{name}.{generation}.npy", array)
+
+        meta = {
+            'version': INDEX_VERSION,
+            'generation': generation,
+            'built_at': datetime.now().isoformat(timespec='seconds'),
+            'k1': self.k1,
+            'b': self.b,
+            'terms': self.terms,
+            'chunks': self.chunks,
+        }
+        tmp_file = directory / "meta.tmp.json"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(tmp_file, directory / "meta.json")
+
+        _remove_old_generations(directory, {generation, previous or generation})
+
+    @classmethod
+    def load(cls, directory: Path = INDEX_DIR) -> 'BM25Index':
+        """Open a saved index, the posting arrays are memory-mapped read-only"""
+        meta_file = directory / "meta.json"
+        if not meta_file.exists():
+            raise FileNotFoundError(f"BM25 index not found: {directory}")
+
+        with open(meta_file, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get('version') != INDEX_VERSION:
+            raise ValueError(f"BM25 index version {meta.get('version')} != {INDEX_VERSION}, rebuild it")
+
+        arrays = {
+            name: np.load(directory / f"{name}.{meta['generation']}.npy", mmap_mode='r')
+            for name in ARRAYS
+        }
+
+        offsets = arrays['offsets']
+        if (len(offsets) != len(meta['terms']) + 1 or len(arrays['lengths']) != len(meta['chunks'])
+                or not len(arrays['postings']) == len(arrays['frequencies']) == offsets[-1]):
+            raise ValueError(f"BM25 index generation {meta['generation']} does not match meta.json, rebuild it")
+
+        return cls(meta['terms'], meta['chunks'], k1=meta['k1'], b=meta['b'], **arrays)
+
+    def scores(self, query: str, match_all: bool = False) -> np.ndarray:
+        """BM25 score of every chunk for query (0 for chunks without query terms)"""
+        scores = np.zeros(len(self.chunks), dtype=np.float32)
+        term_ids = [self.term_ids[term] for term in dict.fromkeys(tokenize(query)) if term in self.term_ids]
+        if not term_ids or not len(self.chunks):
+            return scores
+
+        total = len(self.chunks)
+        for term_id in term_ids:
+            start, end = self.offsets[term_id], self.offsets[term_id + 1]
+            chunks = self.postings[start:end]
+            frequencies = self.frequencies[start:end].astype(np.float32)
+
+            idf = math.log(1.0 + (total - len(chunks) + 0.5) / (len(chunks) + 0.5))
+            norm = self.k1 * (1.0 - self.b + self.b * self.lengths[chunks] / self.average_length)
+            scores[chunks] += idf * frequencies * (self.k1 + 1.0) / (frequencies + norm)
+
+        if match_all:
+            matching = self.postings[self.offsets[term_ids[0]]:self.offsets[term_ids[0] + 1]]
+            for term_id in term_ids[1:]:
+                matching = np.intersect1d(
+                    matching, self.postings[self.offsets[term_id]:self.offsets[term_id + 1]],
+                    assume_unique=True
+                )
+            mask = np.zeros(len(scores), dtype=bool)
+            mask[matching] = True
+            scores[~mask] = 0.0
+
+        return scores
+
+    def search(self, query: str, top_k: int = 5, match_all: bool = False) -> List[Dict]:
+        """
+        Top-k chunks for query, best first
+
+        Args:
+            query (str): Free text query
+            top_k (int): Maximum number of results
+            match_all (bool): Only chunks containing every query term
+
+        Returns:
+            list: Chunk entries (id, document_id, chunk_index, filename, ...) with a score
+        """
+        scores = self.scores(query, match_all=match_all)
+        top_k = min(top_k, int(np.count_nonzero(scores)))
+        if top_k <= 0:
+            return []
+
+        best = np.argpartition(-scores, top_k - 1)[:top_k]
+        best = best[np.argsort(-scores[best], kind='stable')]
+        return [{**self.chunks[number], 'score': round(float(scores[number]), 4)} for number in best]
+
+
+def _read_generation(directory: Path) -> Optional[int]:
+    """Generation named in the current meta.json (None if there is none)"""
+    try:
+        with open(directory / "meta.json", 'r', encoding='utf-8') as f:
+            return json.load(f).get('generation')
+    except (OSError, ValueError):
+        return None
+
+
+def _remove_old_generations(directory: Path, keep: set):
+    """Delete array files of generations not in keep (and of the pre-generation layout)"""
+    for path in directory.glob("*.npy"):
+        parts = path.name.split('.')
+        legacy = len(parts) == 2 and parts[0] in ARRAYS
+        if legacy or (len(parts) == 3 and parts[1].isdigit() and int(parts[1]) not in keep):
+            try:
+                path.unlink()
+            except OSError:
+                pass  # still memory-mapped by a reader (Windows), removed on a later build
+
+
+def build_index(chunks_file: Path = CHUNKS_FILE, directory: Path = INDEX_DIR) -> BM25Index:
+    """Build the index from the chunk export and save it"""
+    index = BM25Index.build(iter_chunks(chunks_file))
+    index.save(directory)
+    return index
+
+
+def main():
+    """Main execution function"""
+    # Fix Unicode encoding for Windows console
+    if sys.platform == 'win32':
+        sys.stdout.reconfigure(encoding='utf-8')
+
+    parser = argparse.ArgumentParser(
+        description='Build or query the BM25 index over exported document chunks'
+    )
+    parser.add_argument(
+        '--index',
+        type=Path,
+        default=INDEX_DIR,
+        help=f'Index directory (default: output/{INDEX_DIR.name})'
+    )
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    build = commands.add_parser('build', help='Build the index from the chunk export')
+    build.add_argument(
+        '--chunks',
+        type=Path,
+        default=CHUNKS_FILE,
+        help=f'Chunk JSONL export (default: output/{CHUNKS_FILE.name})'
+    )
+
+    query = commands.add_parser('query', help='Return the top-k chunks for a query')
+    query.add_argument('text', help='Query text')
+    query.add_argument('--top-k', type=int, default=5, help='Number of results (default: 5)')
+    query.add_argument('--match-all', action='store_true', help='Only chunks containing every query term')
+    query.add_argument('--json', action='store_true', help='Print results as one JSON document')
+
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        if not args.chunks.exists():
+            print(f"❌ Chunk export not found: {args.chunks}")
+            print("   Run: python process_documents.py --export-chunks")
+            sys.exit(1)
+
+        start = time.perf_counter()
+        index = build_index(args.chunks, args.index)
+        print(f"✅ Indexed {len(index)} chunks, {len(index.terms):,} terms, "
+              f"{len(index.postings):,} postings in {time.perf_counter() - start:.2f}s")
+        print(f"📍 Index directory: {args.index}")
+        return
+
+    try:
+        index = BM25Index.load(args.index)
+    except (FileNotFoundError, ValueError) as e:
+        print(f"❌ {e}")
+        print("   Run: python bm25_index.py build")
+        sys.exit(1)
+
+    start = time.perf_counter()
+    results = index.search(args.text, top_k=args.top_k, match_all=args.match_all)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+
+    if args.json:
+        print(json.dumps({'query': args.text, 'took_ms': round(elapsed_ms, 3), 'results': results},
+                         ensure_ascii=False))
+        return
+
+    print(f"🔎 {len(results)} results in {elapsed_ms:.2f} ms")
+    for rank, result in enumerate(results, 1):
+        print(f"   {rank}. [{result['score']:.3f}] {result['id']}  {result['filename']} #{result['chunk_index']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,437 @@
+"""
+SMAN 1 Baleendah Chunk Embedding Stage
+Compute embeddings for exported chunks offline, in batches, with a vector cache
+
+Reads the JSONL produced by `process_documents.py --export-chunks` and stores
+one float32 vector per chunk in a NumPy .npy matrix keyed by chunk content
+hash. Re-runs only embed chunks whose hash is not in the store yet, and rows
+for chunks that disappeared from the export are dropped.
+
+Backends:
+- hashing               - deterministic feature hashing, no model needed (tests/CI)
+- sentence-transformers - local CPU model, default intfloat/multilingual-e5-small
+                          (same model and "passage: " prefix as EmbeddingService)
+
+Requirements:
+- pip install numpy
+- pip install sentence-transformers   (only for the sentence-transformers backend)
+
+Usage:
+- python embed_chunks.py
+- python embed_chunks.py --backend sentence-transformers --batch-size 32
+- python embed_chunks.py --pgvector-tsv output/chunk_embeddings.tsv
+"""
+
+import os
+import sys
+import argparse
+import hashlib
+import json
+import re
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    print("Installing numpy...")
+    os.system("pip install numpy")
+    import numpy as np
+
+# Initialize paths
+DOC_ROOT = Path(__file__).parent
+OUTPUT_DIR = DOC_ROOT / "output"
+CHUNKS_FILE = OUTPUT_DIR / "smansa_dokumen_chunks.jsonl"
+EMBEDDINGS_FILE = OUTPUT_DIR / "chunk_embeddings.npy"
+
+# Must match EmbeddingService::$dimensions / the rag_document_chunks vector column
+EMBEDDING_DIMENSIONS = 384
+
+
+class HashingEmbeddingBackend:
+    """
+    Deterministic bag-of-words embedding using signed feature hashing
+
+    Words and word bigrams are hashed into a fixed number of buckets and the
+    result is L2-normalised. Not semantic, but stable across runs and
+    machines, which makes it suitable for tests and for lexical fallback.
+    """
+
+    name = 'hashing'
+
+    def __init__(self, dimensions: int = EMBEDDING_DIMENSIONS):
+        self.dimensions = dimensions
+        self.model = f"hashing-{dimensions}"
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """Embed a batch of texts into a (len(texts), dimensions) float32 matrix"""
+        vectors = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+
+        for row, text in enumerate(texts):
+            words = re.findall(r'\w+', text.lower())
+            features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+            for feature in features:
+                digest = hashlib.blake2b(feature.encode('utf-8'), digest_size=8).digest()
+                value = int.from_bytes(digest, 'little')
+                sign = 1.0 if value & 1 else -1.0
+                vectors[row, (value >> 1) % self.dimensions] += sign
+
+        return _normalize(vectors)
+
+    def embed_query(self, text: str) -> np.ndarray:
+        """Embed a search query (same features as passages)"""
+        return self.embed([text])[0]
+
+
+class SentenceTransformerBackend:
+    """Local CPU embedding model via sentence-transformers (E5-style prefixes)"""
+
+    name = 'sentence-transformers'
+
+    def __init__(self, model: str = 'intfloat/multilingual-e5-small', device: str = 'cpu'):
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError:
+            raise ImportError(
+                "sentence-transformers is not installed. "
+                "Run: pip install sentence-transformers (or use --backend hashing)"
+            )
+
+        self.model = model
+        self.encoder = SentenceTransformer(model, device=device)
+        self.dimensions = self.encoder.get_sentence_embedding_dimension()
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """Embed a batch of texts into a (len(texts), dimensions) float32 matrix"""
+        vectors = self.encoder.encode(
+            [f"passage: {text}" for text in texts],
+            batch_size=len(texts),
+            normalize_embeddings=True,
+            show_progress_bar=False,
+        )
+        return np.asarray(vectors, dtype=np.float32)
+
+    def embed_query(self, text: str) -> np.ndarray:
+        """Embed a search query with the E5 "query: " prefix"""
+        vector = self.encoder.encode([f"query: {text}"], normalize_embeddings=True, show_progress_bar=False)
+        return np.asarray(vector[0], dtype=np.float32)
+
+
+BACKENDS = {
+    HashingEmbeddingBackend.name: HashingEmbeddingBackend,
+    SentenceTransformerBackend.name: SentenceTransformerBackend,
+}
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    """L2-normalise rows in place (zero rows stay zero)"""
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    vectors /= norms
+    return vectors
+
+
+def iter_chunks(chunks_file: Path) -> Iterator[Dict]:
+    """Read chunk records from the JSONL export one at a time"""
+    with open(chunks_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+class EmbeddingStore:
+    """
+    On-disk vector cache: a float32 .npy matrix plus a parallel array of keys
+
+    Files (for chunk_embeddings.npy), per write generation N:
+    - chunk_embeddings.N.npy       (rows, dimensions) float32, memory-mappable
+    - chunk_embeddings.N.keys.npy  (rows,) chunk content hashes
+    - chunk_embeddings.meta.json   manifest: backend/model/dimensions the
+                                   vectors came from, rows and generation
+
+    A write fills a new generation and replaces the manifest last, so readers
+    never see a matrix and keys from different writes. The previous
+    generation is kept for readers still using it, older ones are deleted.
+
+    Vectors from a different backend, model or dimension are never mixed:
+    if the metadata does not match, the store starts empty.
+    """
+
+    SETTINGS = ('backend', 'model', 'dimensions')
+
+    def __init__(self, path: Path = EMBEDDINGS_FILE):
+        self.path = path
+        self.meta_path = path.with_name(path.stem + '.meta.json')
+
+    def _generation_file(self, generation: int, suffix: str) -> Path:
+        return self.path.with_name(f"{self.path.stem}.{generation}{suffix}")
+
+    def matrix_path(self, meta: Dict) -> Path:
+        """Matrix file of the generation named in meta"""
+        return self._generation_file(meta['generation'], '.npy')
+
+    def keys_path(self, meta: Dict) -> Path:
+        """Keys file of the generation named in meta"""
+        return self._generation_file(meta['generation'], '.keys.npy')
+
+    @classmethod
+    def settings(cls, meta: Dict) -> Dict:
+        """Backend settings part of the metadata (what vectors are comparable by)"""
+        return {key: meta.get(key) for key in cls.SETTINGS}
+
+    def load_meta(self) -> Optional[Dict]:
+        """Return the store manifest, or None if the store does not exist"""
+        if not self.meta_path.exists():
+            return None
+        with open(self.meta_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        # Stores written before generations are re-embedded
+        return meta if 'generation' in meta else None
+
+    def load(self, meta: Dict) -> Tuple[List[str], np.ndarray]:
+        """
+        Load keys and memory-map the matrix (read-only) of the generation in meta
+
+        Raises:
+            ValueError: If the files do not match the row count and dimensions in meta
+        """
+        keys = [key.decode('ascii') for key in np.load(self.keys_path(meta))]
+        matrix = np.load(self.matrix_path(meta), mmap_mode='r')
+
+        expected = (meta['rows'], meta['dimensions'])
+        if len(keys) != meta['rows'] or matrix.shape != expected:
+            raise ValueError(f"Store generation {meta['generation']} has {len(keys)} keys and a "
+                             f"{matrix.shape} matrix, manifest says {expected}")
+        return keys, matrix
+
+    def compatible_index(self, meta: Dict) -> Tuple[Dict[str, int], Optional[np.ndarray]]:
+        """Map hash -> row and the matrix of existing vectors produced with the same backend settings"""
+        stored = self.load_meta()
+        if stored is None or self.settings(stored) != self.settings(meta):
+            return {}, None
+
+        try:
+            keys, matrix = self.load(stored)
+        except (OSError, ValueError) as e:
+            print(f"⚠️  Ignoring unreadable embedding store: {e}")
+            return {}, None
+        return {key: row for row, key in enumerate(keys)}, matrix
+
+    def write(self, keys: List[str], fill: Callable[[np.ndarray], None], dimensions: int, meta: Dict) -> Dict:
+        """
+        Write a new generation and publish it by replacing the manifest
+
+        fill receives the preallocated, memory-mapped (len(keys), dimensions)
+        matrix and writes every row, so vectors go to disk as they are produced.
+
+        Returns:
+            dict: The new manifest
+        """
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        previous = self.load_meta()
+        generation = previous['generation'] + 1 if previous else 1
+        manifest = {**self.settings(meta), 'rows': len(keys), 'generation': generation}
+
+        matrix = np.lib.format.open_memmap(
+            self.matrix_path(manifest), mode='w+', dtype=np.float32, shape=(len(keys), dimensions)
+        )
+        fill(matrix)
+        matrix.flush()
+        del matrix
+
+        np.save(self.keys_path(manifest), np.array(keys, dtype='S64'))
+
+        tmp_meta = self.meta_path.with_name(self.meta_path.name + '.tmp')
+        with open(tmp_meta, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_meta, self.meta_path)
+
+        self._remove_old_generations({generation, previous['generation'] if previous else generation})
+        return manifest
+
+    def _remove_old_generations(self, keep: set):
+        """Delete files of generations not in keep (and of the pre-generation layout)"""
+        stem = self.path.stem
+        for path in self.path.parent.glob(f"{stem}.*"):
+            generation = path.name[len(stem) + 1:].split('.', 1)[0]
+            legacy = path == self.path or path.name == f"{stem}.keys.npy"
+            if legacy or (generation.isdigit() and int(generation) not in keep):
+                try:
+                    path.unlink()
+                except OSError:
+                    pass  # still memory-mapped by a reader (Windows), removed on a later write
+
+
+class ChunkEmbedder:
+    """Embed exported chunks in batches, reusing cached vectors by content hash"""
+
+    def __init__(self, backend, store: EmbeddingStore, batch_size: int = 64):
+        self.backend = backend
+        self.store = store
+        self.batch_size = batch_size
+        self.reused = 0
+        self.embedded = 0
+
+    def run(self, chunks_file: Path = CHUNKS_FILE) -> int:
+        """Bring the store in sync with chunks_file, returns number of vectors stored"""
+        meta = {
+            'backend': self.backend.name,
+            'model': self.backend.model,
+            'dimensions': self.backend.dimensions,
+        }
+        existing, old_matrix = self.store.compatible_index(meta)
+
+        # Unique chunk hashes in export order (identical chunks share one vector)
+        keys = list(dict.fromkeys(record['content_hash'] for record in iter_chunks(chunks_file)))
+        rows = {key: row for row, key in enumerate(keys)}
+        self.reused = sum(1 for key in keys if key in existing)
+        self.embedded = 0
+
+        def fill(matrix: np.ndarray):
+            self._copy_cached(matrix, keys, existing, old_matrix)
+            self._embed_new(matrix, chunks_file, rows, existing)
+
+        self.store.write(keys, fill, self.backend.dimensions, meta)
+        return len(keys)
+
+    def _copy_cached(self, matrix: np.ndarray, keys: List[str], existing: Dict[str, int],
+                     old_matrix: Optional[np.ndarray]):
+        """Copy reused vectors from the previous generation, batch_size rows at a time"""
+        if old_matrix is None:
+            return
+
+        for start in range(0, len(keys), self.batch_size):
+            block = [(row, existing[key]) for row, key in enumerate(keys[start:start + self.batch_size], start)
+                     if key in existing]
+            if block:
+                new_rows, old_rows = zip(*block)
+                matrix[list(new_rows)] = old_matrix[list(old_rows)]
+
+    def _embed_new(self, matrix: np.ndarray, chunks_file: Path, rows: Dict[str, int], existing: Dict[str, int]):
+        """Embed chunks whose hash is new, batch_size texts per backend call, straight into matrix"""
+        seen = set()
+        batch_keys = []
+        batch_texts = []
+
+        for record in iter_chunks(chunks_file):
+            key = record['content_hash']
+            if key in existing or key in seen:
+                continue
+
+            seen.add(key)
+            batch_keys.append(key)
+            batch_texts.append(record['text'])
+
+            if len(batch_texts) >= self.batch_size:
+                self._embed_batch(matrix, [rows[k] for k in batch_keys], batch_texts)
+                batch_keys, batch_texts = [], []
+
+        if batch_texts:
+            self._embed_batch(matrix, [rows[k] for k in batch_keys], batch_texts)
+
+    def _embed_batch(self, matrix: np.ndarray, rows: List[int], texts: List[str]):
+        """Embed one batch into its rows of the output matrix"""
+        matrix[rows] = self.backend.embed(texts)
+        self.embedded += len(rows)
+        print(f"   🧮 Embedded {self.embedded} new chunks...")
+
+
+def export_pgvector_tsv(chunks_file: Path, store: EmbeddingStore, output_file: Path) -> int:
+    """
+    Write a TSV for a single bulk `COPY ... FROM` into a pgvector staging table
+
+    Columns: document_id, chunk_index, token_count, content_hash, embedding
+    (embedding in pgvector text format, e.g. [0.1,0.2,...]).
+    """
+    keys, matrix = store.load(store.load_meta())
+    index = {key: row for row, key in enumerate(keys)}
+    count = 0
+
+    with open(output_file, 'w', encoding='utf-8') as f:
+        for record in iter_chunks(chunks_file):
+            vector = matrix[index[record['content_hash']]]
+            literal = '[' + ','.join(f"{value:.7g}" for value in vector) + ']'
+            f.write(f"{record['document_id']}\t{record['chunk_index']}\t{record['token_count']}\t"
+                    f"{record['content_hash']}\t{literal}\n")
+            count += 1
+
+    return count
+
+
+def main():
+    """Main execution function"""
+    parser = argparse.ArgumentParser(
+        description='Embed exported document chunks in batches with a local backend'
+    )
+
+    parser.add_argument(
+        '--chunks',
+        type=Path,
+        default=CHUNKS_FILE,
+        help=f'Chunk JSONL export (default: output/{CHUNKS_FILE.name})'
+    )
+
+    parser.add_argument(
+        '--output',
+        type=Path,
+        default=EMBEDDINGS_FILE,
+        help=f'Embedding matrix .npy (default: output/{EMBEDDINGS_FILE.name})'
+    )
+
+    parser.add_argument(
+        '--backend',
+        choices=sorted(BACKENDS),
+        default=HashingEmbeddingBackend.name,
+        help='Embedding backend (default: hashing)'
+    )
+
+    parser.add_argument(
+        '--model',
+        type=str,
+        default='intfloat/multilingual-e5-small',
+        help='Model name for the sentence-transformers backend'
+    )
+
+    parser.add_argument(
+        '--batch-size',
+        type=int,
+        default=64,
+        help='Number of chunks per embedding call (default: 64)'
+    )
+
+    parser.add_argument(
+        '--pgvector-tsv',
+        type=Path,
+        default=None,
+        help='Also write a TSV for one bulk COPY into pgvector'
+    )
+
+    args = parser.parse_args()
+
+    if not args.chunks.exists():
+        print(f"❌ Chunk export not found: {args.chunks}")
+        print("   Run: python process_documents.py --export-chunks")
+        sys.exit(1)
+
+    if args.backend == SentenceTransformerBackend.name:
+        backend = SentenceTransformerBackend(model=args.model)
+    else:
+        backend = HashingEmbeddingBackend()
+
+    print(f"🧮 Embedding chunks with {backend.name} ({backend.model}, {backend.dimensions} dims)")
+
+    store = EmbeddingStore(args.output)
+    embedder = ChunkEmbedder(backend, store, batch_size=args.batch_size)
+    total = embedder.run(args.chunks)
+
+    print(f"✅ Stored {total} vectors ({embedder.reused} cached, {embedder.embedded} newly embedded)")
+    print(f"📍 Output file: {store.matrix_path(store.load_meta())}")
+
+    if args.pgvector_tsv:
+        rows = export_pgvector_tsv(args.chunks, store, args.pgvector_tsv)
+        print(f"📍 pgvector TSV: {args.pgvector_tsv} ({rows} rows)")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,24 +4,101 @@ Extract content from documents and images to structured markdown format for RAG/
 
 Supported formats:
 - PDF, DOCX, XLSX - text extraction
-- Images (PNG, JPEG) - description/extraction
+- Images (PNG, JPEG) - OCR text (Tesseract, Indonesian + English)
+- Scanned (image-only) PDF pages - OCR of the embedded page images
 
 Requirements:
-- pip install pypdf2 python-docx openpyxl pytesseract pillow tqdm
+- pip install pypdf2 python-docx openpyxl pytesseract pillow tqdm numpy
+- Tesseract with the ind and eng language data for OCR (apt install
+  tesseract-ocr tesseract-ocr-ind); without it images fall back to a
+  short description
+
+Usage:
+- python process_documents.py
+- python process_documents.py --workers 4   (parallel extraction, 0 = all cores)
+- python process_documents.py --no-cache    (ignore output/extraction_cache.sqlite)
+- python process_documents.py --export-chunks   (also write output/smansa_dokumen_chunks.jsonl)
+- python process_documents.py --export-chunks --dedup-threshold 0.9 / --no-dedup   (near-duplicate chunks)
+- python process_documents.py --export-chunks --no-bm25   (skip rebuilding output/bm25_index/)
+- python process_documents.py --max-pages 20 / --pages 1-50   (cap or select PDF pages)
+- python process_documents.py --profile / --tracemalloc   (profile hot spots on real data)
+- python process_documents.py --no-ocr / --ocr-lang ind / --ocr-workers 4   (OCR settings)
 """
 
 import os
 import sys
+import argparse
+import math
+import hashlib
+import json
+import sqlite3
+import csv
+import io
+import shutil
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import deque
+from itertools import chain
 from pathlib import Path
 from datetime import datetime
-from typing import Dict, List, Optional
-from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, List, Optional, Set, TextIO, Tuple
+from dataclasses import dataclass, field, asdict
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
 import re
 
+from bm25_index import INDEX_DIR as BM25_INDEX_DIR, build_index as build_bm25_index
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
 # Initialize paths
 DOC_ROOT = Path(__file__).parent
 OUTPUT_DIR = DOC_ROOT / "output"
 OUTPUT_FILE = OUTPUT_DIR / "smansa_dokumen_processed.md"
+CACHE_FILE = OUTPUT_DIR / "extraction_cache.sqlite"
+CHUNKS_FILE = OUTPUT_DIR / "smansa_dokumen_chunks.jsonl"
+DUPLICATES_FILE = OUTPUT_DIR / "chunk_duplicates.json"
+XLSX_SPILL_DIR = OUTPUT_DIR / "xlsx_sheets"
+METRICS_FILE = OUTPUT_DIR / "process_metrics.jsonl"
+PROFILE_FILE = OUTPUT_DIR / "process_profile.prof"
+
+SUPPORTED_EXTENSIONS = {'.pdf', '.docx', '.xlsx', '.png', '.jpg', '.jpeg'}
+
+# Extractor name per extension (used for metrics)
+EXTRACTORS = {'.pdf': 'pdf', '.docx': 'docx', '.xlsx': 'xlsx', '.png': 'image', '.jpg': 'image', '.jpeg': 'image'}
+
+# Bump when any extractor changes its output, so cached results are re-extracted
+EXTRACTOR_VERSION = "1.3"
+
+# Separates PDF pages in document content (TextNormalizer uses it to find
+# repeated headers/footers and replaces it with a line break)
+PAGE_BREAK = "\f"
+
+# Tesseract languages, and the version of the OCR pre-processing (bump when
+# scaling/binarization changes, so cached OCR text is recomputed)
+OCR_LANG = "ind+eng"
+OCR_VERSION = "1.0"
+
+# Images are scaled towards the width of an A4 page at 300 DPI, the
+# resolution Tesseract is trained for (upscaling at most 3x)
+OCR_TARGET_WIDTH = 2480
+OCR_MAX_UPSCALE = 3.0
+
+# Rows per XLSX sheet rendered into the knowledge base (0 = unlimited)
+XLSX_MAX_ROWS = 2000
+
+# Must match RagService::$chunkSize / $chunkOverlap in the Laravel app
+CHUNK_SIZE = 512
+CHUNK_OVERLAP = 50
+
+# Chunks whose estimated Jaccard similarity (word 3-gram MinHash) reaches
+# this are near-duplicates, only the first one is exported
+DEDUP_THRESHOLD = 0.8
 
 # Create output directory
 OUTPUT_DIR.mkdir(exist_ok=True)
@@ -49,11 +126,24 @@ except ImportError:
     import openpyxl
 
 try:
-    from PIL import Image
+    from PIL import Image, ImageOps
 except ImportError:
     print("Installing Pillow...")
     os.system("pip install Pillow")
-    from PIL import Image
+    from PIL import Image, ImageOps
+
+try:
+    import numpy as np
+except ImportError:
+    print("Installing numpy...")
+    os.system("pip install numpy")
+    import numpy as np
+
+# OCR is optional: it also needs the tesseract binary, which pip cannot install
+try:
+    import pytesseract
+except ImportError:
+    pytesseract = None
 
 
 @dataclass
@@ -65,54 +155,668 @@ class ProcessedDocument:
     metadata: Dict[str, str] = field(default_factory=dict)
     images: List[str] = field(default_factory=list)
     processing_date: str = datetime.now().isoformat()
+    # Path relative to the scanned directory (the extraction cache key),
+    # unique where filenames are not
+    source_path: str = ''
+    # Normalized content, computed once for all consumers (not cached)
+    clean_content: Optional[str] = None
+
+
+class ExtractionCache:
+    """
+    Persistent extraction cache stored as a SQLite sidecar in OUTPUT_DIR
+
+    Entries are keyed by relative path and are only reused when both the file
+    content hash (SHA-256) and extractor version match. File size and mtime are
+    stored too, so unchanged files are recognised without re-hashing them.
+
+    PDF page text is also cached per (content hash, page number, page
+    version), so a PDF that failed part-way resumes at the failing page on
+    the next run; the page version includes the OCR mode, so OCR and
+    non-OCR runs keep their own page text. Pool workers open their own
+    connection to the same file (autocommit + WAL).
+
+    OCR text is cached per image content hash, independent of the file it
+    came from, so re-OCR only happens for images never seen before.
+    """
+    
+    def __init__(self, db_path: Path = CACHE_FILE, variants: Optional[Dict[str, str]] = None,
+                 page_variant: str = ''):
+        self.db_path = db_path
+        # Extraction options are part of the version of the extractor they
+        # change (e.g. page limits for 'pdf'), so limited and full extractions
+        # never mix and other file types keep their entries
+        self.variants = dict(variants or {})
+        # Page text only depends on options that change a single page (OCR)
+        self.page_variant = page_variant
+        self.page_version = EXTRACTOR_VERSION + page_variant
+        # Every method takes the lock, OCR threads share the connection
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(str(db_path), timeout=30, isolation_level=None,
+                                    check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        
+        # Caches from before per-extractor versions kept one entry per path
+        primary_key = [row[1] for row in self.conn.execute("PRAGMA table_info(extractions)") if row[5]]
+        if primary_key == ['path']:
+            self.conn.execute("DROP TABLE extractions")
+        # Same for page text, where OCR and non-OCR runs overwrote each other
+        primary_key = [row[1] for row in self.conn.execute("PRAGMA table_info(pdf_pages)") if row[5]]
+        if primary_key == ['content_hash', 'page_number']:
+            self.conn.execute("DROP TABLE pdf_pages")
+        
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS extractions (
+                path TEXT NOT NULL,
+                content_hash TEXT NOT NULL,
+                extractor_version TEXT NOT NULL,
+                file_size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                document TEXT NOT NULL,
+                updated_at TEXT NOT NULL,
+                PRIMARY KEY (path, extractor_version)
+            )
+        """)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS pdf_pages (
+                content_hash TEXT NOT NULL,
+                page_number INTEGER NOT NULL,
+                extractor_version TEXT NOT NULL,
+                text TEXT NOT NULL,
+                PRIMARY KEY (content_hash, page_number, extractor_version)
+            )
+        """)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS ocr_results (
+                image_hash TEXT NOT NULL,
+                ocr_version TEXT NOT NULL,
+                text TEXT NOT NULL,
+                PRIMARY KEY (image_hash, ocr_version)
+            )
+        """)
+    
+    def version(self, key: str) -> str:
+        """Extractor version of a file, including the options its extractor depends on"""
+        extractor = EXTRACTORS.get(Path(key).suffix.lower(), '')
+        return EXTRACTOR_VERSION + self.variants.get(extractor, '')
+    
+    @staticmethod
+    def hash_file(file_path: Path) -> str:
+        """Compute SHA-256 of file content in 1 MB blocks"""
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+        return digest.hexdigest()
+    
+    def content_hash(self, key: str, file_path: Path) -> str:
+        """Return content hash, reusing the stored one if size and mtime are unchanged"""
+        stat = file_path.stat()
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT content_hash, file_size, mtime_ns FROM extractions WHERE path = ? "
+                "ORDER BY updated_at DESC LIMIT 1", (key,)
+            ).fetchone()
+        
+        if row and row[1] == stat.st_size and row[2] == stat.st_mtime_ns:
+            return row[0]
+        
+        return self.hash_file(file_path)
+    
+    def has(self, key: str, content_hash: str) -> bool:
+        """Check whether a valid entry exists without loading the document"""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT 1 FROM extractions WHERE path = ? AND content_hash = ? AND extractor_version = ?",
+                (key, content_hash, self.version(key))
+            ).fetchone()
+        return row is not None
+    
+    def get(self, key: str, content_hash: str) -> Optional[ProcessedDocument]:
+        """Return cached document if content and extractor version still match"""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT document FROM extractions WHERE path = ? AND content_hash = ? AND extractor_version = ?",
+                (key, content_hash, self.version(key))
+            ).fetchone()
+        
+        if row is None:
+            return None
+        
+        return ProcessedDocument(**json.loads(row[0]))
+    
+    def put(self, key: str, content_hash: str, file_path: Path, doc: ProcessedDocument):
+        """Store extracted document for this file content"""
+        stat = file_path.stat()
+        document = json.dumps({k: v for k, v in asdict(doc).items() if k != 'clean_content'}, ensure_ascii=False)
+        with self._lock:
+            # Entries of other versions stay valid only while the content is the same
+            self.conn.execute(
+                "DELETE FROM extractions WHERE path = ? AND content_hash != ?", (key, content_hash)
+            )
+            self.conn.execute(
+                "INSERT OR REPLACE INTO extractions VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    key,
+                    content_hash,
+                    self.version(key),
+                    stat.st_size,
+                    stat.st_mtime_ns,
+                    document,
+                    datetime.now().isoformat(),
+                )
+            )
+    
+    def get_page(self, content_hash: str, page_number: int) -> Optional[str]:
+        """Return cached text of one PDF page, or None if not extracted yet"""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT text FROM pdf_pages WHERE content_hash = ? AND page_number = ? AND extractor_version = ?",
+                (content_hash, page_number, self.page_version)
+            ).fetchone()
+        return row[0] if row else None
+    
+    def put_page(self, content_hash: str, page_number: int, text: str):
+        """Store text of one successfully extracted PDF page"""
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO pdf_pages VALUES (?, ?, ?, ?)",
+                (content_hash, page_number, self.page_version, text)
+            )
+    
+    def get_ocr(self, image_hash: str, ocr_version: str) -> Optional[str]:
+        """Return cached OCR text of an image, or None if not recognised yet"""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT text FROM ocr_results WHERE image_hash = ? AND ocr_version = ?",
+                (image_hash, ocr_version)
+            ).fetchone()
+        return row[0] if row else None
+    
+    def put_ocr(self, image_hash: str, ocr_version: str, text: str):
+        """Store OCR text of one image (called from OCR threads)"""
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO ocr_results VALUES (?, ?, ?)",
+                (image_hash, ocr_version, text)
+            )
+    
+    def evict_missing(self, keep_keys: List[str], keep_hashes: Optional[List[str]] = None) -> int:
+        """Delete entries for files that no longer exist, returns number evicted"""
+        keep = set(keep_keys)
+        keep_content = set(keep_hashes or [])
+        
+        with self._lock:
+            stale = [row[0] for row in self.conn.execute("SELECT DISTINCT path FROM extractions")
+                     if row[0] not in keep]
+            self.conn.executemany("DELETE FROM extractions WHERE path = ?", [(key,) for key in stale])
+            
+            # Page text of files whose content is gone (deleted or modified)
+            stale_pages = [row[0] for row in self.conn.execute("SELECT DISTINCT content_hash FROM pdf_pages")
+                           if row[0] not in keep_content]
+            self.conn.executemany("DELETE FROM pdf_pages WHERE content_hash = ?", [(h,) for h in stale_pages])
+        
+        return len(stale)
+    
+    def close(self):
+        """Close the database"""
+        with self._lock:
+            self.conn.close()
+
+
+@lru_cache(maxsize=None)
+def tesseract_languages() -> Tuple[str, ...]:
+    """Installed Tesseract language packs (empty if pytesseract or tesseract is missing)"""
+    if pytesseract is None:
+        return ()
+    try:
+        return tuple(pytesseract.get_languages(config=''))
+    except Exception:
+        return ()
+
+
+def _otsu_threshold(histogram: List[int]) -> int:
+    """Gray level that best separates ink from background (Otsu's method)"""
+    total = sum(histogram)
+    weighted_total = sum(level * count for level, count in enumerate(histogram))
+    background = weighted_background = 0
+    best_level, best_variance = 127, -1.0
+    
+    for level, count in enumerate(histogram):
+        background += count
+        foreground = total - background
+        if background == 0:
+            continue
+        if foreground == 0:
+            break
+        
+        weighted_background += level * count
+        mean_background = weighted_background / background
+        mean_foreground = (weighted_total - weighted_background) / foreground
+        variance = background * foreground * (mean_background - mean_foreground) ** 2
+        if variance > best_variance:
+            best_level, best_variance = level, variance
+    
+    return best_level
+
+
+def prepare_for_ocr(image: 'Image.Image') -> 'Image.Image':
+    """
+    Pre-process an image for Tesseract
+
+    Applies the EXIF orientation, flattens transparency onto white, scales
+    the image towards OCR_TARGET_WIDTH and binarizes it with an Otsu
+    threshold after stretching the contrast.
+    """
+    image = ImageOps.exif_transpose(image)
+    if image.mode in ('RGBA', 'LA') or 'transparency' in image.info:
+        image = image.convert('RGBA')
+        image = Image.alpha_composite(Image.new('RGBA', image.size, 'white'), image)
+    gray = image.convert('L')
+    
+    # Small images (phone screenshots, 150 DPI scans) are upscaled, huge
+    # ones downscaled; anything close to the target is left alone
+    scale = min(OCR_TARGET_WIDTH / gray.width, OCR_MAX_UPSCALE)
+    if scale > 1.25 or scale < 0.5:
+        size = (max(1, round(gray.width * scale)), max(1, round(gray.height * scale)))
+        gray = gray.resize(size, Image.Resampling.LANCZOS)
+    
+    gray = ImageOps.autocontrast(gray, cutoff=1)
+    threshold = _otsu_threshold(gray.histogram())
+    return gray.point(lambda value: 255 if value > threshold else 0)
+
+
+class OcrEngine:
+    """
+    Tesseract OCR on a thread pool, with results cached per image hash
+
+    Every recognition runs in its own tesseract process, so threads are
+    enough for real parallelism. Languages that are not installed are
+    dropped; the engine is unavailable when none is left.
+    """
+    
+    # Images smaller than this (logos, bullets, rules in PDFs) carry no text worth reading
+    MIN_SIDE = 48
+    
+    def __init__(self, lang: str = OCR_LANG, workers: int = 1, cache: Optional[ExtractionCache] = None):
+        """
+        Args:
+            lang (str): Tesseract languages joined by '+', e.g. 'ind+eng'
+            workers (int): Concurrent tesseract processes
+            cache (ExtractionCache): Optional OCR result cache
+        """
+        installed = set(tesseract_languages())
+        requested = [code for code in lang.split('+') if code]
+        self.lang = '+'.join(code for code in requested if code in installed)
+        self.missing = [code for code in requested if code not in installed]
+        self.workers = max(workers, 1)
+        self.cache = cache
+        self.version = f"{OCR_VERSION}:{self.lang}"
+        self._executor = None
+    
+    @property
+    def available(self) -> bool:
+        return bool(self.lang)
+    
+    def submit(self, images: List[bytes]) -> Future:
+        """Queue OCR of encoded images, returns a Future of their joined text"""
+        if self._executor is None:
+            if self.workers > 1:
+                # Parallelism comes from the pool, not from tesseract's own threads
+                os.environ.setdefault('OMP_THREAD_LIMIT', '1')
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='ocr')
+        
+        return self._executor.submit(
+            lambda: "\n\n".join(text for text in map(self.recognize, images) if text)
+        )
+    
+    def recognize(self, data: bytes) -> str:
+        """OCR text of one encoded image, cached by the SHA-256 of its bytes"""
+        image_hash = hashlib.sha256(data).hexdigest()
+        if self.cache:
+            text = self.cache.get_ocr(image_hash, self.version)
+            if text is not None:
+                return text
+        
+        with Image.open(io.BytesIO(data)) as image:
+            if min(image.size) < self.MIN_SIDE:
+                text = ''
+            else:
+                text = pytesseract.image_to_string(prepare_for_ocr(image), lang=self.lang).strip()
+        
+        if self.cache:
+            self.cache.put_ocr(image_hash, self.version, text)
+        return text
+    
+    def close(self):
+        """Stop the thread pool"""
+        if self._executor:
+            self._executor.shutdown()
+            self._executor = None
+
+
+def _peak_memory_kb() -> int:
+    """
+    Peak memory of this process in KB
+
+    Uses the tracemalloc peak when tracing (exact Python allocations),
+    otherwise the process RSS high-water mark (0 where unsupported).
+    """
+    if tracemalloc.is_tracing():
+        return tracemalloc.get_traced_memory()[1] // 1024
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS reports bytes
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+class PipelineMetrics:
+    """
+    Per-file extraction metrics, written as JSON lines and summarised per extractor
+
+    Each processed file produces one {"type": "file", ...} record with the
+    extractor, wall time, bytes read, characters produced, peak memory delta
+    and error (if any). Stage timings and an end-of-run summary per extractor
+    are appended as {"type": "stage"} and {"type": "summary"} records.
+    """
+    
+    def __init__(self, output_file: Path = METRICS_FILE):
+        self.output_file = output_file
+        self.records: List[Dict] = []
+        self.stages: Dict[str, float] = {}
+        self.output_file.parent.mkdir(parents=True, exist_ok=True)
+        self._out = open(output_file, 'w', encoding='utf-8')
+    
+    def record(self, record: Dict):
+        """Store and write one per-file record"""
+        record = {'type': 'file', **record}
+        # Keep only the numbers needed for the summary, not the whole history
+        self.records.append({k: record[k] for k in ('extractor', 'seconds', 'bytes', 'chars',
+                                                    'peak_mem_delta_kb', 'error', 'cached')})
+        self._write(record)
+    
+    def add_stage(self, stage: str, seconds: float):
+        """Accumulate wall time for a pipeline stage"""
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+    
+    def summary(self) -> Dict[str, Dict]:
+        """Aggregate file records per extractor"""
+        summary: Dict[str, Dict] = {}
+        
+        for record in self.records:
+            row = summary.setdefault(record['extractor'], {
+                'files': 0, 'cached': 0, 'errors': 0, 'seconds': 0.0, 'max_seconds': 0.0,
+                'bytes': 0, 'chars': 0, 'max_peak_mem_delta_kb': 0,
+            })
+            row['files'] += 1
+            row['cached'] += int(record['cached'])
+            row['errors'] += int(record['error'] is not None)
+            row['seconds'] += record['seconds']
+            row['max_seconds'] = max(row['max_seconds'], record['seconds'])
+            row['bytes'] += record['bytes']
+            row['chars'] += record['chars']
+            row['max_peak_mem_delta_kb'] = max(row['max_peak_mem_delta_kb'], record['peak_mem_delta_kb'])
+        
+        return summary
+    
+    def close(self):
+        """Write stage timings and the per-extractor summary, then close the file"""
+        for stage, seconds in self.stages.items():
+            self._write({'type': 'stage', 'stage': stage, 'seconds': seconds})
+        self._write({'type': 'summary', 'extractors': self.summary()})
+        self._out.close()
+    
+    def print_summary(self):
+        """Print the end-of-run summary table"""
+        print(f"{'Extractor':<10}{'Files':>6}{'Cached':>7}{'Errors':>7}{'Total s':>9}{'Max s':>8}"
+              f"{'MB read':>9}{'Chars':>10}{'Peak ΔMB':>10}")
+        print("-" * 76)
+        
+        for extractor, row in sorted(self.summary().items()):
+            print(f"{extractor:<10}{row['files']:>6}{row['cached']:>7}{row['errors']:>7}"
+                  f"{row['seconds']:>9.2f}{row['max_seconds']:>8.2f}{row['bytes'] / (1024 * 1024):>9.2f}"
+                  f"{row['chars']:>10,}{row['max_peak_mem_delta_kb'] / 1024:>10.1f}")
+        
+        for stage, seconds in self.stages.items():
+            print(f"⏱️  {stage}: {seconds:.2f}s")
+    
+    def _write(self, record: Dict):
+        self._out.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._out.flush()
 
 
 class DocumentProcessor:
     """Main processor for all document types"""
     
-    def __init__(self):
-        self.documents: List[ProcessedDocument] = []
+    def __init__(self, cache: Optional[ExtractionCache] = None,
+                 max_pages: Optional[int] = None, page_range: Optional[Tuple[int, int]] = None,
+                 xlsx_max_rows: int = XLSX_MAX_ROWS, xlsx_spill_dir: Optional[Path] = None,
+                 metrics: Optional[PipelineMetrics] = None, ocr: Optional[OcrEngine] = None,
+                 normalizer: Optional['TextNormalizer'] = None):
+        """
+        Args:
+            cache (ExtractionCache): Optional document/page cache
+            max_pages (int): Extract at most this many pages per PDF
+            page_range (tuple): 1-based inclusive (first, last) PDF page range
+            xlsx_max_rows (int): Data rows rendered per XLSX sheet (0 = unlimited)
+            xlsx_spill_dir (Path): Write truncated sheets in full as CSV here
+            metrics (PipelineMetrics): Optional per-file metrics collector
+            ocr (OcrEngine): OCR for images and image-only PDF pages (None = disabled)
+            normalizer (TextNormalizer): Cleans each yielded document once (clean_content)
+        """
         self.image_counter = 0
+        self.cache = cache
+        self.max_pages = max_pages
+        self.page_range = page_range
+        self.xlsx_max_rows = xlsx_max_rows
+        self.xlsx_spill_dir = xlsx_spill_dir
+        self.metrics = metrics
+        self.ocr = ocr
+        self.normalizer = normalizer or TextNormalizer()
+        self.clean_seconds = 0.0
         
-    def process_directory(self, directory: Path) -> List[ProcessedDocument]:
-        """Process all documents in directory recursively"""
+    def process_directory(self, directory: Path, workers: int = 1) -> Iterator[ProcessedDocument]:
+        """
+        Process all documents in directory recursively
+
+        Args:
+            directory (Path): Root directory to scan
+            workers (int): Number of worker processes (1 = process in this process)
+
+        Yields:
+            ProcessedDocument: One document at a time, as soon as it is extracted,
+            with clean_content set for the markdown and chunk consumers
+
+        Results are always yielded in sorted path order, regardless of which
+        worker finishes first, so the generated markdown is reproducible.
+        With a cache, only new or modified files are extracted.
+        """
         print(f"📂 Scanning directory: {directory}")
         
-        # Get all files
-        all_files = list(directory.rglob("*"))
-        
-        # Filter by supported extensions
-        supported_extensions = {'.pdf', '.docx', '.xlsx', '.png', '.jpg', '.jpeg'}
-        files = [f for f in all_files if f.is_file() and f.suffix.lower() in supported_extensions]
+        files = self.scan_directory(directory)
         
         if not files:
             print("⚠️  No supported documents found!")
-            return []
+            if self.cache:
+                self.cache.evict_missing([])
+            return
         
         print(f"✅ Found {len(files)} files to process\n")
         
-        # Process each file
-        for i, file_path in enumerate(files, 1):
+        # Look up unchanged files in the extraction cache
+        keys = [file_path.relative_to(directory).as_posix() for file_path in files]
+        hashes: Dict[Path, str] = {}
+        cached = set()
+        
+        if self.cache:
+            for key, file_path in zip(keys, files):
+                hashes[file_path] = self.cache.content_hash(key, file_path)
+                if self.cache.has(key, hashes[file_path]):
+                    cached.add(file_path)
+            
+            print(f"♻️  Cache: {len(cached)} unchanged, {len(files) - len(cached)} to extract\n")
+        
+        pending = [f for f in files if f not in cached]
+        
+        if workers > 1 and len(pending) > 1:
+            print(f"⚙️  Using {workers} worker processes\n")
+            results = self._process_files_parallel(pending, workers, hashes)
+        else:
+            results = self._process_files_serial(pending, hashes)
+        
+        # Merge results in input order
+        for i, (key, file_path) in enumerate(zip(keys, files), 1):
             print(f"[{i}/{len(files)}] Processing: {file_path.name} ({file_path.suffix})")
             
-            try:
-                doc = self._process_file(file_path)
-                if doc:
-                    self.documents.append(doc)
-                    print(f"   ✅ Extracted {len(doc.content)} characters\n")
-            except Exception as e:
-                print(f"   ❌ Error: {str(e)}\n")
+            if file_path in cached:
+                doc = self.cache.get(key, hashes[file_path])
+                doc.source_path = key
+                print(f"   ♻️  Cached ({len(doc.content)} characters)\n")
+                if self.metrics:
+                    self.metrics.record(self._metrics_record(file_path, doc, None, 0.0, 0, cached=True))
+                yield self._clean(doc)
+                continue
+            
+            doc, error, record = next(results)
+            if self.metrics:
+                self.metrics.record(record)
+            
+            if error:
+                print(f"   ❌ Error: {error}\n")
+            elif doc:
+                doc.source_path = key
+                # Documents with failed pages or OCR are retried next run
+                # (their good pages are already in the page cache)
+                if self.cache and not doc.metadata.get('failed_pages') and not doc.metadata.get('ocr_error'):
+                    self.cache.put(key, hashes[file_path], file_path, doc)
+                print(f"   ✅ Extracted {len(doc.content)} characters\n")
+                yield self._clean(doc)
         
-        return self.documents
+        if self.cache:
+            evicted = self.cache.evict_missing(keys, list(hashes.values()))
+            if evicted:
+                print(f"🗑️  Evicted {evicted} cache entries for deleted files\n")
+    
+    def _clean(self, doc: ProcessedDocument) -> ProcessedDocument:
+        """Normalize the content once, for every consumer of the document"""
+        start = time.perf_counter()
+        self.normalizer.clean(doc)
+        self.clean_seconds += time.perf_counter() - start
+        return doc
+    
+    def scan_directory(self, directory: Path) -> List[Path]:
+        """Return supported files under directory, sorted for deterministic output order"""
+        # Get all files
+        all_files = sorted(directory.rglob("*"))
+        
+        # Filter by supported extensions
+        return [f for f in all_files if f.is_file() and f.suffix.lower() in SUPPORTED_EXTENSIONS]
+    
+    def _process_files_serial(self, files: List[Path], hashes: Dict[Path, str]):
+        """Process files one at a time in this process"""
+        for file_path in files:
+            yield self._process_file_measured(file_path, hashes.get(file_path))
     
-    def _process_file(self, file_path: Path) -> Optional[ProcessedDocument]:
-        """Route file to appropriate processor"""
+    def _process_file_measured(self, file_path: Path,
+                               content_hash: Optional[str] = None) -> Tuple[Optional[ProcessedDocument], Optional[str], Dict]:
+        """Process one file without raising, returns (document, error, metrics record)"""
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+            mem_before = tracemalloc.get_traced_memory()[0] // 1024
+        else:
+            mem_before = _peak_memory_kb()
+        
+        start = time.perf_counter()
+        doc, error = None, None
+        try:
+            doc = self._process_file(file_path, content_hash)
+        except Exception as e:
+            error = str(e)
+        seconds = time.perf_counter() - start
+        
+        mem_delta = max(_peak_memory_kb() - mem_before, 0)
+        return doc, error, self._metrics_record(file_path, doc, error, seconds, mem_delta)
+    
+    @staticmethod
+    def _metrics_record(file_path: Path, doc: Optional[ProcessedDocument], error: Optional[str],
+                        seconds: float, mem_delta_kb: int, cached: bool = False) -> Dict:
+        """Build the metrics record for one file"""
+        return {
+            'file': file_path.name,
+            'extractor': EXTRACTORS.get(file_path.suffix.lower(), 'unknown'),
+            'seconds': round(seconds, 6),
+            'bytes': file_path.stat().st_size,
+            'chars': len(doc.content) if doc else 0,
+            'peak_mem_delta_kb': mem_delta_kb,
+            'error': error,
+            'cached': cached,
+            'pid': os.getpid(),
+        }
+    
+    def _process_files_parallel(self, files: List[Path], workers: int, hashes: Dict[Path, str]):
+        """
+        Process files on a process pool, yielding results in input order
+
+        At most 2 * workers files are in flight, so finished results never
+        pile up in memory while the consumer is still writing earlier ones.
+        """
+        options = {
+            'cache_path': self.cache.db_path if self.cache else None,
+            'cache_variants': self.cache.variants if self.cache else {},
+            'max_pages': self.max_pages,
+            'page_range': self.page_range,
+            'xlsx_max_rows': self.xlsx_max_rows,
+            'xlsx_spill_dir': self.xlsx_spill_dir,
+            'ocr_lang': self.ocr.lang if self.ocr else None,
+            'ocr_workers': self.ocr.workers if self.ocr else 1,
+            'cache_page_variant': self.cache.page_variant if self.cache else '',
+            'tracemalloc': tracemalloc.is_tracing(),
+        }
+        
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            queue = iter(files)
+            in_flight = deque()
+            file_path_of = {}
+            
+            def submit(file_path: Path):
+                future = executor.submit(_process_file_isolated, file_path, options, hashes.get(file_path))
+                file_path_of[future] = file_path
+                in_flight.append(future)
+            
+            for file_path in queue:
+                submit(file_path)
+                if len(in_flight) >= workers * 2:
+                    break
+            
+            while in_flight:
+                future = in_flight.popleft()
+                
+                # Keep the pool busy while we wait for the oldest result
+                next_file = next(queue, None)
+                if next_file is not None:
+                    submit(next_file)
+                
+                try:
+                    doc, error, record = future.result()
+                except Exception as e:
+                    # Worker process died (e.g. crash inside a native parser)
+                    doc, error = None, f"Worker failed: {e}"
+                    record = self._metrics_record(file_path_of[future], None, error, 0.0, 0)
+                
+                if doc and doc.images:
+                    self.image_counter += 1
+                
+                yield doc, error, record
+    
+    def _process_file(self, file_path: Path, content_hash: Optional[str] = None) -> Optional[ProcessedDocument]:
+        """Route file to appropriate processor (content_hash: already computed file hash)"""
         suffix = file_path.suffix.lower()
         
         category = self._get_category(file_path)
         
         if suffix == '.pdf':
-            return self._process_pdf(file_path, category)
+            return self._process_pdf(file_path, category, content_hash)
         elif suffix == '.docx':
             return self._process_docx(file_path, category)
         elif suffix == '.xlsx':
@@ -142,31 +846,129 @@ class DocumentProcessor:
         else:
             return 'Umum'
     
-    def _process_pdf(self, file_path: Path, category: str) -> ProcessedDocument:
-        """Extract text from PDF"""
+    def _process_pdf(self, file_path: Path, category: str, content_hash: Optional[str] = None) -> ProcessedDocument:
+        """Extract text from PDF, one page at a time"""
         reader = PdfReader(str(file_path))
-        text_content = []
+        text_content = io.StringIO()
+        extracted = 0
+        failed_pages = []
         
-        for page in reader.pages:
-            try:
-                text = page.extract_text()
-                if text.strip():
-                    text_content.append(text)
-            except Exception as e:
-                print(f"   ⚠️  Error reading page: {e}")
+        for page_number, text in self.iter_pdf_pages(file_path, reader, failed_pages, content_hash):
+            extracted += 1
+            if text.strip():
+                if text_content.tell():
+                    text_content.write(PAGE_BREAK)
+                text_content.write(text)
         
-        full_text = "\n\n".join(text_content)
+        metadata = {
+            'pages': len(reader.pages),
+            'file_size': f"{file_path.stat().st_size / 1024:.1f} KB"
+        }
+        if extracted != len(reader.pages):
+            metadata['pages_extracted'] = extracted
+        if failed_pages:
+            metadata['failed_pages'] = ", ".join(str(n) for n in failed_pages)
         
         return ProcessedDocument(
             filename=file_path.name,
             category=category,
-            content=full_text,
-            metadata={
-                'pages': len(reader.pages),
-                'file_size': f"{file_path.stat().st_size / 1024:.1f} KB"
-            }
+            content=text_content.getvalue(),
+            metadata=metadata
         )
     
+    def iter_pdf_pages(self, file_path: Path, reader: Optional['PdfReader'] = None,
+                       failed_pages: Optional[List[int]] = None,
+                       content_hash: Optional[str] = None) -> Iterator[Tuple[int, str]]:
+        """
+        Lazily yield (page_number, text) for the selected pages of a PDF
+
+        Pages are extracted only when requested and never held together.
+        With a cache, page text is looked up/stored per (file hash, page),
+        so only pages that are missing or failed last time are extracted
+        (pass content_hash when the file was already hashed).
+        Pages that raise are reported, appended to failed_pages and skipped.
+
+        Pages without a text layer (scans) are OCR'd from their embedded
+        images. Up to 2 * OCR workers such pages are recognised in the
+        background while later pages are read; pages are still yielded in order.
+        """
+        reader = reader or PdfReader(str(file_path))
+        first, last = self._page_bounds(len(reader.pages))
+        if self.cache and content_hash is None:
+            content_hash = self.cache.hash_file(file_path)
+        window = self.ocr.workers * 2 if self.ocr else 0
+        pending = deque()  # (page_number, text or Future of OCR text, extracted now)
+        
+        def resolve(page_number: int, text, extracted: bool) -> Optional[str]:
+            if isinstance(text, Future):
+                try:
+                    text = text.result()
+                except Exception as e:
+                    print(f"   ⚠️  OCR failed on page {page_number}: {e}")
+                    if failed_pages is not None:
+                        failed_pages.append(page_number)
+                    return None
+            
+            if extracted and self.cache:
+                self.cache.put_page(content_hash, page_number, text)
+            return text
+        
+        for page_number in range(first, last + 1):
+            text = self.cache.get_page(content_hash, page_number) if self.cache else None
+            extracted = text is None
+            
+            if extracted:
+                try:
+                    page = reader.pages[page_number - 1]
+                    text = page.extract_text() or ''
+                except Exception as e:
+                    print(f"   ⚠️  Error reading page {page_number}: {e}")
+                    if failed_pages is not None:
+                        failed_pages.append(page_number)
+                    continue
+                
+                if not text.strip() and self.ocr:
+                    text = self._submit_page_ocr(page, page_number)
+            
+            pending.append((page_number, text, extracted))
+            
+            while pending and (len(pending) > window or not isinstance(pending[0][1], Future)):
+                entry = pending.popleft()
+                text = resolve(*entry)
+                if text is not None:
+                    yield entry[0], text
+        
+        while pending:
+            entry = pending.popleft()
+            text = resolve(*entry)
+            if text is not None:
+                yield entry[0], text
+    
+    def _submit_page_ocr(self, page, page_number: int):
+        """Queue OCR of the images of a page without text, returns a Future ('' if it has none)"""
+        try:
+            images = [image.data for image in page.images]
+        except Exception as e:
+            print(f"   ⚠️  Cannot read images of page {page_number}: {e}")
+            return ''
+        
+        if not images:
+            return ''
+        
+        print(f"   🔍 OCR page {page_number} ({len(images)} image{'s' if len(images) > 1 else ''})")
+        return self.ocr.submit(images)
+    
+    def _page_bounds(self, total_pages: int) -> Tuple[int, int]:
+        """Resolve page_range/max_pages into 1-based inclusive (first, last)"""
+        first, last = self.page_range or (1, total_pages)
+        first = max(first, 1)
+        last = min(last, total_pages)
+        
+        if self.max_pages is not None:
+            last = min(last, first + self.max_pages - 1)
+        
+        return first, last
+    
     def _process_docx(self, file_path: Path, category: str) -> ProcessedDocument:
         """Extract text from DOCX"""
         doc = DocxDocument(str(file_path))
@@ -201,59 +1003,138 @@ class DocumentProcessor:
         )
     
     def _process_xlsx(self, file_path: Path, category: str) -> ProcessedDocument:
-        """Extract data from XLSX"""
-        workbook = openpyxl.load_workbook(str(file_path), data_only=True)
-        sheets_content = []
+        """
+        Extract data from XLSX
+
+        Workbooks are opened in read-only mode and rows are streamed with
+        iter_rows(values_only=True) straight into an output buffer, so memory
+        stays bounded for very large sheets. At most xlsx_max_rows data rows
+        per sheet are rendered; with a spill directory, truncated sheets are
+        also written in full to a CSV sidecar.
+        """
+        workbook = openpyxl.load_workbook(str(file_path), read_only=True, data_only=True)
+        content = io.StringIO()
+        total_rows = 0
+        truncated_sheets = 0
         
-        for sheet_name in workbook.sheetnames:
-            sheet = workbook[sheet_name]
-            data = []
+        try:
+            sheet_names = workbook.sheetnames
             
-            # Get header
-            headers = []
-            for cell in sheet[1]:
-                headers.append(cell.value)
-            
-            # Get data rows
-            for row in sheet.iter_rows(min_row=2, values_only=True):
-                data.append(row)
-            
-            if data:
-                # Create markdown table
-                table_str = f"### Sheet: {sheet_name}\n\n"
-                table_str += "|" + "|".join([str(h) if h else "" for h in headers]) + "|\n"
-                table_str += "|" + "|".join(["---" for _ in headers]) + "|\n"
+            for sheet_name in sheet_names:
+                rows = workbook[sheet_name].iter_rows(values_only=True)
+                
+                # Get header
+                headers = next(rows, None)
                 
-                for row in data:
-                    table_str += "|" + "|".join([str(cell) if cell else "" for cell in row]) + "|\n"
+                # Skip sheets without data rows
+                first_row = next(rows, None)
+                if headers is None or first_row is None:
+                    continue
                 
-                sheets_content.append(table_str)
+                if content.tell():
+                    content.write("\n\n")
+                
+                row_count, truncated = self._write_sheet_table(
+                    content, file_path, sheet_name, headers, chain([first_row], rows)
+                )
+                total_rows += row_count
+                truncated_sheets += truncated
+        finally:
+            workbook.close()
         
-        full_text = "\n\n".join(sheets_content)
+        metadata = {
+            'sheets': len(sheet_names),
+            'rows': total_rows,
+            'file_size': f"{file_path.stat().st_size / 1024:.1f} KB"
+        }
+        if truncated_sheets:
+            metadata['truncated_sheets'] = truncated_sheets
         
         return ProcessedDocument(
             filename=file_path.name,
             category=category,
-            content=full_text,
-            metadata={
-                'sheets': len(workbook.sheetnames),
-                'file_size': f"{file_path.stat().st_size / 1024:.1f} KB"
-            }
+            content=content.getvalue(),
+            metadata=metadata
         )
     
+    def _write_sheet_table(self, out: TextIO, file_path: Path, sheet_name: str,
+                           headers: Tuple, rows: Iterable[Tuple]) -> Tuple[int, bool]:
+        """Write one sheet as a markdown table, returns (data rows, truncated)"""
+        # Create markdown table
+        out.write(f"### Sheet: {sheet_name}\n\n")
+        out.write(self._markdown_row(headers))
+        out.write("|" + "|".join(["---" for _ in headers]) + "|\n")
+        
+        spill_file = None
+        spill_writer = None
+        if self.xlsx_spill_dir:
+            self.xlsx_spill_dir.mkdir(parents=True, exist_ok=True)
+            safe_name = re.sub(r'[^\w\- ]', '_', f"{file_path.stem} - {sheet_name}")
+            spill_path = self.xlsx_spill_dir / f"{safe_name}.csv"
+            spill_tmp = spill_path.with_name(spill_path.name + '.tmp')
+            spill_file = open(spill_tmp, 'w', encoding='utf-8', newline='')
+            spill_writer = csv.writer(spill_file)
+            spill_writer.writerow(['' if h is None else h for h in headers])
+        
+        row_count = 0
+        try:
+            for row in rows:
+                row_count += 1
+                if not self.xlsx_max_rows or row_count <= self.xlsx_max_rows:
+                    out.write(self._markdown_row(row))
+                if spill_writer:
+                    spill_writer.writerow(['' if cell is None else cell for cell in row])
+        finally:
+            if spill_file:
+                spill_file.close()
+        
+        truncated = bool(self.xlsx_max_rows) and row_count > self.xlsx_max_rows
+        
+        if truncated:
+            out.write(f"\n*... {row_count - self.xlsx_max_rows} baris lainnya tidak ditampilkan*")
+        
+        # Only keep the CSV sidecar for sheets that were actually truncated
+        if spill_file:
+            if truncated:
+                os.replace(spill_tmp, spill_path)
+                out.write(f" *(data lengkap: {spill_path.name})*")
+            else:
+                spill_tmp.unlink()
+        
+        if truncated:
+            out.write("\n")
+        
+        return row_count, truncated
+    
+    @staticmethod
+    def _markdown_row(row: Tuple) -> str:
+        """Render one markdown table row"""
+        return "|" + "|".join([str(cell) if cell else "" for cell in row]) + "|\n"
+    
     def _process_image(self, file_path: Path, category: str) -> ProcessedDocument:
-        """Generate description for image"""
+        """Extract the text of an image with OCR (a short description if it has none)"""
         self.image_counter += 1
         
         # Get image info
-        img = Image.open(str(file_path))
-        width, height = img.size
+        data = file_path.read_bytes()
+        with Image.open(io.BytesIO(data)) as img:
+            width, height = img.size
         
-        # Create description based on filename and properties
+        text, ocr_error = '', None
+        if self.ocr:
+            try:
+                text = self.ocr.recognize(data)
+            except Exception as e:
+                print(f"   ⚠️  OCR failed: {e}")
+                ocr_error = str(e)
+        
+        # Describe the image by filename only when OCR found no text
         filename_lower = file_path.name.lower()
         description_parts = []
         
-        if 'kurikulum' in filename_lower:
+        if text:
+            description_parts.append("Teks hasil OCR")
+        elif 'kurikulum' in filename_lower:
             description_parts.append("Grafik/Ilustrasi terkait kurikulum")
         elif 'sejarah' in filename_lower or 'profil' in filename_lower:
             description_parts.append("Gambar profil/sejarah sekolah")
@@ -265,71 +1146,332 @@ class DocumentProcessor:
         description_parts.append(f"Ukuran: {width}x{height} piksel")
         description_parts.append(f"Format: {file_path.suffix[1:].upper()}")
         
-        content = f"**Gambar:** {file_path.name}\n\n{', '.join(description_parts)}\n\n*Catatan: Gambar ini digunakan sebagai referensi visual untuk konten yang terkait.*"
+        content = f"**Gambar:** {file_path.name}\n\n{', '.join(description_parts)}\n\n"
+        if text:
+            content += text
+        else:
+            content += "*Catatan: Gambar ini digunakan sebagai referensi visual untuk konten yang terkait.*"
         
-        image_path = file_path.relative_to(DOC_ROOT)
+        metadata = {
+            'width': width,
+            'height': height,
+            'format': file_path.suffix[1:].upper(),
+            'file_size': f"{file_path.stat().st_size / 1024:.1f} KB"
+        }
+        if self.ocr:
+            metadata['ocr'] = f"{self.ocr.lang} ({len(text)} karakter)"
+        if ocr_error:
+            metadata['ocr_error'] = ocr_error
+        
+        # Images outside DOC_ROOT (e.g. other corpora) keep their absolute path
+        try:
+            image_path = file_path.relative_to(DOC_ROOT)
+        except ValueError:
+            image_path = file_path
         
         return ProcessedDocument(
             filename=file_path.name,
             category=category,
             content=content,
             images=[str(image_path)],
-            metadata={
-                'width': width,
-                'height': height,
-                'format': file_path.suffix[1:].upper(),
-                'file_size': f"{file_path.stat().st_size / 1024:.1f} KB"
-            }
+            metadata=metadata
         )
     
-    def clean_text(self, text: str) -> str:
-        """Clean and format extracted text"""
-        # Remove excessive whitespace
-        text = re.sub(r'\n{3,}', '\n\n', text)
-        # Remove leading/trailing whitespace from lines
-        lines = [line.strip() for line in text.split('\n')]
-        text = '\n'.join(line for line in lines if line)
+
+
+def _process_file_isolated(file_path: Path, options: Dict,
+                           content_hash: Optional[str] = None) -> Tuple[Optional[ProcessedDocument], Optional[str], Dict]:
+    """
+    Process a single file inside a pool worker
+
+    Uses a fresh DocumentProcessor per call and never raises, so one broken
+    file cannot take down the rest of the batch. The worker opens its own
+    cache connection for PDF page caching and its own OCR threads.
+    """
+    if options['tracemalloc'] and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    
+    cache = None
+    ocr = None
+    try:
+        if options['cache_path']:
+            cache = ExtractionCache(options['cache_path'], variants=options['cache_variants'],
+                                    page_variant=options['cache_page_variant'])
+        if options['ocr_lang']:
+            ocr = OcrEngine(options['ocr_lang'], workers=options['ocr_workers'], cache=cache)
         
-        return text
+        processor = DocumentProcessor(
+            cache=cache,
+            max_pages=options['max_pages'],
+            page_range=options['page_range'],
+            xlsx_max_rows=options['xlsx_max_rows'],
+            xlsx_spill_dir=options['xlsx_spill_dir'],
+            ocr=ocr,
+        )
+        return processor._process_file_measured(file_path, content_hash)
+    except Exception as e:
+        return None, str(e), DocumentProcessor._metrics_record(file_path, None, str(e), 0.0, 0)
+    finally:
+        if ocr:
+            ocr.close()
+        if cache:
+            cache.close()
+
+
+class TextNormalizer:
+    """
+    Normalize extracted text before it is rendered or chunked
+
+    One pass over the lines of a document:
+    - collapses runs of spaces/tabs (incl. non-breaking and zero-width
+      spaces), strips control characters and drops empty lines
+    - drops page headers/footers: short lines near the top or bottom of a
+      page that repeat on at least half of the pages of a PDF (digits of
+      short lines are ignored, so "Halaman 3 dari 12" matches on every page)
+    - PDF text only (reflow): rejoins words hyphenated at a line break
+      (keeping the hyphen of reduplications such as "anak-anak") and lines
+      broken mid-sentence; other extractors emit one line per paragraph,
+      table row or sheet row already
+
+    Markdown structure (headings, list items) and table rows (a leading "|"
+    or cells separated by " | ") are never joined.
+    Counts of bytes in/out and of each fix are kept for the run summary.
+    """
+    
+    SPACES = re.compile(r'[ \t\u00a0\u2000-\u200b\u202f\u3000]+')
+    CONTROL = re.compile(r'[\x00-\x08\x0b-\x1f\x7f\ufeff]')
+    DIGITS = re.compile(r'\d+')
+    HYPHENATED = re.compile(r'([^\W\d_]+)-$')
+    STRUCTURE = re.compile(r'(?:[|#>]|[-*•]\s|\d+[.)]\s)')
+    SENTENCE_END = frozenset('.!?:;')
+    
+    # Headers/footers: lines within EDGE_LINES of a page edge, at most
+    # MAX_REPEATED_LENGTH long, repeated on >= REPEAT_RATIO of the pages.
+    # Digits only differ between pages in lines up to MAX_NUMBERED_LENGTH.
+    EDGE_LINES = 3
+    MAX_REPEATED_LENGTH = 120
+    MAX_NUMBERED_LENGTH = 40
+    REPEAT_RATIO = 0.5
+    MIN_PAGES = 3
+    
+    def __init__(self):
+        self.documents = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.repeated_lines = 0
+        self.hyphens_joined = 0
+        self.lines_joined = 0
+    
+    @property
+    def bytes_removed(self) -> int:
+        return self.bytes_in - self.bytes_out
+    
+    def clean(self, doc: ProcessedDocument) -> str:
+        """doc.clean_content, normalizing the document only if that was not done yet"""
+        if doc.clean_content is None:
+            doc.clean_content = self.normalize_document(doc)
+        return doc.clean_content
+    
+    def normalize_document(self, doc: ProcessedDocument) -> str:
+        """Normalize a document's content, reflowing lines only for PDFs"""
+        reflow = EXTRACTORS.get(Path(doc.filename).suffix.lower()) == 'pdf'
+        return self.normalize(doc.content, reflow=reflow)
+    
+    def normalize(self, text: str, reflow: bool = False) -> str:
+        """Return normalized text (PAGE_BREAK separated pages become lines, reflow joins broken lines)"""
+        pages = [page.splitlines() for page in text.split(PAGE_BREAK)]
+        repeated = self._repeated_lines(pages) if len(pages) >= self.MIN_PAGES else set()
+        
+        out = []
+        current = ''
+        
+        for lines in pages:
+            edges = self._edge_lines(lines) if repeated else ()
+            
+            for index, line in enumerate(lines):
+                line = self.SPACES.sub(' ', self.CONTROL.sub('', line)).strip()
+                if not line:
+                    continue
+                
+                if index in edges and self._line_key(line) in repeated:
+                    self.repeated_lines += 1
+                    continue
+                
+                if current:
+                    joined = self._join(current, line) if reflow else None
+                    if joined is not None:
+                        current = joined
+                        continue
+                    out.append(current)
+                current = line
+        
+        if current:
+            out.append(current)
+        
+        result = '\n'.join(out)
+        self.documents += 1
+        self.bytes_in += len(text.encode('utf-8'))
+        self.bytes_out += len(result.encode('utf-8'))
+        return result
+    
+    def _join(self, previous: str, line: str) -> Optional[str]:
+        """previous + line as one line if line continues it, else None"""
+        if not line[0].islower() or previous[-1] in self.SENTENCE_END:
+            return None
+        if self.STRUCTURE.match(previous) or self.STRUCTURE.match(line):
+            return None
+        if ' | ' in previous or ' | ' in line:
+            return None
+        
+        hyphenated = self.HYPHENATED.search(previous)
+        if hyphenated:
+            self.hyphens_joined += 1
+            # "anak-" + "anak" is a reduplication, "pendi-" + "dikan" a split word
+            if line.lower().startswith(hyphenated.group(1).lower()):
+                return previous + line
+            return previous[:-1] + line
+        
+        self.lines_joined += 1
+        return previous + ' ' + line
+    
+    def _repeated_lines(self, pages: List[List[str]]) -> set:
+        """Keys of edge lines that repeat on enough pages to be headers/footers"""
+        counts: Dict[str, int] = {}
+        for lines in pages:
+            keys = {
+                self._line_key(self.SPACES.sub(' ', lines[index]).strip())
+                for index in self._edge_lines(lines)
+            }
+            for key in keys:
+                if key and len(key) <= self.MAX_REPEATED_LENGTH:
+                    counts[key] = counts.get(key, 0) + 1
+        
+        threshold = max(self.MIN_PAGES, math.ceil(len(pages) * self.REPEAT_RATIO))
+        return {key for key, count in counts.items() if count >= threshold}
+    
+    def _edge_lines(self, lines: List[str]) -> set:
+        """Indexes of the first and last EDGE_LINES non-empty lines of a page"""
+        non_empty = [index for index, line in enumerate(lines) if line.strip()]
+        # On short pages (slides, posters) the edges are the body itself
+        if len(non_empty) <= 2 * self.EDGE_LINES:
+            return set()
+        return set(non_empty[:self.EDGE_LINES] + non_empty[-self.EDGE_LINES:])
+    
+    def _line_key(self, line: str) -> str:
+        """Comparison key, digits of short lines (page numbers) are ignored"""
+        line = line.lower()
+        return self.DIGITS.sub('#', line) if len(line) <= self.MAX_NUMBERED_LENGTH else line
+    
+    def summary(self) -> Dict[str, int]:
+        """Counters for the run summary"""
+        return {
+            'documents': self.documents,
+            'bytes_in': self.bytes_in,
+            'bytes_out': self.bytes_out,
+            'bytes_removed': self.bytes_removed,
+            'repeated_lines': self.repeated_lines,
+            'hyphens_joined': self.hyphens_joined,
+            'lines_joined': self.lines_joined,
+        }
 
 
 class MarkdownGenerator:
-    """Generate structured markdown from processed documents"""
+    """
+    Generate structured markdown from processed documents
+
+    Documents are consumed one at a time: each section is written to disk as
+    soon as it arrives, and the header, TOC and summary are rendered from
+    running aggregates, so memory use does not grow with the document set.
+    Sections use doc.clean_content (set by DocumentProcessor); documents
+    without it are normalized here.
+    """
     
-    def __init__(self, documents: List[ProcessedDocument]):
+    def __init__(self, documents: Iterable[ProcessedDocument], normalizer: Optional[TextNormalizer] = None):
         self.documents = documents
-        self.cleaner = DocumentProcessor()
+        self.normalizer = normalizer or TextNormalizer()
+        
+        # Running aggregates
+        self.total_documents = 0
+        self.total_chars = 0
+        self.total_images = 0
+        self.categories: Dict[str, List[str]] = {}
+        self.file_types: Dict[str, int] = {}
     
     def generate(self) -> str:
-        """Generate complete markdown document"""
-        md_content = []
-        
-        # Header
-        md_content.append(self._generate_header())
-        
-        # Table of Contents
-        md_content.append(self._generate_toc())
+        """Generate complete markdown document as a string"""
+        buffer = io.StringIO()
+        self.write(buffer)
+        return buffer.getvalue()
+    
+    def generate_to_file(self, output_file: Path) -> int:
+        """
+        Stream markdown to output_file, returns number of documents written
+
+        Sections are spooled to a temporary body file while documents are
+        extracted, then header + TOC + body + summary are assembled and moved
+        into place atomically. Nothing is written if there are no documents.
+        """
+        output_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = output_file.with_name(output_file.name + '.tmp')
         
-        # Process documents by category
-        md_content.append("\n## 📄 Dokumen yang Diproses\n")
+        try:
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                self.write(f)
+            
+            if self.total_documents:
+                os.replace(tmp_file, output_file)
+        finally:
+            if tmp_file.exists():
+                tmp_file.unlink()
         
-        for doc in self.documents:
-            md_content.append(self._generate_document_section(doc))
+        return self.total_documents
+    
+    def write(self, out: TextIO):
+        """Write complete markdown document to a text stream"""
+        with tempfile.TemporaryFile('w+', encoding='utf-8') as body:
+            # Process documents by category
+            body.write("\n## 📄 Dokumen yang Diproses\n")
+            
+            for doc in self.documents:
+                self._track(doc)
+                body.write("\n")
+                body.write(self._generate_document_section(doc))
+            
+            # Header
+            out.write(self._generate_header())
+            
+            # Table of Contents
+            out.write("\n")
+            out.write(self._generate_toc())
+            
+            body.seek(0)
+            out.write("\n")
+            shutil.copyfileobj(body, out)
         
         # Summary
-        md_content.append(self._generate_summary())
+        out.write("\n")
+        out.write(self._generate_summary())
         
         # Footer
-        md_content.append(self._generate_footer())
+        out.write("\n")
+        out.write(self._generate_footer())
+    
+    def _track(self, doc: ProcessedDocument):
+        """Update running aggregates with one document"""
+        self.total_documents += 1
+        self.total_chars += len(doc.content)
+        self.total_images += len(doc.images)
+        self.categories.setdefault(doc.category, []).append(doc.filename)
         
-        return "\n".join(md_content)
+        suffix = Path(doc.filename).suffix.upper() or 'unknown'
+        self.file_types[suffix] = self.file_types.get(suffix, 0) + 1
     
     def _generate_header(self) -> str:
         """Generate document header"""
         return f"""# 📚 Dokumen SMAN 1 Baleendah - Terproses untuk RAG AI
 
 **Tanggal Pemrosesan:** {datetime.now().strftime('%d %B %Y')}
-**Total Dokumen:** {len(self.documents)}
+**Total Dokumen:** {self.total_documents}
 **Versi Prosesor:** 1.0
 
 > 📌 Dokumen ini digunakan sebagai knowledge base untuk AI chatbot dan sistem问答 sistem SMAN 1 Baleendah.
@@ -337,13 +1479,12 @@ class MarkdownGenerator:
     
     def _generate_toc(self) -> str:
         """Generate table of contents"""
-        categories = set(doc.category for doc in self.documents)
         toc_lines = ["## 📑 Daftar Isi Kategori\n"]
         
-        for category in sorted(categories):
+        for category in sorted(self.categories):
             toc_lines.append(f"- **{category}**")
-            for doc in [d for d in self.documents if d.category == category]:
-                toc_lines.append(f"  - {doc.filename}")
+            for filename in self.categories[category]:
+                toc_lines.append(f"  - {filename}")
         
         return "\n".join(toc_lines)
     
@@ -373,8 +1514,8 @@ class MarkdownGenerator:
         # Content
         section.append(f"\n### Konten Dokumen\n")
         
-        # Clean and format content
-        clean_content = self.cleaner.clean_text(doc.content)
+        # Cleaned content (normalized once per document)
+        clean_content = self.normalizer.clean(doc)
         
         # Limit content for readability
         if len(clean_content) > 5000:
@@ -387,38 +1528,30 @@ class MarkdownGenerator:
     
     def _generate_summary(self) -> str:
         """Generate summary statistics"""
-        total_chars = sum(len(doc.content) for doc in self.documents)
-        categories = {doc.category: len(doc) for doc in self.documents}
-        
         summary_lines = [
             "## 📊 Ringkasan Proses",
             "",
-            f"- **Total Dokumen:** {len(self.documents)}",
-            f"- **Total Karakter:** {total_chars:,}",
-            f"- **Kategori:** {len(categories)}",
+            f"- **Total Dokumen:** {self.total_documents}",
+            f"- **Total Karakter:** {self.total_chars:,}",
+            f"- **Kategori:** {len(self.categories)}",
             "",
             "### Distribusi Kategori"
         ]
         
-        for category, count in sorted(categories.items()):
-            summary_lines.append(f"- **{category}:** {count} dokumen")
+        for category, filenames in sorted(self.categories.items()):
+            summary_lines.append(f"- **{category}:** {len(filenames)} dokumen")
         
         summary_lines.extend([
             "",
             "### Tipe File",
         ])
         
-        file_types = {}
-        for doc in self.documents:
-            suffix = Path(doc.filename).suffix.upper() or 'unknown'
-            file_types[suffix] = file_types.get(suffix, 0) + 1
-        
-        for ftype, count in sorted(file_types.items()):
+        for ftype, count in sorted(self.file_types.items()):
             summary_lines.append(f"- **{ftype}:** {count} file")
         
         summary_lines.extend([
             "",
-            f"- **Total Gambar:** {sum(len(doc.images) for doc in self.documents)}",
+            f"- **Total Gambar:** {self.total_images}",
         ])
         
         return "\n".join(summary_lines)
@@ -436,37 +1569,548 @@ Untuk informasi lebih lanjut, hubungi admin sekolah.**
 """
 
 
+def estimate_token_count(text: str) -> int:
+    """Rough token estimate, same as RagService::estimateTokenCount (1 token ≈ 4 bytes)"""
+    return math.ceil(len(text.encode('utf-8')) / 4)
+
+
+class NearDuplicateFilter:
+    """
+    Near-duplicate detection over chunk texts with MinHash and LSH banding
+
+    Each text is reduced to the set of its word shingles and summarised by
+    a MinHash signature (num_perm salted hashes, vectorised with NumPy).
+    Signatures are split into `bands` bands; texts sharing any band are
+    candidates, and a candidate whose signature agrees in >= threshold of
+    the slots (the estimated Jaccard similarity) is a near-duplicate.
+
+    Texts with fewer than min_shingles shingles (a few words) carry too
+    little for MinHash, every such text would look alike; they are only
+    duplicates when their words are identical, and empty texts never are.
+
+    Texts are checked in arrival order: the first of a cluster is kept and
+    later ones are reported as its duplicates, so results are reproducible.
+    """
+    
+    MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+    MAX_HASH = np.uint64((1 << 32) - 1)
+    WORD = re.compile(r'\w+')
+    
+    def __init__(self, threshold: float = DEDUP_THRESHOLD, num_perm: int = 128,
+                 bands: int = 16, shingle_size: int = 3, min_shingles: int = 3, seed: int = 1):
+        """
+        Args:
+            threshold (float): Minimum estimated Jaccard similarity of duplicates
+            num_perm (int): MinHash signature length (must be divisible by bands)
+            bands (int): LSH bands; more bands find pairs with lower similarity
+            shingle_size (int): Words per shingle
+            min_shingles (int): Shorter texts are compared exactly instead of by MinHash
+            seed (int): Seed of the hash permutations
+        """
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) must be divisible by bands ({bands})")
+        
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self.min_shingles = min_shingles
+        
+        # a, b and the 32-bit shingle hashes are all below 2^32, so a * x + b
+        # stays below 2^64 and the uint64 arithmetic never wraps
+        generator = np.random.RandomState(seed)
+        self.a = generator.randint(1, 1 << 32, size=num_perm, dtype=np.uint64)
+        self.b = generator.randint(0, 1 << 32, size=num_perm, dtype=np.uint64)
+        
+        self.buckets: List[Dict[bytes, List[int]]] = [{} for _ in range(bands)]
+        self.exact: Dict[str, int] = {}  # words of a short kept text -> its index
+        self.keys: List = []
+        self.signatures: List[Optional[np.ndarray]] = []
+        self.clusters: Dict[int, List[Tuple]] = {}  # kept index -> [(key, similarity)]
+        self.checked = 0
+    
+    @property
+    def dropped(self) -> int:
+        return sum(len(duplicates) for duplicates in self.clusters.values())
+    
+    def shingles(self, words: List[str]) -> Set[str]:
+        """Distinct word shingles (none if there are fewer words than one shingle)"""
+        size = self.shingle_size
+        return {' '.join(words[i:i + size]) for i in range(len(words) - size + 1)}
+    
+    def signature(self, shingles: Set[str]) -> np.ndarray:
+        """MinHash signature of a set of shingles"""
+        hashes = np.fromiter(
+            (int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=4).digest(), 'little')
+             for shingle in shingles),
+            dtype=np.uint64, count=len(shingles)
+        )
+        
+        # Universal hashing (a * x + b) mod p, one row per permutation (exact, see __init__)
+        permuted = (np.outer(self.a, hashes) + self.b[:, None]) % self.MERSENNE_PRIME
+        return np.bitwise_and(permuted, self.MAX_HASH).min(axis=1)
+    
+    def check(self, key, text: str) -> Optional[Tuple]:
+        """
+        Check one text against all kept texts, keeping it if it is new
+
+        Args:
+            key: Identifies the text in the cluster report
+            text (str): Text to check
+
+        Returns:
+            tuple: (key of the kept text, similarity) for a near-duplicate, else None
+        """
+        self.checked += 1
+        words = self.WORD.findall(text.lower())
+        shingles = self.shingles(words)
+        if len(shingles) < self.min_shingles:
+            return self._check_exact(key, ' '.join(words))
+        
+        signature = self.signature(shingles)
+        bands = [signature[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(self.bands)]
+        
+        candidates = set()
+        for band, bucket in zip(bands, self.buckets):
+            candidates.update(bucket.get(band, ()))
+        
+        best, best_similarity = None, 0.0
+        for candidate in sorted(candidates):
+            similarity = float(np.mean(self.signatures[candidate] == signature))
+            if similarity > best_similarity:
+                best, best_similarity = candidate, similarity
+        
+        if best is not None and best_similarity >= self.threshold:
+            self.clusters.setdefault(best, []).append((key, round(best_similarity, 3)))
+            return self.keys[best], best_similarity
+        
+        index = len(self.keys)
+        self.keys.append(key)
+        self.signatures.append(signature)
+        for band, bucket in zip(bands, self.buckets):
+            bucket.setdefault(band, []).append(index)
+        return None
+    
+    def _check_exact(self, key, words: str) -> Optional[Tuple]:
+        """check() for short texts: duplicates only if the words are identical"""
+        if not words:
+            return None
+        
+        kept = self.exact.get(words)
+        if kept is not None:
+            self.clusters.setdefault(kept, []).append((key, 1.0))
+            return self.keys[kept], 1.0
+        
+        self.exact[words] = len(self.keys)
+        self.keys.append(key)
+        self.signatures.append(None)
+        return None
+    
+    def report(self) -> Dict:
+        """Settings, counts and duplicate clusters (largest first)"""
+        clusters = sorted(self.clusters.items(), key=lambda item: (-len(item[1]), item[0]))
+        return {
+            'threshold': self.threshold,
+            'num_perm': self.num_perm,
+            'bands': self.bands,
+            'shingle_size': self.shingle_size,
+            'min_shingles': self.min_shingles,
+            'checked': self.checked,
+            'kept': self.checked - self.dropped,
+            'dropped': self.dropped,
+            'clusters': [
+                {
+                    'kept': self.keys[kept],
+                    'duplicates': [{'key': key, 'similarity': similarity} for key, similarity in duplicates],
+                }
+                for kept, duplicates in clusters
+            ],
+        }
+
+
+class ChunkExporter:
+    """
+    Export pre-chunked documents as JSON lines for RAG ingestion
+
+    Chunking mirrors RagService::splitTextIntoChunks (sentence packing up to
+    CHUNK_SIZE tokens, CHUNK_OVERLAP trailing tokens carried into the next
+    chunk), so records can be bulk-ingested without re-chunking in PHP.
+    Unlike the markdown output, the full document content is exported.
+
+    With a NearDuplicateFilter, chunks that near-duplicate an earlier chunk
+    (copied files, yearly reports sharing boilerplate) are left out and
+    listed per cluster in duplicates_file. chunk_index keeps the position
+    in the document, so it has gaps where chunks were dropped.
+    """
+    
+    def __init__(self, output_file: Path = CHUNKS_FILE,
+                 chunk_size: int = CHUNK_SIZE, chunk_overlap: int = CHUNK_OVERLAP,
+                 dedup: Optional[NearDuplicateFilter] = None, duplicates_file: Path = DUPLICATES_FILE,
+                 normalizer: Optional[TextNormalizer] = None):
+        self.output_file = output_file
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.normalizer = normalizer or TextNormalizer()
+        self.dedup = dedup
+        self.duplicates_file = duplicates_file
+        self.total_chunks = 0
+        self.total_tokens = 0
+        self.dropped_tokens = 0
+    
+    def tee(self, documents: Iterable[ProcessedDocument]) -> Iterator[ProcessedDocument]:
+        """
+        Write chunk records for each document while passing it through
+
+        The JSONL file is written to a temporary path and moved into place
+        once the document stream is exhausted.
+        """
+        self.output_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = self.output_file.with_name(self.output_file.name + '.tmp')
+        
+        try:
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                for doc in documents:
+                    for record in self.chunk_document(doc):
+                        if self.dedup and self.dedup.check(
+                            {'path': record['path'], 'chunk_index': record['chunk_index']},
+                            record['text'],
+                        ):
+                            self.dropped_tokens += record['token_count']
+                            continue
+                        
+                        self.total_chunks += 1
+                        self.total_tokens += record['token_count']
+                        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                    yield doc
+            
+            os.replace(tmp_file, self.output_file)
+            if self.dedup:
+                self._write_duplicates_report()
+        finally:
+            if tmp_file.exists():
+                tmp_file.unlink()
+    
+    def chunk_document(self, doc: ProcessedDocument) -> Iterator[Dict]:
+        """Yield chunk records for a single document"""
+        source = doc.source_path or f"{doc.category}/{doc.filename}"
+        document_id = hashlib.sha256(source.encode('utf-8')).hexdigest()[:16]
+        text = self.normalizer.clean(doc)
+        
+        for index, chunk in enumerate(self.split_text(text)):
+            token_count = estimate_token_count(chunk)
+            yield {
+                'document_id': document_id,
+                'filename': doc.filename,
+                'path': source,
+                'category': doc.category,
+                'chunk_index': index,
+                'token_count': token_count,
+                'text': chunk,
+                'content_hash': hashlib.sha256(chunk.encode('utf-8')).hexdigest(),
+            }
+    
+    def _write_duplicates_report(self):
+        """Write the duplicate clusters atomically"""
+        tmp_file = self.duplicates_file.with_name(self.duplicates_file.name + '.tmp')
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump({'dropped_tokens': self.dropped_tokens, **self.dedup.report()},
+                      f, ensure_ascii=False, indent=2)
+        os.replace(tmp_file, self.duplicates_file)
+    
+    def split_text(self, text: str) -> List[str]:
+        """Split text into overlapping chunks (port of RagService::splitTextIntoChunks)"""
+        sentences = [s for s in re.split(r'(?<=[.!?])\s+', text) if s]
+        chunks = []
+        current_chunk = ''
+        current_tokens = 0
+        
+        for sentence in self._split_long_sentences(sentences):
+            sentence_tokens = estimate_token_count(sentence)
+            
+            if current_tokens + sentence_tokens > self.chunk_size and current_chunk:
+                chunks.append(current_chunk.strip())
+                # Keep overlap
+                current_chunk = self._overlap_tail(current_chunk) + ' ' + sentence
+                current_tokens = estimate_token_count(current_chunk)
+            else:
+                current_chunk += ' ' + sentence
+                current_tokens += sentence_tokens
+        
+        if current_chunk.strip():
+            chunks.append(current_chunk.strip())
+        
+        return chunks
+    
+    def _overlap_tail(self, text: str) -> str:
+        """
+        Return the trailing words of text worth at most chunk_overlap tokens
+
+        RagService::getLastNTokens takes the last N space-separated words; that
+        is measured in tokens here so that table rows (one "word" per line)
+        cannot blow the next chunk past chunk_size.
+        """
+        words = re.split(r'(?<=\s)', text)
+        tail = []
+        tail_tokens = 0
+        
+        for word in reversed(words):
+            word_tokens = estimate_token_count(word)
+            if tail_tokens + word_tokens > self.chunk_overlap:
+                break
+            tail.append(word)
+            tail_tokens += word_tokens
+        
+        return ''.join(reversed(tail)).strip()
+    
+    def _split_long_sentences(self, sentences: List[str]) -> Iterator[str]:
+        """
+        Break up "sentences" longer than one chunk (e.g. XLSX tables, which
+        have no sentence punctuation) at whitespace, so no chunk is oversized
+        """
+        limit = self.chunk_size - self.chunk_overlap
+        
+        for sentence in sentences:
+            if estimate_token_count(sentence) <= limit:
+                yield sentence
+                continue
+            
+            piece = []
+            piece_tokens = 0
+            for word in re.split(r'(?<=\s)', sentence):
+                word_tokens = estimate_token_count(word)
+                if piece and piece_tokens + word_tokens > limit:
+                    yield ''.join(piece).strip()
+                    piece = []
+                    piece_tokens = 0
+                piece.append(word)
+                piece_tokens += word_tokens
+            
+            if piece:
+                yield ''.join(piece).strip()
+
+
 def main():
     """Main execution function"""
+    parser = argparse.ArgumentParser(
+        description='SMAN 1 Baleendah Document Processor (RAG knowledge base builder)'
+    )
+    
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=1,
+        help='Number of worker processes for extraction (default: 1, use 0 for all CPU cores)'
+    )
+    
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help=f'Re-extract every file and ignore the extraction cache ({CACHE_FILE.name})'
+    )
+    
+    parser.add_argument(
+        '--max-pages',
+        type=int,
+        default=None,
+        help='Extract at most N pages from each PDF'
+    )
+    
+    parser.add_argument(
+        '--pages',
+        type=str,
+        default=None,
+        help='PDF page range to extract, e.g. 1-50 (1-based, inclusive)'
+    )
+    
+    parser.add_argument(
+        '--xlsx-max-rows',
+        type=int,
+        default=XLSX_MAX_ROWS,
+        help=f'Data rows rendered per XLSX sheet (default: {XLSX_MAX_ROWS}, 0 = unlimited)'
+    )
+    
+    parser.add_argument(
+        '--xlsx-spill-csv',
+        action='store_true',
+        help=f'Write truncated XLSX sheets in full to CSV files in output/{XLSX_SPILL_DIR.name}/'
+    )
+    
+    parser.add_argument(
+        '--no-ocr',
+        action='store_true',
+        help='Skip OCR of images and scanned PDF pages'
+    )
+    
+    parser.add_argument(
+        '--ocr-lang',
+        type=str,
+        default=OCR_LANG,
+        help=f'Tesseract languages (default: {OCR_LANG})'
+    )
+    
+    parser.add_argument(
+        '--ocr-workers',
+        type=int,
+        default=0,
+        help='Concurrent tesseract processes per extraction worker (default: 0 = spread the CPU cores over the workers)'
+    )
+    
+    parser.add_argument(
+        '--export-chunks',
+        action='store_true',
+        help=f'Also export {CHUNK_SIZE}-token chunks as JSON lines ({CHUNKS_FILE.name})'
+    )
+    
+    parser.add_argument(
+        '--dedup-threshold',
+        type=float,
+        default=DEDUP_THRESHOLD,
+        help=f'Similarity (0-1) at which exported chunks count as near-duplicates (default: {DEDUP_THRESHOLD})'
+    )
+    
+    parser.add_argument(
+        '--no-dedup',
+        action='store_true',
+        help='Export near-duplicate chunks too'
+    )
+    
+    parser.add_argument(
+        '--no-bm25',
+        action='store_true',
+        help=f'Do not rebuild the BM25 index (output/{BM25_INDEX_DIR.name}/) from the exported chunks'
+    )
+    
+    parser.add_argument(
+        '--profile',
+        action='store_true',
+        help=f'Run under cProfile and save stats to output/{PROFILE_FILE.name} (use with --workers 1)'
+    )
+    
+    parser.add_argument(
+        '--tracemalloc',
+        action='store_true',
+        help='Trace Python allocations: exact per-file peak memory and top allocation sites'
+    )
+    
+    args = parser.parse_args()
+    workers = args.workers if args.workers > 0 else (os.cpu_count() or 1)
+    
+    page_range = None
+    if args.pages:
+        match = re.fullmatch(r'(\d+)-(\d+)', args.pages)
+        if not match:
+            parser.error("--pages must look like FIRST-LAST, e.g. 1-50")
+        page_range = (int(match.group(1)), int(match.group(2)))
+    
+    # Options that change an extractor's output get their own cache entries
+    # for that file type only (page limits never touch DOCX/XLSX entries)
+    variants = {'pdf': '', 'xlsx': '', 'image': ''}
+    if page_range:
+        variants['pdf'] += f"+pages={page_range[0]}-{page_range[1]}"
+    if args.max_pages:
+        variants['pdf'] += f"+max_pages={args.max_pages}"
+    if args.xlsx_max_rows != XLSX_MAX_ROWS:
+        variants['xlsx'] += f"+xlsx_max_rows={args.xlsx_max_rows}"
+    if args.xlsx_spill_csv:
+        variants['xlsx'] += "+xlsx_spill"
+    
     print("=" * 60)
     print("  📚 SMAN 1 BALEENDAH - Document Processor")
     print("=" * 60)
     print()
     
+    ocr = None
+    if not args.no_ocr:
+        ocr_workers = args.ocr_workers or max(1, (os.cpu_count() or 1) // workers)
+        ocr = OcrEngine(args.ocr_lang, workers=ocr_workers)
+        if ocr.missing:
+            print(f"⚠️  Tesseract language data not installed: {', '.join(ocr.missing)}")
+        if not ocr.available:
+            print("⚠️  OCR unavailable (needs pytesseract and tesseract), images get a description only\n")
+            ocr = None
+        else:
+            print(f"🔍 OCR: {ocr.lang}, {ocr.workers} tesseract process(es) per worker\n")
+    
+    # OCR changes page and image text; results with and without it never mix
+    ocr_variant = f"+ocr={ocr.version}" if ocr else "+no_ocr"
+    variants['pdf'] += ocr_variant
+    variants['image'] += ocr_variant
+    
+    cache = None if args.no_cache else ExtractionCache(variants=variants, page_variant=ocr_variant)
+    if ocr:
+        ocr.cache = cache
+    metrics = PipelineMetrics()
+    
+    profiler = None
+    if args.profile:
+        import cProfile
+        if workers > 1:
+            print("⚠️  --profile only covers the main process; use --workers 1 to profile extractors\n")
+        profiler = cProfile.Profile()
+        profiler.enable()
+    
+    if args.tracemalloc:
+        tracemalloc.start()
+    
+    run_start = time.perf_counter()
+    
     try:
         # Initialize processor
-        processor = DocumentProcessor()
+        processor = DocumentProcessor(
+            cache=cache,
+            max_pages=args.max_pages,
+            page_range=page_range,
+            xlsx_max_rows=args.xlsx_max_rows,
+            xlsx_spill_dir=XLSX_SPILL_DIR if args.xlsx_spill_csv else None,
+            metrics=metrics,
+            ocr=ocr,
+        )
         
-        # Process all documents
-        documents = processor.process_directory(DOC_ROOT)
+        # Process documents and stream each section to the markdown output
+        documents = processor.process_directory(DOC_ROOT, workers=workers)
         
-        if not documents:
-            print("Tidak ada dokumen yang dapat diproses.")
-            return
+        exporter = None
+        if args.export_chunks:
+            dedup = None if args.no_dedup else NearDuplicateFilter(threshold=args.dedup_threshold)
+            exporter = ChunkExporter(dedup=dedup, normalizer=processor.normalizer)
+            documents = exporter.tee(documents)
+        
+        generator = MarkdownGenerator(documents, normalizer=processor.normalizer)
         
-        # Generate markdown
-        print("📝 Generating markdown...")
-        generator = MarkdownGenerator(documents)
-        markdown_content = generator.generate()
+        written = generator.generate_to_file(OUTPUT_FILE)
+        metrics.add_stage('clean', processor.clean_seconds)
         
-        # Write to file
-        OUTPUT_FILE.parent.mkdir(parents=True, exist_ok=True)
-        with open(OUTPUT_FILE, 'w', encoding='utf-8') as f:
-            f.write(markdown_content)
+        bm25_index = None
+        if exporter and not args.no_bm25:
+            start = time.perf_counter()
+            bm25_index = build_bm25_index(exporter.output_file)
+            metrics.add_stage('bm25', time.perf_counter() - start)
+        metrics.add_stage('total', time.perf_counter() - run_start)
+        
+        if not written:
+            print("Tidak ada dokumen yang dapat diproses.")
+            return
         
         print(f"✅ Markdown successfully generated!")
         print(f"📍 Output file: {OUTPUT_FILE}")
         print(f"📊 File size: {OUTPUT_FILE.stat().st_size / 1024:.1f} KB")
+        
+        normalized = processor.normalizer
+        if normalized.bytes_in:
+            print(f"🧹 Normalized: {normalized.bytes_removed / 1024:.1f} KB removed "
+                  f"({normalized.bytes_removed / normalized.bytes_in:.1%}), "
+                  f"{normalized.repeated_lines} header/footer lines, "
+                  f"{normalized.hyphens_joined} hyphenations, {normalized.lines_joined} broken lines fixed")
+        
+        if exporter:
+            print(f"🧩 Chunks exported: {exporter.total_chunks} ({exporter.total_tokens:,} tokens)")
+            print(f"📍 Chunks file: {exporter.output_file}")
+            if exporter.dedup:
+                print(f"🧬 Near-duplicates: {exporter.dedup.dropped} chunks ({exporter.dropped_tokens:,} tokens) "
+                      f"dropped in {len(exporter.dedup.clusters)} clusters, see {exporter.duplicates_file.name}")
+        if bm25_index:
+            print(f"🔎 BM25 index: {len(bm25_index.terms):,} terms over {len(bm25_index)} chunks ({BM25_INDEX_DIR})")
         print()
         print("=" * 60)
         print("  🎉 PROCESS SELESAI!")
@@ -474,14 +2118,40 @@ def main():
         
         # Print quick summary
         print(f"📋 Summary:")
-        print(f"   - Total documents: {len(documents)}")
-        print(f"   - Categories: {set(doc.category for doc in documents)}")
-        print(f"   - Images: {sum(len(doc.images) for doc in documents)}")
+        print(f"   - Total documents: {generator.total_documents}")
+        print(f"   - Categories: {set(generator.categories)}")
+        print(f"   - Images: {generator.total_images}")
+        print()
+        
+        # Per-extractor instrumentation
+        print(f"⏱️  Metrics (per file: {METRICS_FILE.name}):")
+        metrics.print_summary()
         
     except Exception as e:
         print(f"❌ Error during processing: {str(e)}")
         import traceback
         traceback.print_exc()
+    
+    finally:
+        if ocr:
+            ocr.close()
+        if cache:
+            cache.close()
+        metrics.close()
+        
+        if profiler:
+            import pstats
+            profiler.disable()
+            profiler.dump_stats(str(PROFILE_FILE))
+            print(f"\n🔬 Profile saved: {PROFILE_FILE} (top 20 by cumulative time)")
+            pstats.Stats(profiler).sort_stats('cumulative').print_stats(20)
+        
+        if args.tracemalloc:
+            snapshot = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+            print("\n🔬 Top 10 allocation sites:")
+            for stat in snapshot.statistics('lineno')[:10]:
+                print(f"   {stat}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,581 @@
+"""
+SMAN 1 Baleendah Retrieval Sidecar
+Serve top-k chunk retrieval over the exported embedding matrix on a local socket
+
+Loads the store written by embed_chunks.py (the generation named in
+chunk_embeddings.meta.json, memory-mapped read-only, rows L2-normalised) and answers nearest-neighbour queries
+for the Laravel app without pgvector:
+- flat: one matrix-vector product plus argpartition over all rows (exact)
+- ivf:  k-means inverted lists built at load, only `nprobe` lists scanned
+- hnsw: hnswlib graph (optional dependency), cached next to the matrix
+The store and the chunk export are watched and reloaded in the background
+when they change; queries in flight finish on the previous snapshot.
+
+Protocol: newline-delimited JSON over a Unix socket (or TCP on 127.0.0.1
+with --port), any number of requests per connection:
+
+    -> {"vector": [0.01, ...], "top_k": 5, "min_score": 0.5}
+    -> {"query": "jadwal penerimaan siswa baru", "top_k": 5, "include_text": true}
+    <- {"ok": true, "took_ms": 0.8, "results": [{"id": "<document_id>:<chunk_index>",
+        "ids": [...], "filename": "...", "content_hash": "...", "score": 0.83, ...}]}
+    -> {"cmd": "stats"}   /   {"cmd": "reload"}
+
+"query" is embedded with the backend recorded in the store metadata;
+"vector" must come from the same model. Chunks with identical text share
+one row, "ids" lists all of them.
+
+Requirements:
+- pip install numpy
+- pip install hnswlib   (only for --index hnsw)
+
+Usage:
+- python retrieval_server.py
+- python retrieval_server.py --index ivf --nprobe 8
+- python retrieval_server.py --port 8765   (TCP, e.g. on Windows)
+- python retrieval_server.py --query "kepala sekolah"   (one query, no server)
+"""
+
+import os
+import sys
+import argparse
+import json
+import math
+import socket
+import socketserver
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from embed_chunks import (
+    EMBEDDINGS_FILE,
+    OUTPUT_DIR,
+    CHUNKS_FILE,
+    EmbeddingStore,
+    HashingEmbeddingBackend,
+    SentenceTransformerBackend,
+    np,
+)
+
+SOCKET_FILE = OUTPUT_DIR / "retrieval.sock"
+
+# Rows whose norm deviates more than this are re-normalised at load
+NORM_TOLERANCE = 1e-3
+
+# Rows per block when streaming over the memory-mapped matrix
+BLOCK_ROWS = 65536
+
+
+class FlatIndex:
+    """Exact search: scores of all rows with one matmul"""
+
+    name = 'flat'
+
+    def __init__(self, matrix: np.ndarray):
+        self.matrix = matrix
+
+    def search(self, query: np.ndarray, top_k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (rows, scores) of the top_k rows, best first"""
+        return _top_k(np.arange(len(self.matrix)), self.matrix @ query, top_k)
+
+
+class IvfIndex:
+    """
+    Inverted file index: rows grouped by their nearest k-means centroid
+
+    Centroids are trained on a sample (spherical k-means, dot product);
+    a query scans the rows of the `nprobe` closest lists only.
+    """
+
+    name = 'ivf'
+
+    def __init__(self, matrix: np.ndarray, nlist: Optional[int] = None, nprobe: int = 8,
+                 iterations: int = 10, seed: int = 0):
+        self.matrix = matrix
+        self.nlist = max(1, min(nlist or int(math.sqrt(len(matrix))), len(matrix)))
+        self.nprobe = min(nprobe, self.nlist)
+
+        generator = np.random.default_rng(seed)
+        sample_rows = np.sort(generator.choice(len(matrix), size=min(len(matrix), self.nlist * 64), replace=False))
+        sample = np.asarray(matrix[sample_rows], dtype=np.float32)
+        centroids = sample[generator.choice(len(sample), size=self.nlist, replace=False)].copy()
+
+        for _ in range(iterations):
+            assignments = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignments, sample)
+            filled = np.bincount(assignments, minlength=self.nlist) > 0
+            centroids[filled] = _normalize_rows(sums[filled])
+
+        self.centroids = centroids
+        assignments = np.concatenate([
+            np.argmax(matrix[start:start + BLOCK_ROWS] @ centroids.T, axis=1)
+            for start in range(0, len(matrix), BLOCK_ROWS)
+        ])
+        self.order = np.argsort(assignments, kind='stable')
+        self.offsets = np.searchsorted(assignments[self.order], np.arange(self.nlist + 1))
+
+    def search(self, query: np.ndarray, top_k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (rows, scores) of the top_k rows among the probed lists, best first"""
+        lists = np.argpartition(-(self.centroids @ query), self.nprobe - 1)[:self.nprobe]
+        rows = np.sort(np.concatenate([self.order[self.offsets[c]:self.offsets[c + 1]] for c in lists]))
+        return _top_k(rows, self.matrix[rows] @ query, top_k)
+
+
+class HnswIndex:
+    """hnswlib graph over inner product, saved as <matrix>.hnsw and reused while up to date"""
+
+    name = 'hnsw'
+
+    def __init__(self, matrix: np.ndarray, path: Path, ef: int = 64):
+        try:
+            import hnswlib
+        except ImportError:
+            raise ImportError("hnswlib is not installed. Run: pip install hnswlib (or use --index flat/ivf)")
+
+        self.ef = ef
+        self.graph = hnswlib.Index(space='ip', dim=matrix.shape[1])
+        cache_file = path.with_name(path.stem + '.hnsw')
+
+        if cache_file.exists() and cache_file.stat().st_mtime_ns >= path.stat().st_mtime_ns:
+            self.graph.load_index(str(cache_file), max_elements=len(matrix))
+        else:
+            self.graph.init_index(max_elements=len(matrix), ef_construction=200, M=16)
+            for start in range(0, len(matrix), BLOCK_ROWS):
+                block = np.asarray(matrix[start:start + BLOCK_ROWS], dtype=np.float32)
+                self.graph.add_items(block, np.arange(start, start + len(block)))
+            self.graph.save_index(str(cache_file))
+
+    def search(self, query: np.ndarray, top_k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (rows, scores) of the approximate top_k rows, best first"""
+        top_k = min(top_k, self.graph.get_current_count())
+        self.graph.set_ef(max(self.ef, top_k))
+        labels, distances = self.graph.knn_query(query, k=top_k)
+        return labels[0].astype(np.int64), 1.0 - distances[0]
+
+
+def _top_k(rows: np.ndarray, scores: np.ndarray, top_k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Best top_k of (rows, scores) with argpartition, sorted by score"""
+    top_k = min(top_k, len(scores))
+    if top_k <= 0:
+        return rows[:0], scores[:0]
+
+    best = np.argpartition(-scores, top_k - 1)[:top_k]
+    best = best[np.argsort(-scores[best], kind='stable')]
+    return rows[best], scores[best]
+
+
+def _normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class Snapshot:
+    """One consistent load of the store, chunk export and search index"""
+
+    def __init__(self, store: EmbeddingStore, chunks_file: Path, index_kind: str, index_options: Dict):
+        self.meta = store.load_meta()
+        if self.meta is None:
+            raise FileNotFoundError(f"Embedding store not found: {store.path}")
+
+        self.keys, self.matrix = store.load(self.meta)
+
+        # Stored rows are normalised by embed_chunks.py; copy into memory only if they are not
+        norms = np.concatenate([
+            np.linalg.norm(self.matrix[start:start + BLOCK_ROWS], axis=1)
+            for start in range(0, len(self.matrix), BLOCK_ROWS)
+        ]) if len(self.matrix) else np.ones(0, dtype=np.float32)
+        if np.any(np.abs(norms - 1.0) > NORM_TOLERANCE):
+            self.matrix = _normalize_rows(np.asarray(self.matrix, dtype=np.float32)).astype(np.float32)
+
+        self.chunks_file = chunks_file
+        self.chunks, self.offsets = self._load_chunks(chunks_file)
+
+        if index_kind == 'ivf' and len(self.matrix):
+            self.index = IvfIndex(self.matrix, **index_options)
+        elif index_kind == 'hnsw' and len(self.matrix):
+            self.index = HnswIndex(self.matrix, store.matrix_path(self.meta), **index_options)
+        else:
+            self.index = FlatIndex(self.matrix)
+
+        # Query text embedding backend, set by RetrievalService before the snapshot is served
+        self.backend = None
+        self.loaded_at = time.time()
+
+    @staticmethod
+    def _load_chunks(chunks_file: Path) -> Tuple[Dict[str, List[Dict]], Dict[str, int]]:
+        """Chunk entries per content hash, and the byte offset of each hash's first record"""
+        chunks: Dict[str, List[Dict]] = {}
+        offsets: Dict[str, int] = {}
+        if not chunks_file.exists():
+            return chunks, offsets
+
+        offset = 0
+        with open(chunks_file, 'rb') as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    key = record['content_hash']
+                    offsets.setdefault(key, offset)
+                    chunks.setdefault(key, []).append({
+                        'id': f"{record['document_id']}:{record['chunk_index']}",
+                        'document_id': record['document_id'],
+                        'chunk_index': record['chunk_index'],
+                        'filename': record['filename'],
+                        'category': record.get('category'),
+                    })
+                offset += len(line)
+
+        return chunks, offsets
+
+    def text(self, key: str) -> Optional[str]:
+        """Chunk text, read from the export on demand"""
+        if key not in self.offsets:
+            return None
+        with open(self.chunks_file, 'rb') as f:
+            f.seek(self.offsets[key])
+            return json.loads(f.readline())['text']
+
+
+class RetrievalService:
+    """Query API over the current snapshot, reloaded when the store or export changes"""
+
+    def __init__(self, store: EmbeddingStore, chunks_file: Path = CHUNKS_FILE,
+                 index_kind: str = 'flat', index_options: Optional[Dict] = None):
+        self.store = store
+        self.chunks_file = chunks_file
+        self.index_kind = index_kind
+        self.index_options = index_options or {}
+        self.snapshot: Optional[Snapshot] = None
+        self.signature = None
+        self.queries = 0
+        self.reloads = 0
+        self._reload_lock = threading.Lock()
+
+    def _files(self) -> List[Path]:
+        # The manifest is replaced last when the store is rewritten
+        return [self.store.meta_path, self.chunks_file]
+
+    def _signature(self) -> Tuple:
+        return tuple(
+            (path.stat().st_mtime_ns, path.stat().st_size) if path.exists() else None
+            for path in self._files()
+        )
+
+    def reload_if_changed(self, force: bool = False) -> bool:
+        """
+        Load a new snapshot when any watched file changed
+
+        A failed load (e.g. a generation's files are missing) keeps the previous
+        snapshot and is retried on the next call.
+
+        Returns:
+            bool: True if a new snapshot is being served
+        """
+        with self._reload_lock:
+            signature = self._signature()
+            if not force and signature == self.signature:
+                return False
+
+            start = time.perf_counter()
+            try:
+                snapshot = Snapshot(self.store, self.chunks_file, self.index_kind, self.index_options)
+            except (OSError, ValueError, KeyError) as e:
+                print(f"⚠️  Reload failed, still serving the previous snapshot: {e}")
+                return False
+
+            # Created here, under the lock, so queries never race to create it
+            # and always embed with the model of the snapshot they search
+            settings = EmbeddingStore.settings(snapshot.meta)
+            if self.snapshot is not None and settings == EmbeddingStore.settings(self.snapshot.meta):
+                snapshot.backend = self.snapshot.backend
+            else:
+                snapshot.backend = self._create_backend(snapshot.meta)
+            self.snapshot = snapshot
+            self.signature = signature
+            self.reloads += 1
+
+        print(f"♻️  Loaded {len(snapshot.keys)} vectors ({snapshot.meta['backend']}, {snapshot.index.name}) "
+              f"in {time.perf_counter() - start:.2f}s")
+        return True
+
+    def watch(self, interval: float = 2.0) -> threading.Thread:
+        """Poll the watched files in a daemon thread"""
+        def run():
+            while True:
+                time.sleep(interval)
+                self.reload_if_changed()
+
+        thread = threading.Thread(target=run, name='reload-watcher', daemon=True)
+        thread.start()
+        return thread
+
+    @staticmethod
+    def _create_backend(meta: Dict):
+        """Embedding backend that produced the store (None if it cannot be loaded here)"""
+        try:
+            if meta['backend'] == SentenceTransformerBackend.name:
+                return SentenceTransformerBackend(model=meta['model'])
+            return HashingEmbeddingBackend(dimensions=meta['dimensions'])
+        except (ImportError, OSError) as e:
+            print(f"⚠️  Text queries disabled, only 'vector' requests are answered: {e}")
+            return None
+
+    def search(self, vector: Optional[List[float]] = None, query: Optional[str] = None,
+               top_k: int = 5, min_score: Optional[float] = None, include_text: bool = False) -> List[Dict]:
+        """
+        Top-k chunks for a query vector or query text, best first
+
+        Args:
+            vector (list): Query embedding from the store's model
+            query (str): Query text, embedded with the store's backend
+            top_k (int): Maximum number of results
+            min_score (float): Drop results with a lower cosine similarity
+            include_text (bool): Add the chunk text to each result
+
+        Returns:
+            list: Results with id, ids, document_id, chunk_index, filename, content_hash, score
+        """
+        snapshot = self.snapshot
+        if snapshot is None:
+            raise RuntimeError("No embedding store loaded yet")
+
+        if vector is not None:
+            query_vector = np.asarray(vector, dtype=np.float32)
+        elif query:
+            if snapshot.backend is None:
+                raise ValueError(f"The {snapshot.meta['backend']} backend is not available, send a 'vector'")
+            query_vector = snapshot.backend.embed_query(query).astype(np.float32)
+        else:
+            raise ValueError("Request needs a 'vector' or a 'query'")
+
+        if query_vector.shape != (snapshot.matrix.shape[1],):
+            raise ValueError(f"Query has {query_vector.size} dimensions, store has {snapshot.matrix.shape[1]}")
+
+        norm = np.linalg.norm(query_vector)
+        if norm > 0:
+            query_vector /= norm
+
+        rows, scores = snapshot.index.search(query_vector, top_k)
+        self.queries += 1
+
+        results = []
+        for row, score in zip(rows.tolist(), scores.tolist()):
+            if min_score is not None and score < min_score:
+                break
+            key = snapshot.keys[row]
+            chunks = snapshot.chunks.get(key) or [{'id': None}]
+            result = {
+                **chunks[0],
+                'ids': [chunk['id'] for chunk in chunks if chunk['id']],
+                'content_hash': key,
+                'score': round(score, 6),
+            }
+            if include_text:
+                result['text'] = snapshot.text(key)
+            results.append(result)
+
+        return results
+
+    def stats(self) -> Dict:
+        snapshot = self.snapshot
+        return {
+            'vectors': len(snapshot.keys) if snapshot else 0,
+            'dimensions': int(snapshot.matrix.shape[1]) if snapshot else 0,
+            'backend': snapshot.meta.get('backend') if snapshot else None,
+            'model': snapshot.meta.get('model') if snapshot else None,
+            'index': snapshot.index.name if snapshot else None,
+            'loaded_at': snapshot.loaded_at if snapshot else None,
+            'queries': self.queries,
+            'reloads': self.reloads,
+        }
+
+    def handle(self, request: Dict) -> Dict:
+        """Answer one protocol request (never raises)"""
+        start = time.perf_counter()
+        try:
+            command = request.get('cmd', 'search')
+            if command == 'ping':
+                response = {'ok': True}
+            elif command == 'stats':
+                response = {'ok': True, 'stats': self.stats()}
+            elif command == 'reload':
+                response = {'ok': True, 'reloaded': self.reload_if_changed(force=True)}
+            elif command == 'search':
+                response = {'ok': True, 'results': self.search(
+                    vector=request.get('vector'),
+                    query=request.get('query'),
+                    top_k=int(request.get('top_k', 5)),
+                    min_score=request.get('min_score'),
+                    include_text=bool(request.get('include_text', False)),
+                )}
+            else:
+                response = {'ok': False, 'error': f"Unknown command: {command}"}
+        except Exception as e:
+            response = {'ok': False, 'error': str(e)}
+
+        response['took_ms'] = round((time.perf_counter() - start) * 1000, 3)
+        return response
+
+
+class RequestHandler(socketserver.StreamRequestHandler):
+    """One JSON request per line, one JSON response per line"""
+
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                request = json.loads(line)
+                if not isinstance(request, dict):
+                    raise ValueError("request must be a JSON object")
+                response = self.server.service.handle(request)
+            except ValueError as e:
+                response = {'ok': False, 'error': f"Invalid request: {e}"}
+
+            self.wfile.write(json.dumps(response, ensure_ascii=False).encode('utf-8') + b"\n")
+            self.wfile.flush()
+
+
+class UnixRetrievalServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class TcpRetrievalServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def create_server(service: RetrievalService, socket_path: Optional[Path] = None,
+                  port: Optional[int] = None) -> socketserver.BaseServer:
+    """Unix socket server (TCP on 127.0.0.1 when port is given or AF_UNIX is missing)"""
+    if port is not None or not hasattr(socket, 'AF_UNIX'):
+        server = TcpRetrievalServer(('127.0.0.1', port or 8765), RequestHandler)
+    else:
+        socket_path = socket_path or SOCKET_FILE
+        if socket_path.exists():
+            socket_path.unlink()  # left over from a previous run
+        server = UnixRetrievalServer(str(socket_path), RequestHandler)
+        os.chmod(socket_path, 0o660)
+
+    server.service = service
+    return server
+
+
+def main():
+    """Main execution function"""
+    # Fix Unicode encoding for Windows console
+    if sys.platform == 'win32':
+        sys.stdout.reconfigure(encoding='utf-8')
+
+    parser = argparse.ArgumentParser(
+        description='Serve top-k chunk retrieval over the embedding store on a local socket'
+    )
+
+    parser.add_argument(
+        '--embeddings',
+        type=Path,
+        default=EMBEDDINGS_FILE,
+        help=f'Embedding matrix .npy (default: output/{EMBEDDINGS_FILE.name})'
+    )
+
+    parser.add_argument(
+        '--chunks',
+        type=Path,
+        default=CHUNKS_FILE,
+        help=f'Chunk JSONL export (default: output/{CHUNKS_FILE.name})'
+    )
+
+    parser.add_argument(
+        '--socket',
+        type=Path,
+        default=SOCKET_FILE,
+        help=f'Unix socket path (default: output/{SOCKET_FILE.name})'
+    )
+
+    parser.add_argument(
+        '--port',
+        type=int,
+        default=None,
+        help='Listen on 127.0.0.1:PORT instead of the Unix socket'
+    )
+
+    parser.add_argument(
+        '--index',
+        choices=['flat', 'ivf', 'hnsw'],
+        default='flat',
+        help='Search index (default: flat, exact; ivf/hnsw for large stores)'
+    )
+
+    parser.add_argument(
+        '--nlist',
+        type=int,
+        default=None,
+        help='IVF lists (default: sqrt of the number of vectors)'
+    )
+
+    parser.add_argument(
+        '--nprobe',
+        type=int,
+        default=8,
+        help='IVF lists scanned per query (default: 8)'
+    )
+
+    parser.add_argument(
+        '--reload-interval',
+        type=float,
+        default=2.0,
+        help='Seconds between checks for a changed store/export (default: 2, 0 = never)'
+    )
+
+    parser.add_argument(
+        '--query',
+        type=str,
+        default=None,
+        help='Answer one text query and exit (no server)'
+    )
+
+    parser.add_argument(
+        '--top-k',
+        type=int,
+        default=5,
+        help='Results for --query (default: 5)'
+    )
+
+    args = parser.parse_args()
+
+    index_options = {}
+    if args.index == 'ivf':
+        index_options = {'nlist': args.nlist, 'nprobe': args.nprobe}
+
+    service = RetrievalService(EmbeddingStore(args.embeddings), args.chunks, args.index, index_options)
+    if not service.reload_if_changed():
+        print(f"❌ Could not load the embedding store: {args.embeddings}")
+        print("   Run: python process_documents.py --export-chunks && python embed_chunks.py")
+        sys.exit(1)
+
+    if args.query:
+        response = service.handle({'query': args.query, 'top_k': args.top_k})
+        print(json.dumps(response, ensure_ascii=False, indent=2))
+        return
+
+    server = create_server(service, args.socket, args.port)
+    if args.reload_interval > 0:
+        service.watch(args.reload_interval)
+
+    address = f"127.0.0.1:{server.server_address[1]}" if isinstance(server, TcpRetrievalServer) else args.socket
+    print(f"🔌 Retrieval sidecar listening on {address} (Ctrl+C to stop)")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Stopping")
+    finally:
+        server.server_close()
+        if not isinstance(server, TcpRetrievalServer) and args.socket.exists():
+            args.socket.unlink()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+import json
+
+import numpy as np
+import pytest
+
+from bm25_index import BM25Index, build_index
+
+
+def _write_chunks(path, texts):
+    with open(path, 'w', encoding='utf-8') as f:
+        for index, text in enumerate(texts):
+            f.write(json.dumps({'document_id': 'doc', 'chunk_index': index, 'filename': 'profil.docx',
+                                'content_hash': f"{index:064x}", 'text': text}) + "\n")
+
+
+def test_rebuild_publishes_a_new_generation(tmp_path):
+    chunks = tmp_path / "chunks.jsonl"
+    directory = tmp_path / "bm25_index"
+    _write_chunks(chunks, ["kepala sekolah baru", "jadwal ujian semester"])
+    
+    for _ in range(3):
+        build_index(chunks, directory)
+    
+    index = BM25Index.load(directory)
+    assert index.search("jadwal ujian")[0]['chunk_index'] == 1
+    assert sorted(p.name for p in directory.glob("*.npy")) == sorted(
+        f"{name}.{generation}.npy" for name in ('postings', 'frequencies', 'offsets', 'lengths')
+        for generation in (2, 3)
+    )
+
+
+def test_load_rejects_arrays_from_another_build(tmp_path):
+    chunks = tmp_path / "chunks.jsonl"
+    directory = tmp_path / "bm25_index"
+    _write_chunks(chunks, ["kepala sekolah baru", "jadwal ujian semester"])
+    build_index(chunks, directory)
+    
+    np.save(directory / "lengths.1.npy", np.array([3], dtype=np.uint32))
+    
+    with pytest.raises(ValueError):
+        BM25Index.load(directory)
@@ -0,0 +1,51 @@
+import json
+
+from docx import Document
+
+from process_documents import ChunkExporter, DocumentProcessor, MarkdownGenerator, TextNormalizer
+
+
+def _write_docx(path, text):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    document = Document()
+    document.add_paragraph(text)
+    document.save(str(path))
+
+
+def test_same_filename_in_different_folders_gets_distinct_ids(tmp_path):
+    docs = tmp_path / "docs"
+    _write_docx(docs / "Kurikulum 2024" / "jadwal.docx", "Jadwal ujian semester ganjil dimulai bulan Desember.")
+    _write_docx(docs / "Kurikulum 2025" / "jadwal.docx", "Jadwal ujian semester genap dimulai bulan Juni.")
+    
+    chunks_file = tmp_path / "chunks.jsonl"
+    exporter = ChunkExporter(output_file=chunks_file)
+    for _ in exporter.tee(DocumentProcessor().process_directory(docs)):
+        pass
+    
+    records = [json.loads(line) for line in chunks_file.read_text(encoding='utf-8').splitlines()]
+    assert [r['path'] for r in records] == ["Kurikulum 2024/jadwal.docx", "Kurikulum 2025/jadwal.docx"]
+    assert records[0]['category'] == records[1]['category']
+    assert records[0]['document_id'] != records[1]['document_id']
+
+
+def test_documents_are_normalized_once_for_markdown_and_chunks(tmp_path, monkeypatch):
+    docs = tmp_path / "docs"
+    _write_docx(docs / "profil.docx", "Sejarah   sekolah  berdiri tahun 1960.")
+    
+    calls = []
+    original = TextNormalizer.normalize_document
+    
+    def counting(self, doc):
+        calls.append(doc.filename)
+        return original(self, doc)
+    
+    monkeypatch.setattr(TextNormalizer, 'normalize_document', counting)
+    
+    processor = DocumentProcessor()
+    exporter = ChunkExporter(output_file=tmp_path / "chunks.jsonl", normalizer=processor.normalizer)
+    generator = MarkdownGenerator(exporter.tee(processor.process_directory(docs)), normalizer=processor.normalizer)
+    
+    assert generator.generate_to_file(tmp_path / "out.md") == 1
+    assert calls == ["profil.docx"]
+    record = json.loads((tmp_path / "chunks.jsonl").read_text(encoding='utf-8'))
+    assert record['text'] in (tmp_path / "out.md").read_text(encoding='utf-8')
@@ -0,0 +1,68 @@
+import json
+
+import numpy as np
+import pytest
+
+from embed_chunks import ChunkEmbedder, EmbeddingStore, HashingEmbeddingBackend
+
+
+def _write_chunks(path, texts):
+    with open(path, 'w', encoding='utf-8') as f:
+        for index, text in enumerate(texts):
+            f.write(json.dumps({'document_id': 'doc', 'chunk_index': index,
+                                'content_hash': f"{index:064x}", 'text': text}) + "\n")
+
+
+def test_rerun_reuses_vectors_and_keeps_one_previous_generation(tmp_path):
+    chunks = tmp_path / "chunks.jsonl"
+    store = EmbeddingStore(tmp_path / "emb.npy")
+    backend = HashingEmbeddingBackend(dimensions=16)
+    texts = ["jadwal ujian", "kepala sekolah", "penerimaan siswa baru"]
+    
+    for _ in range(3):
+        _write_chunks(chunks, texts)
+        embedder = ChunkEmbedder(backend, store, batch_size=2)
+        embedder.run(chunks)
+    
+    assert (embedder.reused, embedder.embedded) == (3, 0)
+    meta = store.load_meta()
+    keys, matrix = store.load(meta)
+    assert meta['generation'] == 3
+    np.testing.assert_allclose(matrix, backend.embed(texts))
+    assert sorted(p.name for p in tmp_path.glob("emb.*")) == [
+        "emb.2.keys.npy", "emb.2.npy", "emb.3.keys.npy", "emb.3.npy", "emb.meta.json",
+    ]
+
+
+def test_failed_write_leaves_previous_generation_served(tmp_path):
+    chunks = tmp_path / "chunks.jsonl"
+    store = EmbeddingStore(tmp_path / "emb.npy")
+    _write_chunks(chunks, ["jadwal ujian"])
+    ChunkEmbedder(HashingEmbeddingBackend(dimensions=16), store).run(chunks)
+    
+    class FailingBackend(HashingEmbeddingBackend):
+        def embed(self, texts):
+            raise RuntimeError("model crashed")
+    
+    _write_chunks(chunks, ["jadwal ujian", "kepala sekolah"])
+    with pytest.raises(RuntimeError):
+        ChunkEmbedder(FailingBackend(dimensions=16), store).run(chunks)
+    
+    meta = store.load_meta()
+    keys, matrix = store.load(meta)
+    assert meta['generation'] == 1 and len(keys) == len(matrix) == 1
+
+
+def test_load_rejects_files_that_do_not_match_the_manifest(tmp_path):
+    chunks = tmp_path / "chunks.jsonl"
+    store = EmbeddingStore(tmp_path / "emb.npy")
+    _write_chunks(chunks, ["jadwal ujian", "kepala sekolah"])
+    backend = HashingEmbeddingBackend(dimensions=16)
+    ChunkEmbedder(backend, store).run(chunks)
+    
+    meta = store.load_meta()
+    np.save(store.keys_path(meta), np.array([b"0" * 64], dtype='S64'))
+    
+    with pytest.raises(ValueError):
+        store.load(meta)
+    assert store.compatible_index(store.settings(meta)) == ({}, None)
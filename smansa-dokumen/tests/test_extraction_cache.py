@@ -0,0 +1,103 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from process_documents import ExtractionCache, ProcessedDocument
+
+
+def _doc(name: str, content: str) -> ProcessedDocument:
+    return ProcessedDocument(filename=name, category='Umum', content=content, metadata={})
+
+
+def test_page_limits_only_change_pdf_entries(tmp_path):
+    pdf = tmp_path / "a.pdf"
+    docx = tmp_path / "b.docx"
+    pdf.write_bytes(b"%PDF")
+    docx.write_bytes(b"docx")
+    db = tmp_path / "cache.sqlite"
+    
+    full = ExtractionCache(db, variants={'pdf': '+no_ocr'})
+    for key, path in (("a.pdf", pdf), ("b.docx", docx)):
+        full.put(key, full.hash_file(path), path, _doc(key, "full"))
+    full.close()
+    
+    limited = ExtractionCache(db, variants={'pdf': '+max_pages=1+no_ocr'})
+    pdf_hash = limited.content_hash("a.pdf", pdf)
+    assert limited.has("b.docx", limited.content_hash("b.docx", docx))
+    assert not limited.has("a.pdf", pdf_hash)
+    limited.put("a.pdf", pdf_hash, pdf, _doc("a.pdf", "limited"))
+    limited.close()
+    
+    # The limited run stored its own entry next to the full one
+    full = ExtractionCache(db, variants={'pdf': '+no_ocr'})
+    assert full.get("a.pdf", pdf_hash).content == "full"
+    full.close()
+
+
+def test_changed_content_drops_other_versions(tmp_path):
+    pdf = tmp_path / "a.pdf"
+    pdf.write_bytes(b"%PDF-1")
+    db = tmp_path / "cache.sqlite"
+    
+    full = ExtractionCache(db)
+    limited = ExtractionCache(db, variants={'pdf': '+max_pages=1'})
+    full.put("a.pdf", full.hash_file(pdf), pdf, _doc("a.pdf", "old"))
+    
+    pdf.write_bytes(b"%PDF-2")
+    new_hash = limited.content_hash("a.pdf", pdf)
+    limited.put("a.pdf", new_hash, pdf, _doc("a.pdf", "new"))
+    
+    rows = full.conn.execute("SELECT content_hash FROM extractions WHERE path = 'a.pdf'").fetchall()
+    assert rows == [(new_hash,)]
+    full.close()
+    limited.close()
+
+
+def test_ocr_and_plain_page_text_are_kept_apart(tmp_path):
+    db = tmp_path / "cache.sqlite"
+    
+    plain = ExtractionCache(db, page_variant='+no_ocr')
+    ocr = ExtractionCache(db, page_variant='+ocr=ind')
+    plain.put_page("abc", 1, "")
+    ocr.put_page("abc", 1, "teks hasil OCR")
+    
+    assert plain.get_page("abc", 1) == ""
+    assert ocr.get_page("abc", 1) == "teks hasil OCR"
+    plain.close()
+    ocr.close()
+
+
+def test_old_page_table_is_rebuilt(tmp_path):
+    db = tmp_path / "cache.sqlite"
+    old = ExtractionCache(db)
+    old.conn.execute("DROP TABLE pdf_pages")
+    old.conn.execute("""
+        CREATE TABLE pdf_pages (
+            content_hash TEXT NOT NULL,
+            page_number INTEGER NOT NULL,
+            extractor_version TEXT NOT NULL,
+            text TEXT NOT NULL,
+            PRIMARY KEY (content_hash, page_number)
+        )
+    """)
+    old.close()
+    
+    cache = ExtractionCache(db, page_variant='+no_ocr')
+    primary_key = [row[1] for row in cache.conn.execute("PRAGMA table_info(pdf_pages)") if row[5]]
+    assert primary_key == ['content_hash', 'page_number', 'extractor_version']
+    cache.close()
+
+
+def test_connection_is_shared_safely_between_threads(tmp_path):
+    cache = ExtractionCache(tmp_path / "cache.sqlite", page_variant='+ocr=ind')
+    
+    def work(worker):
+        for page in range(50):
+            cache.put_page(f"pdf{worker}", page, f"halaman {page}")
+            cache.put_ocr(f"img{worker}-{page}", "1.0", "teks")
+            assert cache.get_page(f"pdf{worker}", page) == f"halaman {page}"
+            assert cache.get_ocr(f"img{worker}-{page}", "1.0") == "teks"
+    
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        list(executor.map(work, range(4)))
+    
+    assert cache.conn.execute("SELECT COUNT(*) FROM pdf_pages").fetchone() == (200,)
+    cache.close()
@@ -0,0 +1,35 @@
+from process_documents import MarkdownGenerator, ProcessedDocument
+
+
+def _doc(filename, category, content):
+    return ProcessedDocument(filename=filename, category=category, content=content)
+
+
+def test_sections_are_written_as_documents_arrive(tmp_path):
+    docs = [_doc("profil.docx", "Sejarah & Profil", "Sejarah sekolah."),
+            _doc("kurikulum.pdf", "Kurikulum", "Struktur kurikulum.")]
+    
+    def stream():
+        for number, doc in enumerate(docs):
+            # The previous document was rendered before this one is requested
+            assert generator.total_documents == number
+            yield doc
+    
+    generator = MarkdownGenerator(stream())
+    output = tmp_path / "out.md"
+    
+    assert generator.generate_to_file(output) == 2
+    text = output.read_text(encoding='utf-8')
+    assert "**Total Dokumen:** 2" in text
+    assert text.index("## 📑 Daftar Isi") < text.index("## 📄 profil.docx") < text.index("## 📄 kurikulum.pdf")
+    assert text.index("## 📄 kurikulum.pdf") < text.index("## 📊 Ringkasan Proses")
+    assert "- **Kurikulum:** 1 dokumen" in text
+
+
+def test_nothing_is_written_without_documents(tmp_path):
+    output = tmp_path / "out.md"
+    output.write_text("previous run", encoding='utf-8')
+    
+    assert MarkdownGenerator(iter([])).generate_to_file(output) == 0
+    assert output.read_text(encoding='utf-8') == "previous run"
+    assert not (tmp_path / "out.md.tmp").exists()
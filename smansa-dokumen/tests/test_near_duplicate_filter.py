@@ -0,0 +1,57 @@
+import hashlib
+
+from process_documents import NearDuplicateFilter
+
+BASE = ("Penerimaan peserta didik baru SMAN 1 Baleendah tahun ajaran 2025 dibuka melalui jalur zonasi, "
+        "afirmasi, perpindahan tugas orang tua dan prestasi. Pendaftaran dilakukan secara daring dan "
+        "berkas diverifikasi oleh panitia di sekolah sesuai jadwal yang telah ditetapkan dinas pendidikan.")
+
+
+def test_near_duplicates_are_dropped_and_distinct_texts_kept():
+    dedup = NearDuplicateFilter(threshold=0.8)
+    
+    assert dedup.check("a", BASE) is None
+    # Same text with one word changed at the end
+    kept, similarity = dedup.check("b", BASE.replace("pendidikan.", "provinsi."))
+    assert kept == "a" and similarity >= 0.8
+    assert dedup.check("c", "Jadwal ujian akhir semester genap untuk kelas X, XI dan XII "
+                            "dimulai pada minggu kedua bulan Juni di ruang kelas masing-masing.") is None
+    
+    report = dedup.report()
+    assert (report['checked'], report['kept'], report['dropped']) == (3, 2, 1)
+    assert report['clusters'] == [{'kept': "a", 'duplicates': [{'key': "b", 'similarity': round(similarity, 3)}]}]
+
+
+def test_first_text_of_a_cluster_is_kept():
+    dedup = NearDuplicateFilter(threshold=0.8)
+    results = [dedup.check(key, BASE) for key in ("x", "y", "z")]
+    
+    assert results == [None, ("x", 1.0), ("x", 1.0)]
+    assert dedup.report()['clusters'][0]['duplicates'] == [
+        {'key': "y", 'similarity': 1.0}, {'key': "z", 'similarity': 1.0},
+    ]
+
+
+def test_short_and_empty_texts_do_not_collapse_together():
+    dedup = NearDuplicateFilter(threshold=0.8)
+    
+    assert dedup.check("e1", "") is None
+    assert dedup.check("e2", "  \n ") is None
+    assert dedup.check("s1", "Daftar isi") is None
+    assert dedup.check("s2", "Kata pengantar") is None
+    assert dedup.check("s3", "Visi misi sekolah") is None
+    # Short texts still match when their words are identical
+    assert dedup.check("s4", "DAFTAR ISI.") == ("s1", 1.0)
+    assert dedup.report()['kept'] == 5
+
+
+def test_signature_matches_exact_integer_arithmetic():
+    dedup = NearDuplicateFilter()
+    shingles = dedup.shingles(NearDuplicateFilter.WORD.findall(BASE.lower()))
+    hashes = [int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=4).digest(), 'little')
+              for shingle in shingles]
+    
+    # Python integers never overflow: the NumPy uint64 version must agree exactly
+    expected = [min(((int(a) * x + int(b)) % ((1 << 61) - 1)) & 0xFFFFFFFF for x in hashes)
+                for a, b in zip(dedup.a, dedup.b)]
+    assert dedup.signature(shingles).tolist() == expected
@@ -0,0 +1,67 @@
+import io
+import random
+
+from PIL import Image, ImageDraw
+
+from process_documents import OCR_TARGET_WIDTH, _otsu_threshold, prepare_for_ocr
+
+
+def _scan(size, background=185, ink=95):
+    """Low-contrast synthetic scan: dark 'text lines' on a gray page"""
+    image = Image.new('L', size, background)
+    draw = ImageDraw.Draw(image)
+    for top in range(size[1] // 10, size[1] - size[1] // 10, max(size[1] // 5, 4)):
+        draw.rectangle((size[0] // 10, top, size[0] * 9 // 10, top + max(size[1] // 20, 1)), fill=ink)
+    return image
+
+
+def test_otsu_splits_a_bimodal_histogram_between_the_modes():
+    rng = random.Random(3)
+    histogram = [0] * 256
+    for mean, count in ((60, 3000), (190, 7000)):
+        for _ in range(count):
+            histogram[min(255, max(0, round(rng.gauss(mean, 12))))] += 1
+    
+    # Beyond three standard deviations of both modes
+    assert 60 + 3 * 12 <= _otsu_threshold(histogram) <= 190 - 3 * 12
+    # Two spikes: any level from the lower one up to just below the upper one separates them
+    spikes = [0] * 256
+    spikes[40], spikes[200] = 10, 30
+    assert 40 <= _otsu_threshold(spikes) < 200
+
+
+def test_small_scan_is_upscaled_and_binarized():
+    result = prepare_for_ocr(_scan((400, 100)))
+    
+    # Capped at OCR_MAX_UPSCALE (3x), not stretched all the way to OCR_TARGET_WIDTH
+    assert result.size == (1200, 300)
+    assert result.mode == 'L'
+    assert [level for level, count in enumerate(result.histogram()) if count] == [0, 255]
+    # Ink becomes black, the gray page white
+    assert result.getpixel((600, 45)) == 0
+    assert result.getpixel((10, 10)) == 255
+
+
+def test_size_close_to_target_is_kept_and_huge_scans_are_downscaled():
+    assert prepare_for_ocr(_scan((2000, 200))).size == (2000, 200)
+    assert prepare_for_ocr(_scan((6000, 600))).size == (OCR_TARGET_WIDTH, 248)
+
+
+def test_exif_orientation_is_applied_before_scaling():
+    buffer = io.BytesIO()
+    exif = Image.Exif()
+    exif[0x0112] = 6  # Stored sideways, display rotated 90° clockwise
+    _scan((300, 100)).save(buffer, format='JPEG', exif=exif)
+    
+    with Image.open(buffer) as image:
+        result = prepare_for_ocr(image)
+    assert result.size == (300, 900)
+
+
+def test_transparency_is_flattened_onto_white():
+    image = Image.new('RGBA', (400, 100), (0, 0, 0, 0))
+    ImageDraw.Draw(image).rectangle((40, 40, 360, 60), fill=(20, 20, 20, 255))
+    
+    result = prepare_for_ocr(image)
+    assert result.getpixel((10, 10)) == 255
+    assert result.getpixel((600, 150)) == 0
@@ -0,0 +1,56 @@
+from docx import Document
+
+from process_documents import DocumentProcessor, _process_file_isolated
+
+
+def _write_docx(path, text):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    document = Document()
+    document.add_paragraph(text)
+    document.save(str(path))
+
+
+def _options():
+    return {
+        'cache_path': None,
+        'cache_variants': {},
+        'cache_page_variant': '',
+        'max_pages': None,
+        'page_range': None,
+        'xlsx_max_rows': 0,
+        'xlsx_spill_dir': None,
+        'ocr_lang': None,
+        'ocr_workers': 1,
+        'tracemalloc': False,
+    }
+
+
+def test_parallel_results_keep_input_order(tmp_path):
+    names = [f"dokumen {number:02d}.docx" for number in range(8)]
+    for name in names:
+        _write_docx(tmp_path / name, f"Isi {name}")
+    
+    docs = list(DocumentProcessor().process_directory(tmp_path, workers=3))
+    
+    assert [doc.filename for doc in docs] == names
+    assert [doc.content for doc in docs] == [f"Isi {name}" for name in names]
+
+
+def test_broken_file_does_not_stop_the_pool(tmp_path):
+    _write_docx(tmp_path / "a.docx", "Dokumen pertama")
+    (tmp_path / "b.docx").write_bytes(b"not a zip archive")
+    _write_docx(tmp_path / "c.docx", "Dokumen ketiga")
+    
+    docs = list(DocumentProcessor().process_directory(tmp_path, workers=2))
+    
+    assert [doc.filename for doc in docs] == ["a.docx", "c.docx"]
+
+
+def test_isolated_worker_reports_errors_instead_of_raising(tmp_path):
+    broken = tmp_path / "rusak.docx"
+    broken.write_bytes(b"not a zip archive")
+    
+    doc, error, record = _process_file_isolated(broken, _options())
+    
+    assert doc is None and error
+    assert record['file'] == "rusak.docx" and record['error'] == error and record['extractor'] == 'docx'
@@ -0,0 +1,67 @@
+import json
+
+from docx import Document
+
+from process_documents import DocumentProcessor, ExtractionCache, PipelineMetrics
+
+
+def _write_docx(path, text):
+    document = Document()
+    document.add_paragraph(text)
+    document.save(str(path))
+
+
+def _records(path):
+    return [json.loads(line) for line in path.read_text(encoding='utf-8').splitlines()]
+
+
+def test_file_stage_and_summary_records(tmp_path):
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    _write_docx(docs / "a.docx", "Visi dan misi sekolah.")
+    (docs / "b.docx").write_bytes(b"not a zip")
+    
+    metrics_file = tmp_path / "metrics.jsonl"
+    metrics = PipelineMetrics(metrics_file)
+    processor = DocumentProcessor(metrics=metrics)
+    assert [doc.filename for doc in processor.process_directory(docs)] == ["a.docx"]
+    metrics.add_stage('render', 0.25)
+    metrics.add_stage('render', 0.5)
+    metrics.close()
+    
+    records = _records(metrics_file)
+    assert [r['type'] for r in records] == ['file', 'file', 'stage', 'summary']
+    
+    good, bad = records[0], records[1]
+    assert (good['file'], good['extractor'], good['error'], good['cached']) == ("a.docx", 'docx', None, False)
+    assert good['chars'] == len("Visi dan misi sekolah.")
+    assert good['bytes'] == (docs / "a.docx").stat().st_size
+    assert bad['file'] == "b.docx" and bad['error'] and bad['chars'] == 0
+    
+    assert records[2] == {'type': 'stage', 'stage': 'render', 'seconds': 0.75}
+    
+    row = records[3]['extractors']['docx']
+    assert (row['files'], row['cached'], row['errors']) == (2, 0, 1)
+    assert row['chars'] == good['chars']
+    assert row['bytes'] == good['bytes'] + bad['bytes']
+    assert row['max_seconds'] == max(good['seconds'], bad['seconds'])
+
+
+def test_cached_files_are_recorded_as_cached(tmp_path):
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    _write_docx(docs / "a.docx", "Jadwal pelajaran.")
+    cache_file = tmp_path / "cache.sqlite"
+    
+    for run in ("first", "second"):
+        cache = ExtractionCache(cache_file)
+        metrics = PipelineMetrics(tmp_path / f"{run}.jsonl")
+        list(DocumentProcessor(cache=cache, metrics=metrics).process_directory(docs))
+        metrics.close()
+        cache.close()
+    
+    first = _records(tmp_path / "first.jsonl")
+    second = _records(tmp_path / "second.jsonl")
+    assert first[0]['cached'] is False
+    assert second[0]['cached'] is True
+    assert second[-1]['extractors']['docx']['cached'] == 1
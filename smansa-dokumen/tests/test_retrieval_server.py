@@ -0,0 +1,34 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+from embed_chunks import ChunkEmbedder, EmbeddingStore, HashingEmbeddingBackend
+from retrieval_server import RetrievalService
+
+
+def _write_chunks(path, texts):
+    with open(path, 'w', encoding='utf-8') as f:
+        for index, text in enumerate(texts):
+            f.write(json.dumps({'document_id': 'doc', 'chunk_index': index, 'filename': 'profil.docx',
+                                'content_hash': f"{index:064x}", 'text': text}) + "\n")
+
+
+def test_query_backend_is_created_with_the_snapshot(tmp_path):
+    chunks = tmp_path / "chunks.jsonl"
+    store = EmbeddingStore(tmp_path / "emb.npy")
+    _write_chunks(chunks, ["kepala sekolah baru", "jadwal ujian semester"])
+    ChunkEmbedder(HashingEmbeddingBackend(), store).run(chunks)
+    
+    service = RetrievalService(store, chunks)
+    assert service.reload_if_changed()
+    backend = service.snapshot.backend
+    assert backend is not None
+    
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda _: service.search(query="jadwal ujian", top_k=1), range(32)))
+    assert all(result[0]['chunk_index'] == 1 for result in results)
+    
+    # A rewrite with the same model keeps the backend
+    _write_chunks(chunks, ["kepala sekolah baru", "jadwal ujian semester", "penerimaan siswa"])
+    ChunkEmbedder(HashingEmbeddingBackend(), store).run(chunks)
+    assert service.reload_if_changed()
+    assert service.snapshot.backend is backend and len(service.snapshot.keys) == 3
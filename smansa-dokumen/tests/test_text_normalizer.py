@@ -0,0 +1,40 @@
+from process_documents import PAGE_BREAK, ProcessedDocument, TextNormalizer
+
+
+def _doc(filename: str, content: str) -> ProcessedDocument:
+    return ProcessedDocument(filename=filename, category='Umum', content=content)
+
+
+def test_docx_table_rows_are_not_joined():
+    # _process_docx renders table rows as "cell | cell" without a leading "|"
+    content = "Jadwal Kegiatan\nkelas | ruang\nx ipa 1 | lab fisika\nxi ips 2 | aula"
+    
+    text = TextNormalizer().normalize_document(_doc("jadwal.docx", content))
+    
+    assert text.splitlines() == ["Jadwal Kegiatan", "kelas | ruang", "x ipa 1 | lab fisika", "xi ips 2 | aula"]
+
+
+def test_docx_paragraphs_are_not_reflowed():
+    content = "Visi sekolah\nmenjadi sekolah unggul-\nberprestasi"
+    
+    text = TextNormalizer().normalize_document(_doc("profil.docx", content))
+    
+    assert text.splitlines() == ["Visi sekolah", "menjadi sekolah unggul-", "berprestasi"]
+
+
+def test_pdf_lines_and_hyphens_are_rejoined():
+    content = "Kegiatan belajar dilaksanakan pada hari\nsenin sampai jumat untuk pendi-\ndikan anak-\nanak." + PAGE_BREAK
+    normalizer = TextNormalizer()
+    
+    text = normalizer.normalize_document(_doc("panduan.pdf", content))
+    
+    assert text == "Kegiatan belajar dilaksanakan pada hari senin sampai jumat untuk pendidikan anak-anak."
+    assert (normalizer.lines_joined, normalizer.hyphens_joined) == (1, 2)
+
+
+def test_pdf_table_cells_are_not_joined():
+    content = "nama | nilai\nandi | 90\nbudi | 85"
+    
+    text = TextNormalizer().normalize_document(_doc("nilai.pdf", content))
+    
+    assert text.splitlines() == ["nama | nilai", "andi | 90", "budi | 85"]
@@ -0,0 +1,55 @@
+import csv
+
+import openpyxl
+
+from process_documents import DocumentProcessor
+
+
+def _write_workbook(path):
+    workbook = openpyxl.Workbook()
+    siswa = workbook.active
+    siswa.title = "Siswa"
+    siswa.append(["NIS", "Nama", "Kelas"])
+    for number in range(1, 6):
+        siswa.append([number, f"Siswa {number}", "X-1"])
+    
+    guru = workbook.create_sheet("Guru")
+    guru.append(["Nama", "Mapel"])
+    guru.append(["Bu Ani", "Matematika"])
+    workbook.save(str(path))
+
+
+def test_rows_are_capped_and_truncated_sheet_spills_to_csv(tmp_path):
+    workbook = tmp_path / "data.xlsx"
+    _write_workbook(workbook)
+    spill_dir = tmp_path / "spill"
+    
+    processor = DocumentProcessor(xlsx_max_rows=2, xlsx_spill_dir=spill_dir)
+    doc = processor._process_xlsx(workbook, "Umum")
+    
+    assert "|1|Siswa 1|X-1|" in doc.content
+    assert "|2|Siswa 2|X-1|" in doc.content
+    assert "Siswa 3" not in doc.content
+    assert "*... 3 baris lainnya tidak ditampilkan* *(data lengkap: data - Siswa.csv)*" in doc.content
+    assert doc.metadata['rows'] == 6
+    assert doc.metadata['truncated_sheets'] == 1
+    
+    with open(spill_dir / "data - Siswa.csv", encoding='utf-8', newline='') as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == ["NIS", "Nama", "Kelas"]
+    assert rows[1:] == [[str(n), f"Siswa {n}", "X-1"] for n in range(1, 6)]
+    
+    # The sheet under the cap is rendered in full and leaves no CSV behind
+    assert "|Bu Ani|Matematika|" in doc.content
+    assert sorted(p.name for p in spill_dir.iterdir()) == ["data - Siswa.csv"]
+
+
+def test_no_cap_renders_every_row(tmp_path):
+    workbook = tmp_path / "data.xlsx"
+    _write_workbook(workbook)
+    
+    doc = DocumentProcessor(xlsx_max_rows=0)._process_xlsx(workbook, "Umum")
+    
+    assert "|5|Siswa 5|X-1|" in doc.content
+    assert "tidak ditampilkan" not in doc.content
+    assert 'truncated_sheets' not in doc.metadata
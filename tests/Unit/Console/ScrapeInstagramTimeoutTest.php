@@ -0,0 +1,65 @@
+<?php
+
+namespace Tests\Unit\Console;
+
+use App\Console\Commands\ScrapeInstagram;
+use Illuminate\Console\OutputStyle;
+use Illuminate\Support\Facades\Log;
+use Symfony\Component\Console\Input\ArrayInput;
+use Symfony\Component\Console\Output\BufferedOutput;
+use Symfony\Component\Process\Process;
+use Tests\TestCase;
+
+class ScrapeInstagramTimeoutTest extends TestCase
+{
+    /**
+     * Stands in for scraper.py: reports one post, then runs until SIGTERM and
+     * only writes its summary while shutting down
+     */
+    private const FAKE_SCRAPER = <<<'SH'
+trap 'echo "{\"event\":\"summary\",\"ok\":false,\"error\":\"interrupted\",\"targets\":[{\"target\":\"sman1baleendah\",\"status\":\"interrupted\",\"scraped\":3,\"skipped\":1,\"errors\":0}]}"; exit 0' TERM
+echo '{"event":"post","status":"scraped","target":"sman1baleendah","shortcode":"ABC123","images":2}'
+while true; do sleep 0.1; done
+SH;
+
+    public function test_timed_out_scraper_gets_a_grace_period_to_write_its_summary()
+    {
+        Log::spy();
+
+        $command = new class extends ScrapeInstagram {
+            protected int $timeoutPerTarget = 1;
+            protected int $stopGracePeriod = 10;
+
+            protected function makeScraperProcess(array $command, string $cwd): Process
+            {
+                return new Process(['sh', '-c', ScrapeInstagramTimeoutTest::fakeScraper()]);
+            }
+        };
+        $command->setLaravel($this->app);
+        $output = new BufferedOutput();
+        $command->setOutput(new OutputStyle(new ArrayInput([]), $output));
+
+        $method = new \ReflectionMethod($command, 'runPythonScraper');
+        $method->setAccessible(true);
+
+        $started = microtime(true);
+        $results = $method->invoke($command, ['sman1baleendah'], 20, 'python');
+        $elapsed = microtime(true) - $started;
+
+        // Stopped by SIGTERM, not killed at the end of the grace period
+        $this->assertLessThan(5, $elapsed);
+        $this->assertSame([
+            'sman1baleendah' => [
+                'success' => true,
+                'message' => 'Scraped 3 new posts (1 skipped, 0 errors, interrupted)',
+            ],
+        ], $results);
+        $this->assertStringContainsString('ABC123', $output->fetch());
+        Log::shouldHaveReceived('warning')->once();
+    }
+
+    public static function fakeScraper(): string
+    {
+        return self::FAKE_SCRAPER;
+    }
+}